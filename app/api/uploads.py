@@ -0,0 +1,130 @@
+"""
+Serving of uploaded and generated files (/uploads/...).
+Replaces the plain StaticFiles mount for mobile clients:
+- `Range` requests (206) so players can start before the whole file is downloaded
+- strong `ETag` + `If-None-Match` (304) and long-lived `Cache-Control` (file names are unique)
+- file reads in a thread, streamed in chunks
+- files moved to a hash shard are found by name; archived ones redirect to MinIO
+"""
+import mimetypes
+import os
+import re
+from typing import Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
+from app.core.config import settings
+from app.services.upload_storage import archive_object_name, locate_upload
+
+router = APIRouter()
+
+CHUNK_SIZE = 64 * 1024
+AUDIO_EXTENSIONS = {".mp3", ".ogg", ".opus", ".aac", ".m4a", ".wav", ".webm", ".flac", ".amr"}
+CONTENT_TYPES = {
+    ".ogg": "audio/ogg", ".opus": "audio/ogg", ".aac": "audio/aac", ".m4a": "audio/mp4",
+    ".mp3": "audio/mpeg", ".wav": "audio/wav", ".webm": "audio/webm", ".flac": "audio/flac", ".amr": "audio/amr",
+}
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def resolve_upload_path(file_path: str) -> Optional[str]:
+    """
+    Absolute path of a file inside UPLOAD_DIR: the exact path, else the file's shard
+    (/uploads/<name> URLs predate sharding). None if missing, 404 for paths outside UPLOAD_DIR.
+    """
+    root = os.path.realpath(settings.UPLOAD_DIR)
+    full_path = os.path.realpath(os.path.join(root, file_path))
+    if not full_path.startswith(root + os.sep):
+        raise HTTPException(status_code=404, detail="File not found")
+    if os.path.isfile(full_path):
+        return full_path
+    located = locate_upload(os.path.basename(full_path), root)
+    return os.path.realpath(located) if located else None
+
+
+async def archived_upload_url(file_path: str) -> Optional[str]:
+    """Presigned MinIO URL of an upload moved to the archive by the retention sweeper."""
+    if settings.UPLOADS_RETENTION_ACTION != "archive":
+        return None
+    from app.services.storage import storage_service
+
+    object_name = archive_object_name(file_path)
+    try:
+        if not await run_in_threadpool(storage_service.object_exists, object_name):
+            return None
+        return await run_in_threadpool(storage_service.get_file_url, object_name)
+    except Exception as e:
+        print(f"[Uploads] Archive lookup failed for {object_name}: {e}")
+        return None
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """(start, end) inclusive for a single `bytes=` range, None to send the whole file. 416 if unsatisfiable."""
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if not match or not any(match.groups()):
+        return None  # Multi-range or malformed: ignore, full response is allowed
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(0, size - int(last))  # Suffix range: last N bytes
+        end = size - 1
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+
+def iter_file(path: str, start: int, length: int):
+    # Sync generator: Starlette iterates it in a thread pool
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+@router.api_route("/uploads/{file_path:path}", methods=["GET", "HEAD"])
+async def serve_upload(file_path: str, request: Request):
+    full_path = resolve_upload_path(file_path)
+    if full_path is None:
+        archived_url = await archived_upload_url(file_path)
+        if archived_url is None:
+            raise HTTPException(status_code=404, detail="File not found")
+        return RedirectResponse(archived_url, status_code=307)
+    stat = os.stat(full_path)
+    ext = os.path.splitext(full_path)[1].lower()
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Audio names are UUIDs / content hashes: a URL always points to the same bytes
+        "Cache-Control": f"public, max-age={settings.UPLOADS_CACHE_MAX_AGE}, immutable" if ext in AUDIO_EXTENSIONS
+        else "public, max-age=3600",
+    }
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    media_type = CONTENT_TYPES.get(ext) or mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        byte_range = parse_range(request.headers.get("range"), stat.st_size)
+
+    if byte_range is None:
+        start, length, status = 0, stat.st_size, 200
+    else:
+        start, end = byte_range
+        length, status = end - start + 1, 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    headers["Content-Length"] = str(length)
+
+    if request.method == "HEAD":
+        return Response(status_code=status, headers=headers, media_type=media_type)
+    return StreamingResponse(iter_file(full_path, start, length), status_code=status, headers=headers, media_type=media_type)
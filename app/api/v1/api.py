@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from app.api.v1.endpoints import entities, users, sessions, knowledge, chat
 from app.api.v1.endpoints import specialties, doctors, timeslots, appointments
-from app.api.v1.endpoints import custom_chat, global_settings
+from app.api.v1.endpoints import custom_chat, global_settings, metrics
 
 api_router = APIRouter()
 api_router.include_router(entities.router, tags=["entities", "instances"])
@@ -21,3 +21,6 @@ api_router.include_router(custom_chat.router)
 
 # Global settings
 api_router.include_router(global_settings.router, prefix="/settings", tags=["settings"])
+
+# Performance metrics
+api_router.include_router(metrics.router, prefix="/metrics", tags=["metrics"])
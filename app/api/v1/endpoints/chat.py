@@ -1,7 +1,8 @@
 import json
-from uuid import UUID
+from uuid import UUID, uuid4
 from typing import Optional, Dict, Any, List
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Body
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Body, BackgroundTasks, Header, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.core.database import get_db
@@ -9,6 +10,11 @@ from app.core.config import settings
 from app.crud import crud_chat, crud_entity
 from app.models.chat import Session, Message, Speaker
 from app.schemas import chat as schemas
+from app.services.idempotency import idempotency_store
+from app.core.resilience import turn_deadline
+from app.core.admission import UpstreamBusyError
+from app.core.metrics import metrics
+from app.services.audio_normalize import AudioDecodeError
 
 router = APIRouter()
 
@@ -20,6 +26,7 @@ FIXED_SPEAKER_UUID = UUID("11111111-1111-1111-1111-111111111111")
 _audio_service = None
 _rag_service = None
 _llm_service = None
+_conversation_memory = None
 
 def get_audio_service() -> "AudioService":
     global _audio_service
@@ -42,6 +49,13 @@ def get_llm_service() -> "LLMService":
         _llm_service = LLMService()
     return _llm_service
 
+def get_conversation_memory() -> "ConversationMemory":
+    global _conversation_memory
+    if _conversation_memory is None:
+        from app.services.conversation import ConversationMemory
+        _conversation_memory = ConversationMemory(get_llm_service())
+    return _conversation_memory
+
 async def get_or_create_default_speaker(db: AsyncSession) -> UUID:
     """Get or create a fixed default speaker for all users"""
     global DEFAULT_SPEAKER_ID
@@ -65,6 +79,29 @@ async def get_or_create_default_speaker(db: AsyncSession) -> UUID:
     DEFAULT_SPEAKER_ID = speaker.speaker_id
     return DEFAULT_SPEAKER_ID
 
+async def get_session_language(db: AsyncSession, session_id: Optional[str]) -> Optional[str]:
+    """Language of the session's last user turn ('wo' when it was translated), None if unknown."""
+    if not session_id:
+        return None
+    from app.services.langid import get_text_language_detector
+
+    try:
+        result = await db.execute(
+            select(Message.content, Message.translated_content)
+            .filter(Message.session_id == UUID(session_id), Message.role == "user")
+            .order_by(Message.created_at.desc())
+            .limit(1)
+        )
+    except ValueError:
+        return None  # Malformed session_id: process_chat_request starts a new session
+    last = result.first()
+    if not last or not last.content:
+        return None
+    if last.translated_content:
+        return "wo"
+    lang, confidence = get_text_language_detector().detect(last.content)
+    return lang if confidence >= settings.TEXT_LID_MIN_CONFIDENCE else None
+
 async def execute_appointment_function(
     db: AsyncSession, 
     entity_id, 
@@ -181,6 +218,91 @@ async def execute_appointment_function(
     except Exception as e:
         return {"success": False, "message": f"Erreur: {str(e)}"}
 
+# Tools with side effects, simulated when a turn is replayed without persistence
+WRITE_TOOLS = {"book_appointment"}
+
+async def execute_tool_calls(entity_id, session_id, tool_calls: List[dict], read_only: bool = False) -> List[dict]:
+    """
+    Run every tool call of a model turn concurrently.
+    Each call gets its own DB session since an AsyncSession cannot be shared across tasks.
+    Results are returned in the same order as tool_calls.
+    With read_only (batch evaluation), write tools return a simulated result instead of booking.
+    """
+    import asyncio
+    from app.core.database import AsyncSessionLocal
+
+    async def run(call: dict) -> dict:
+        if read_only and call["name"] in WRITE_TOOLS:
+            return {"success": True, "dry_run": True, "message": "Simulation: aucun rendez-vous n'a été créé (mode évaluation)."}
+        async with AsyncSessionLocal() as tool_db:
+            return await execute_appointment_function(
+                tool_db, entity_id, session_id, call["name"], call["args"]
+            )
+
+    return await asyncio.gather(*(run(call) for call in tool_calls))
+
+async def generate_llm_response(
+    db: AsyncSession,
+    instance,
+    session: Session,
+    entity,
+    user_msg: Message,
+    user_input: str,
+    execute_tools
+) -> Dict[str, Any]:
+    """
+    Full answer path for turns the intent fast path did not handle:
+    RAG context, bounded history, system prompt and the LLM tool loop.
+    Returns the run_tool_loop result (content + token usage).
+    """
+    rag_service = get_rag_service()
+    llm_service = get_llm_service()
+    memory = get_conversation_memory()
+
+    # 1. RAG Context (the turn is answered without it when the embeddings API is saturated)
+    try:
+        query_embedding = await rag_service.embed_text(user_input)
+        chunks = await rag_service.search_kb(db, instance.entity_id, query_embedding)
+    except UpstreamBusyError as e:
+        print(f"[RAG] Embeddings unavailable ({e}), answering without knowledge base context...")
+        metrics.increment("rag_skipped", reason="upstream_busy")
+        chunks = None
+    
+    context = ""
+    if chunks:
+        context = "\n\n".join([f"Source: {chunk.document.title}\nContent: {chunk.content}" for chunk in chunks])
+    elif chunks is None:
+        context = "La base de connaissances est momentanément indisponible."
+    else:
+        context = "Aucune information pertinente trouvée dans la base de connaissances."
+
+    # 2. Build History (session summary + recent messages including tool calls, within token budget)
+    # Exclude the current user message we just saved, because we pass the translated version as explicit input
+    history = await memory.load_history(db, session, exclude_message_id=user_msg.message_id)
+
+    # 3. System Instruction - Use entity-specific prompt if available
+    entity_name = entity.name if entity else 'cette organisation'
+    
+    if entity and entity.system_prompt:
+        system_instruction = entity.system_prompt
+        print(f"[Chat] Using custom system prompt for entity: {entity.name}")
+    else:
+        system_instruction = f"""Tu es un assistant virtuel professionnel et amical pour {entity_name}. 
+    
+    COMPORTEMENT GÉNÉRAL:
+    - Réponds aux questions des utilisateurs en utilisant la base de connaissances
+    - Sois naturel et conversationnel
+    - IMPORTANT: Ne mets JAMAIS de formattage markdown (pas de gras, pas d'italique, pas d'étoiles *). Le texte sera lu par un outil de synthèse vocale qui lit les caractères spéciaux. Écris en texte brut uniquement.
+    """
+        print(f"[Chat] Using default system prompt")
+
+    # 4. LLM Interaction Loop (Handle Tools, conversation state kept across iterations)
+    llm_result = await llm_service.run_tool_loop(
+        system_instruction, context, history, user_input, execute_tools
+    )
+    print(f"[Chat] LLM round trips: {llm_result['round_trips']}, tokens: {llm_result['prompt_tokens']} (cached {llm_result['cached_tokens']}) + {llm_result['completion_tokens']}")
+    return llm_result
+
 async def process_chat_request(
     db: AsyncSession,
     instance_id: str,
@@ -188,16 +310,23 @@ async def process_chat_request(
     audio_path: Optional[str] = None,
     detected_language: str = "fr",
     forced_language: Optional[str] = None,
-    session_id: Optional[str] = None
+    session_id: Optional[str] = None,
+    background_tasks: Optional[BackgroundTasks] = None,
+    synthesize_audio: bool = True,
+    persist: bool = True,
+    audio_format: Optional[str] = None
 ) -> dict:
     """
     Common logic for processing both text and voice chat requests.
-    Handles RAG, History, LLM, Tools, and Persistence.
+    Handles the intent fast path, RAG, History (rolling summary + recent turns), LLM, Tools, and Persistence.
     For Wolof (wo): translates input to French, processes, then translates back.
+    synthesize_audio=False skips TTS; persist=False (batch evaluation) writes nothing:
+    no session/messages are saved and booking tools are simulated.
+    audio_format: response audio format requested by the client (else the instance's, else the default).
     """
-    rag_service = get_rag_service()
     llm_service = get_llm_service()
     audio_service = get_audio_service()
+    memory = get_conversation_memory()
     
     # Import global settings function
     from app.api.v1.endpoints.global_settings import get_global_forced_language
@@ -242,7 +371,7 @@ async def process_chat_request(
             print(f"[Warn] Session {session_id} not found, falling back to new session")
     
     # If no session_id provided or not found, try to find last active session for this speaker/instance
-    if not session:
+    if not session and persist:
         stmt = select(Session).filter(
             Session.entity_id == instance.entity_id,
             Session.speaker_id == speaker_uuid,
@@ -251,8 +380,10 @@ async def process_chat_request(
         result = await db.execute(stmt)
         session = result.scalars().first()
 
-    # Create new session if still none
-    if not session:
+    # Create new session if still none (transient when not persisting)
+    if not session and not persist:
+        session = Session(session_id=uuid4(), entity_id=instance.entity_id, speaker_id=speaker_uuid, is_active=True)
+    elif not session:
         session = Session(entity_id=instance.entity_id, speaker_id=speaker_uuid, is_active=True)
         db.add(session)
         await db.commit()
@@ -260,6 +391,7 @@ async def process_chat_request(
 
     # 2. Save User Message
     user_msg = Message(
+        message_id=uuid4(),
         session_id=session.session_id,
         instance_id=instance_id,
         role="user",
@@ -267,112 +399,59 @@ async def process_chat_request(
         translated_content=user_input if is_wolof else None, # Save French translation if Wolof
         audio_path=audio_path
     )
-    db.add(user_msg)
-    await db.commit()
-
-    # 3. RAG Context
-    query_embedding = await rag_service.embed_text(user_input)
-    chunks = await rag_service.search_kb(db, instance.entity_id, query_embedding)
-    
-    context = ""
-    if chunks:
-        context = "\n\n".join([f"Source: {chunk.document.title}\nContent: {chunk.content}" for chunk in chunks])
-    else:
-        context = "Aucune information pertinente trouvée dans la base de connaissances."
+    if persist:
+        db.add(user_msg)
+        await db.commit()
 
-    # 4. Build History (including previous tools outputs)
-    # Exclude the current user message we just saved, because we pass the translated version as explicit input
-    previous_messages = await crud_chat.message.get_by_session_id(db=db, session_id=session.session_id)
-    history = ""
-    # Take last 15 messages excluding the very last one (current user msg)
-    msgs_to_process = previous_messages[:-1] if previous_messages else []
-    for msg in msgs_to_process[-15:]:
-        # Use translated content for history if available, otherwise regular content
-        msg_content = msg.translated_content if msg.translated_content else msg.content
-        
-        if msg.role == "user":
-            history += f"User: {msg_content}\n"
-        elif msg.role == "assistant":
-            # Assistant messages are already in French (translated for invalid output only)
-            # Actually, we should check if assistant message has a translation? 
-            # Logic: Assistant writes in French (content), then we translate to Wolof for UI display.
-            # But in DB we just saved 'display_response_text' which might be Wolof.
-            # Wait, let's fix assistant saving too later. For now assume content is fine or check below.
-            history += f"Assistant: {msg_content}\n"
-        elif msg.role == "tool":
-            # Include tool outputs in history so LLM remembers IDs
-            history += f"System (Tool Output): {msg.content}\n"
-
-    # 5. System Instruction - Use entity-specific prompt if available
+    # 3. Entity (used by the fast path and the system prompt)
     # Fetch entity first to avoid lazy loading issues in async context
     from app.models.entity import Entity
     entity_stmt = select(Entity).filter(Entity.entity_id == instance.entity_id)
     entity_result = await db.execute(entity_stmt)
     entity = entity_result.scalars().first()
     
-    entity_name = entity.name if entity else 'cette organisation'
-    
-    if entity and entity.system_prompt:
-        system_instruction = entity.system_prompt
-        print(f"[Chat] Using custom system prompt for entity: {entity.name}")
-    else:
-        system_instruction = f"""Tu es un assistant virtuel professionnel et amical pour {entity_name}. 
-    
-    COMPORTEMENT GÉNÉRAL:
-    - Réponds aux questions des utilisateurs en utilisant la base de connaissances
-    - Sois naturel et conversationnel
-    - IMPORTANT: Ne mets JAMAIS de formattage markdown (pas de gras, pas d'italique, pas d'étoiles *). Le texte sera lu par un outil de synthèse vocale qui lit les caractères spéciaux. Écris en texte brut uniquement.
-    """
-        print(f"[Chat] Using default system prompt")
-
-    # 6. LLM Interaction Loop (Handle Tools)
-    current_text = user_input
-    final_response_text = ""
-    
-    # Initial LLM call
-    llm_result = await llm_service.generate_response_with_tools(
-        system_instruction, context, history, current_text
-    )
-
-    # Max loops for nested tools
-    for _ in range(5):
-        if llm_result["type"] == "function_call":
-            func_name = llm_result["content"]["name"]
-            func_args = llm_result["content"]["args"]
-            
-            # Execute tool
-            print(f"🔧 Calling tool: {func_name} with {func_args}")
-            func_result = await execute_appointment_function(
-                db, instance.entity_id, session.session_id, func_name, func_args
-            )
-            print(f"✅ Tool result: {func_result}")
-            
-            func_result_str = json.dumps(func_result, ensure_ascii=False, default=str)
+    # 4. Tool execution shared by the intent fast path and the LLM tool loop
+    async def run_and_persist_tools(tool_calls: List[dict]) -> List[str]:
+        # Execute all tool calls of this model turn concurrently
+        print(f"🔧 Calling {len(tool_calls)} tool(s): {[(c['name'], c['args']) for c in tool_calls]}")
+        func_results = await execute_tool_calls(instance.entity_id, session.session_id, tool_calls, read_only=not persist)
+        print(f"✅ Tool results: {func_results}")
+        
+        func_result_strs = [json.dumps(r, ensure_ascii=False, default=str) for r in func_results]
+        if not persist:
+            return func_result_strs
 
-            # PERSIST Tool Result in DB
-            tool_msg = Message(
+        # PERSIST Tool Calls + Results in DB (structured, replayed as tool_call/tool pairs)
+        db.add_all([
+            Message(
                 session_id=session.session_id,
                 instance_id=instance_id,
                 role="tool",
-                content=f"Function: {func_name}\nResult: {func_result_str}",
+                content=result_str,
+                tool_call_id=call["id"],
+                tool_calls=[{"id": call["id"], "name": call["name"], "arguments": call["args"]}],
                 audio_path=None
             )
-            db.add(tool_msg)
-            await db.commit()
-
-            # Append to history for current context
-            history += f"\nSystem (Tool Output for {func_name}): {func_result_str}\n"
-            
-            # Continue conversation
-            llm_result = await llm_service.continue_with_function_result(
-                system_instruction, # Passing the French system prompt
-                func_name,
-                func_result_str
-            )
-        else:
-            # Text response
-            final_response_text = llm_result["content"]
-            break
+            for call, result_str in zip(tool_calls, func_result_strs)
+        ])
+        await db.commit()
+        return func_result_strs
+
+    # 5. Intent fast path: simple turns (greetings, "rendez-vous en cardiologie demain") skip RAG and LLM
+    from app.services.intent_router import intent_router
+    llm_usage = None
+    final_response_text = await intent_router.route(
+        db, entity, user_input, "fr" if is_wolof else lang_to_use, run_and_persist_tools,
+        session_id=session.session_id
+    )
+    if final_response_text:
+        print(f"[Chat] Answered by intent fast path")
+    else:
+        # 6. RAG + LLM
+        llm_usage = await generate_llm_response(
+            db, instance, session, entity, user_msg, user_input, run_and_persist_tools
+        )
+        final_response_text = llm_usage["content"]
     
     if not final_response_text:
         final_response_text = "Désolé, je rencontre une erreur technique."
@@ -386,10 +465,14 @@ async def process_chat_request(
         print(f"[Wolof] Wolof response: {display_response_text}")
 
     # 7. Generate Audio Response (use specified language TTS)
-    response_audio_path = await audio_service.text_to_speech(
-        display_response_text, 
-        language=lang_to_use
-    )
+    response_audio_path = None
+    if synthesize_audio:
+        from app.services.audio_output import resolve_output_format
+        response_audio_path = await audio_service.text_to_speech(
+            display_response_text, 
+            language=lang_to_use,
+            output_format=resolve_output_format(audio_format, instance.audio_format)
+        )
 
     # 8. Save Assistant Response (save translated version)
     # We save the French version as primary content for LLM context in future
@@ -403,10 +486,18 @@ async def process_chat_request(
         role="assistant",
         content=display_response_text, # Wolof (if translated) or French
         translated_content=final_response_text if is_wolof else None, # French source
-        audio_path=response_audio_path
+        audio_path=response_audio_path,
+        tokens=llm_usage["prompt_tokens"] + llm_usage["completion_tokens"] if llm_usage else None,
+        prompt_tokens=llm_usage["prompt_tokens"] if llm_usage else None,
+        cached_tokens=llm_usage["cached_tokens"] if llm_usage else None,
+        completion_tokens=llm_usage["completion_tokens"] if llm_usage else None
     )
-    db.add(assistant_msg)
-    await db.commit()
+    if persist:
+        db.add(assistant_msg)
+        await db.commit()
+
+        # Fold older turns into the session summary after the response is sent
+        memory.schedule_refresh(session.session_id, background_tasks)
 
     return {
         "speaker_id": str(speaker_uuid),
@@ -502,55 +593,282 @@ async def list_sessions(
 
 @router.post("/messages", response_model=dict)
 async def handle_voice_message(
+    background_tasks: BackgroundTasks,
+    response: Response,
     instance_id: str = Form(...),
     audio_file: UploadFile = File(...),
     speaker_id: Optional[str] = Form(None),
     metadata: Optional[str] = Form(None),
     forced_language: Optional[str] = Form(None),
     session_id: Optional[str] = Form(None),
+    audio_format: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db)
 ):
     audio_service = get_audio_service()
-    
-    # Save & Transcribe (supports forced language to bypass LID)
-    audio_path = await audio_service.save_upload_file(audio_file)
-    transcription, final_lang = await audio_service.transcribe(audio_path, forced_language=forced_language)
-    
-    print(f"[Chat] Voice message - Forced: {forced_language}, Detected: {final_lang}, Text: {transcription[:50]}...")
-    
-    # Process with language info
-    return await process_chat_request(
-        db, instance_id, transcription, audio_path, 
-        detected_language=final_lang, 
-        forced_language=forced_language,
-        session_id=session_id
+    # Stream the upload once (size/format checks, content hash); LID and STT share its decode.
+    # Read here, not in run(): an idempotent execution may outlive this request and its UploadFile.
+    clip = await audio_service.receive_upload(audio_file)
+
+    async def run(db: AsyncSession, background_tasks: Optional[BackgroundTasks]):
+        # One time budget for the whole turn (STT, translations, LLM, TTS)
+        with turn_deadline(settings.CHAT_TURN_DEADLINE_SECONDS):
+            audio_path = clip.path
+            try:
+                duration = await clip.duration()
+            except AudioDecodeError as e:
+                raise HTTPException(status_code=415, detail=f"Audio could not be decoded: {e}")
+            if duration > settings.AUDIO_MAX_DURATION_SECONDS:
+                raise HTTPException(status_code=413, detail=f"Audio longer than {settings.AUDIO_MAX_DURATION_SECONDS:.0f} s")
+            
+            # Transcribe (supports forced language to bypass LID)
+            transcription, final_lang = await audio_service.transcribe(audio_path, forced_language=forced_language, clip=clip)
+            
+            print(f"[Chat] Voice message - Forced: {forced_language}, Detected: {final_lang}, Text: {transcription[:50]}...")
+            
+            # Process with language info
+            return await process_chat_request(
+                db, instance_id, transcription, audio_path, 
+                detected_language=final_lang, 
+                forced_language=forced_language,
+                session_id=session_id,
+                background_tasks=background_tasks,
+                audio_format=audio_format
+            )
+
+    if not idempotency_key:
+        try:
+            return await run(db, background_tasks)
+        except HTTPException:
+            # Rejected (undecodable, too long, unknown instance) before any message referenced it:
+            # the sweeper would never see this file
+            discard_upload(clip)
+            raise
+    # Retries of the same recording replay the first result (no second STT/LLM/TTS run).
+    # Content hash, not filename/size: kiosks send every recording under the same name.
+    fingerprint = idempotency_store.fingerprint(
+        instance_id, session_id, forced_language, audio_format, clip.sha256
     )
+    try:
+        result = await run_idempotent(response, f"messages:{instance_id}:{idempotency_key}", fingerprint, run)
+    except HTTPException:
+        discard_upload(clip)  # Rejected, or key reused for other audio (422): this copy is never referenced
+        raise
+    if response.headers.get("Idempotent-Replayed"):
+        discard_upload(clip)  # Duplicate of an upload already stored by the first request
+    return result
+
+@router.websocket("/stream")
+async def stream_voice_message(
+    websocket: WebSocket,
+    instance_id: str,
+    session_id: Optional[str] = None,
+    forced_language: Optional[str] = None,
+    audio_format: Optional[str] = None,
+    encoding: str = "pcm16",
+    sample_rate: int = 16000
+):
+    """
+    Voice message streamed while it is recorded (one turn per connection).
+    Client -> server: binary frames of audio in `encoding` (pcm16: s16le mono at `sample_rate`;
+    webm/ogg: MediaRecorder chunks), optionally {"type": "end"} when recording stops.
+    Server -> client (JSON): ready, speech_start, language (as soon as LID is confident),
+    speech_end, transcription, then result (same payload as POST /messages) or error.
+    VAD and LID run on the partial audio, so STT starts right at end-of-speech without
+    upload, decode or LID on the critical path.
+    """
+    import asyncio
+    import time
+    from starlette.websockets import WebSocketDisconnect
+    from app.core.database import AsyncSessionLocal
+    from app.services.voice_stream import VoiceStream, save_utterance
+
+    async def send(event: Dict[str, Any]):
+        await websocket.send_json(jsonable_encoder(event))
+
+    async def send_error(detail: str, **extra):
+        try:
+            await send({"type": "error", "detail": detail, **extra})
+        except Exception:
+            pass  # Client already gone
+
+    if VoiceStream.active >= settings.VOICE_STREAM_MAX_CONCURRENT:
+        await websocket.close(code=1013)  # Try again later
+        return
+    try:
+        # Holds a slot from here on: no await since the check, so concurrent handshakes can't overshoot
+        stream = VoiceStream(
+            encoding, sample_rate,
+            forced_language=forced_language if forced_language and forced_language != "auto" else None,
+            on_event=send
+        )
+    except ValueError as e:
+        await websocket.accept()
+        await send_error(str(e))
+        await websocket.close(code=1003)
+        return
+
+    async def receive_audio() -> str:
+        # Feeds the stream until the client stops recording, leaves or goes idle
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), settings.VOICE_STREAM_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                return "idle"  # Treated as the end of recording
+            if message["type"] == "websocket.disconnect":
+                return "disconnect"
+            if message.get("bytes"):
+                await stream.feed(message["bytes"])
+            elif message.get("text"):
+                try:
+                    control = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if isinstance(control, dict) and control.get("type") == "end":
+                    return "end"
+
+    receiver = None
+    try:
+        await websocket.accept()
+        await stream.start()
+        await send({"type": "ready"})
+        receiver = asyncio.create_task(receive_audio())
+        ended = asyncio.create_task(stream.ended.wait())
+        await asyncio.wait([receiver, ended], return_when=asyncio.FIRST_COMPLETED)
+        ended.cancel()
+        if not receiver.done():
+            receiver.cancel()
+        elif receiver.result() == "disconnect":
+            return
+
+        end_of_speech = time.monotonic()
+        # The turn starts when the user stops talking
+        with turn_deadline(settings.CHAT_TURN_DEADLINE_SECONDS):
+            clip = await stream.finish()
+            if clip is None:
+                await send_error("No speech detected")
+                return
+            await send({"type": "speech_end", "reason": stream.end_reason, "duration": round(await clip.duration(), 2)})
+
+            # User audio is encoded and stored while STT runs
+            saving = asyncio.create_task(save_utterance(clip))
+            metrics.observe("voice_stream_stt_start_ms", (time.monotonic() - end_of_speech) * 1000, early=stream.decided_early)
+            transcription, final_lang = await get_audio_service().transcribe_in_language(clip, stream.target_language)
+            print(f"[Chat] Streamed voice message - Forced: {forced_language}, Detected: {final_lang}, Text: {transcription[:50]}...")
+            await send({"type": "transcription", "text": transcription, "language": final_lang})
+            audio_path = await saving
+
+            async with AsyncSessionLocal() as db:
+                result = await process_chat_request(
+                    db, instance_id, transcription, audio_path,
+                    detected_language=final_lang,
+                    forced_language=forced_language,
+                    session_id=session_id,
+                    audio_format=audio_format
+                )
+        await send({"type": "result", "result": result})
+    except WebSocketDisconnect:
+        return
+    except HTTPException as e:
+        await send_error(e.detail, status_code=e.status_code)
+    except AudioDecodeError as e:
+        await send_error(f"Could not decode the {encoding} audio: {e}")
+    except Exception as e:
+        print(f"[Stream] Voice stream failed: {e}")
+        await send_error("Internal error")
+    finally:
+        if receiver and not receiver.done():
+            receiver.cancel()
+        await stream.close()
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass  # Already closed
 
 @router.post("/text", response_model=dict)
 async def handle_text_message(
+    background_tasks: BackgroundTasks,
+    response: Response,
     instance_id: str = Body(...),
     text: str = Body(...),
     forced_language: Optional[str] = Body(None),
     session_id: Optional[str] = Body(None),
+    audio_format: Optional[str] = Body(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     db: AsyncSession = Depends(get_db)
 ):
-    if not forced_language or forced_language == "auto":
-        llm_service = get_llm_service()
-        detected_language = await llm_service.detect_language(text)
-    else:
-        detected_language = forced_language
-    
-    import logging
-    logger = logging.getLogger("uvicorn")
-    logger.info(f"[Chat] Text message - Forced: {forced_language}, Detected: {detected_language}, Text: {text[:50]}...")
-    
-    # Process with language info (same pipeline as voice)
-    return await process_chat_request(
-        db, instance_id, text, None, 
-        detected_language=detected_language,
-        forced_language=forced_language,
-        session_id=session_id
-    )
+    async def run(db: AsyncSession, background_tasks: Optional[BackgroundTasks]):
+        if not forced_language or forced_language == "auto":
+            llm_service = get_llm_service()
+            detected_language = await llm_service.detect_language(text, await get_session_language(db, session_id))
+        else:
+            detected_language = forced_language
+        
+        import logging
+        logger = logging.getLogger("uvicorn")
+        logger.info(f"[Chat] Text message - Forced: {forced_language}, Detected: {detected_language}, Text: {text[:50]}...")
+        
+        # Process with language info (same pipeline as voice)
+        with turn_deadline(settings.CHAT_TURN_DEADLINE_SECONDS):
+            return await process_chat_request(
+                db, instance_id, text, None, 
+                detected_language=detected_language,
+                forced_language=forced_language,
+                session_id=session_id,
+                background_tasks=background_tasks,
+                audio_format=audio_format
+            )
+
+    if not idempotency_key:
+        return await run(db, background_tasks)
+    fingerprint = idempotency_store.fingerprint(instance_id, session_id, forced_language, audio_format, text)
+    return await run_idempotent(response, f"text:{instance_id}:{idempotency_key}", fingerprint, run)
+
+@router.post("/batch")
+async def handle_text_batch(request: schemas.ChatBatchRequest):
+    """
+    Replay many text turns (QA of an entity's system prompt and KB).
+    Streams one NDJSON line per item as it completes (with elapsed_ms), then a summary line.
+    By default nothing is persisted and no TTS is generated.
+    """
+    from fastapi.responses import StreamingResponse
+    from app.services.chat_batch import run_chat_batch
+
+    if len(request.items) > settings.CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Too many items (max {settings.CHAT_BATCH_MAX_ITEMS})")
+
+    async def ndjson():
+        async for line in run_chat_batch(
+            request.items, request.concurrency, request.synthesize_audio, request.persist
+        ):
+            yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+async def run_idempotent(response: Response, key: str, fingerprint: str, run) -> Dict[str, Any]:
+    """
+    Single-flight + replay for requests sent with an Idempotency-Key header.
+    The shared execution is detached from the request that started it (it survives that
+    client disconnecting), so `run(db, background_tasks)` gets its own DB session and no
+    BackgroundTasks instead of the request-scoped ones.
+    """
+    from app.core.database import AsyncSessionLocal
+
+    async def detached():
+        async with AsyncSessionLocal() as db:
+            return await run(db, None)
+
+    result, replayed = await idempotency_store.execute(key, fingerprint, detached)
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+def discard_upload(clip):
+    """Remove a received upload no message will reference."""
+    import os
+
+    if clip.path and os.path.exists(clip.path):
+        os.remove(clip.path)
 
 def parse_natural_date(date_str: str) -> str:
     """Parse natural language dates to YYYY-MM-DD format"""
@@ -1,5 +1,5 @@
 # Custom Chatbot API Endpoints
-from fastapi import APIRouter, Depends, HTTPException, Body
+from fastapi import APIRouter, Depends, HTTPException, Body, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, delete
 from pydantic import BaseModel
@@ -7,9 +7,10 @@ from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.models.custom_chat import CustomChatConfig, CustomChatMessage
 from app.services.audio import AudioService
+from app.services.upload_storage import locate_upload
 
 router = APIRouter(prefix="/custom_chat_bot", tags=["Custom ChatBot"])
 
@@ -21,19 +22,76 @@ def get_audio_service():
         _audio_service = AudioService("uploads")
     return _audio_service
 
+def to_audio_url(audio_path: str) -> str:
+    """Public URL of a file in the uploads directory."""
+    return f"/uploads/{audio_path.replace(chr(92), '/').split('/')[-1]}"
+
+def stored_audio_url(config: CustomChatConfig) -> Optional[str]:
+    """Pre-synthesized audio of a config, if it is ready and still on disk."""
+    if config.audio_status != "ready" or not config.audio_url:
+        return None
+    if not locate_upload(config.audio_url, "uploads"):
+        return None
+    return config.audio_url
+
+async def synthesize_config_audio(config_id: uuid.UUID):
+    """
+    Background task: synthesize a config's response and store the URL on the row.
+    The result is dropped if the response/language changed meanwhile (a newer task handles it).
+    """
+    async with AsyncSessionLocal() as db:
+        config = await db.get(CustomChatConfig, config_id)
+        if not config:
+            return
+        text, lang = config.response, config.response_lang
+
+    try:
+        audio_path = await get_audio_service().text_to_speech(text, language=lang)
+        audio_url, status = to_audio_url(audio_path), "ready"
+    except Exception as e:
+        print(f"[CustomChat] Pre-synthesis failed for config {config_id}: {e}")
+        audio_url, status = None, "failed"
+
+    async with AsyncSessionLocal() as db:
+        config = await db.get(CustomChatConfig, config_id)
+        if not config or config.response != text or config.response_lang != lang:
+            return
+        config.audio_url = audio_url
+        config.audio_status = status
+        await db.commit()
+    print(f"[CustomChat] Audio {status} for config {config_id}")
+
 # Pydantic models
 class ConfigCreate(BaseModel):
     question: str
     response: str
     response_lang: str = "fr"
 
+class ConfigUpdate(BaseModel):
+    question: Optional[str] = None
+    response: Optional[str] = None
+    response_lang: Optional[str] = None
+
 class ConfigResponse(BaseModel):
     id: str
     question: str
     response: str
     response_lang: str
+    audio_url: Optional[str] = None
+    audio_status: Optional[str] = None
     created_at: datetime
 
+def to_config_response(c: CustomChatConfig) -> ConfigResponse:
+    return ConfigResponse(
+        id=str(c.id),
+        question=c.question,
+        response=c.response,
+        response_lang=c.response_lang,
+        audio_url=c.audio_url,
+        audio_status=c.audio_status,
+        created_at=c.created_at
+    )
+
 class ChatRequest(BaseModel):
     session_id: str
     message: str
@@ -55,25 +113,59 @@ class MessageHistoryResponse(BaseModel):
 @router.post("/config", response_model=ConfigResponse)
 async def create_config(
     config: ConfigCreate,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db)
 ):
-    """Add a new Q&A configuration."""
+    """Add a new Q&A configuration. Its audio is synthesized in the background."""
     new_config = CustomChatConfig(
         question=config.question,
         response=config.response,
-        response_lang=config.response_lang
+        response_lang=config.response_lang,
+        audio_status="pending"
     )
     db.add(new_config)
     await db.commit()
     await db.refresh(new_config)
     
-    return ConfigResponse(
-        id=str(new_config.id),
-        question=new_config.question,
-        response=new_config.response,
-        response_lang=new_config.response_lang,
-        created_at=new_config.created_at
+    background_tasks.add_task(synthesize_config_audio, new_config.id)
+    return to_config_response(new_config)
+
+@router.put("/config/{config_id}", response_model=ConfigResponse)
+async def update_config(
+    config_id: str,
+    update: ConfigUpdate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
+    """Update a Q&A configuration. Audio is regenerated when the response or its language changes."""
+    try:
+        config_uuid = uuid.UUID(config_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid config ID")
+    
+    config = await db.get(CustomChatConfig, config_uuid)
+    if not config:
+        raise HTTPException(status_code=404, detail="Config not found")
+    
+    if update.question is not None:
+        config.question = update.question
+    audio_changed = (
+        (update.response is not None and update.response != config.response)
+        or (update.response_lang is not None and update.response_lang != config.response_lang)
     )
+    if update.response is not None:
+        config.response = update.response
+    if update.response_lang is not None:
+        config.response_lang = update.response_lang
+    if audio_changed:
+        config.audio_url = None
+        config.audio_status = "pending"
+    await db.commit()
+    await db.refresh(config)
+    
+    if audio_changed:
+        background_tasks.add_task(synthesize_config_audio, config.id)
+    return to_config_response(config)
 
 @router.get("/config", response_model=List[ConfigResponse])
 async def list_configs(db: AsyncSession = Depends(get_db)):
@@ -81,16 +173,7 @@ async def list_configs(db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(CustomChatConfig).order_by(CustomChatConfig.created_at.desc()))
     configs = result.scalars().all()
     
-    return [
-        ConfigResponse(
-            id=str(c.id),
-            question=c.question,
-            response=c.response,
-            response_lang=c.response_lang,
-            created_at=c.created_at
-        )
-        for c in configs
-    ]
+    return [to_config_response(c) for c in configs]
 
 @router.delete("/config/{config_id}")
 async def delete_config(config_id: str, db: AsyncSession = Depends(get_db)):
@@ -153,7 +236,7 @@ async def chat(
     # If no exact match, use LLM to find best match or generate fallback
     if matched_config is None:
         # Use GPT to match or generate response
-        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL)
         
         # Build context from configs
         config_context = "\n".join([
@@ -188,19 +271,29 @@ RÈGLES:
         for config in configs:
             if config.response in bot_response:
                 response_lang = config.response_lang
+                # Exact configured answer: its pre-synthesized audio applies
+                if bot_response.strip() == config.response.strip():
+                    matched_config = config
                 break
     else:
         bot_response = matched_config.response
         response_lang = matched_config.response_lang
     
-    # Generate TTS based on language
-    audio_service = get_audio_service()
-    try:
-        audio_path = await audio_service.text_to_speech(bot_response, language=response_lang)
-        audio_url = f"/uploads/{audio_path.split('/')[-1].split(chr(92))[-1]}"
-    except Exception as e:
-        print(f"[CustomChat] TTS failed: {e}")
-        audio_url = None
+    # Configured answers come with pre-synthesized audio (no TTS on the request path)
+    audio_url = stored_audio_url(matched_config) if matched_config else None
+    if audio_url is None:
+        # Generate TTS based on language
+        audio_service = get_audio_service()
+        try:
+            audio_path = await audio_service.text_to_speech(bot_response, language=response_lang)
+            audio_url = to_audio_url(audio_path)
+            if matched_config:
+                # Backfill configs saved before pre-synthesis existed (or whose file is gone)
+                matched_config.audio_url = audio_url
+                matched_config.audio_status = "ready"
+        except Exception as e:
+            print(f"[CustomChat] TTS failed: {e}")
+            audio_url = None
     
     # Save assistant message
     assistant_msg = CustomChatMessage(
@@ -279,9 +372,7 @@ async def generate_tts(request: TTSRequest):
     
     try:
         audio_path = await audio_service.text_to_speech(request.text, language=request.language)
-        # Extract filename from path
-        filename = audio_path.replace("\\", "/").split("/")[-1]
-        audio_url = f"/uploads/{filename}"
+        audio_url = to_audio_url(audio_path)
         
         return TTSResponse(
             audio_url=audio_url,
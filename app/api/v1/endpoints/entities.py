@@ -3,8 +3,9 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
-from app.crud import crud_entity
+from app.crud import crud_entity, crud_chat
 from app.schemas import entity as schemas
+from app.schemas.chat import LLMUsageResponse
 
 router = APIRouter()
 
@@ -58,6 +59,19 @@ async def update_entity(
         raise HTTPException(status_code=404, detail="Entity not found")
     return await crud_entity.entity.update(db=db, db_obj=entity, obj_in=entity_in)
 
+@router.get("/entities/{entity_id}/llm_usage", response_model=LLMUsageResponse)
+async def read_entity_llm_usage(
+    entity_id: UUID,
+    db: AsyncSession = Depends(get_db)
+) -> Any:
+    """
+    Aggregated LLM token usage (prompt, cached, completion) for an entity's chat answers.
+    """
+    entity = await crud_entity.entity.get(db=db, id=entity_id)
+    if not entity:
+        raise HTTPException(status_code=404, detail="Entity not found")
+    return await crud_chat.message.get_usage_by_entity(db=db, entity_id=entity_id)
+
 @router.delete("/entities/{entity_id}", response_model=schemas.EntityResponse)
 async def delete_entity(
     entity_id: UUID,
@@ -3,6 +3,7 @@ from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
+from app.core.admission import Priority
 from app.crud import crud_knowledge
 from app.schemas import knowledge as schemas
 
@@ -105,7 +106,7 @@ async def create_document(
             chunk = await crud_knowledge.kb_chunk.create(db=db, obj_in=chunk_in)
             
             # Generate Embedding
-            embedding_vector = await rag_service.embed_text(chunk_text)
+            embedding_vector = await rag_service.embed_text(chunk_text, priority=Priority.BACKGROUND)
             
             # Store Embedding
             embedding_in = schemas.KBEmbeddingCreate(
@@ -221,7 +222,7 @@ async def create_document_from_text(
             chunk = await crud_knowledge.kb_chunk.create(db=db, obj_in=chunk_in)
 
             # Generate Embedding
-            embedding_vector = await rag_service.embed_text(chunk_text)
+            embedding_vector = await rag_service.embed_text(chunk_text, priority=Priority.BACKGROUND)
 
             # Store Embedding
             embedding_in = schemas.KBEmbeddingCreate(
@@ -0,0 +1,20 @@
+"""
+Metrics Endpoint
+Exposes the in-process performance metrics of this worker (LLM round trips, caches, queues...).
+"""
+from typing import Any, Dict, List
+from fastapi import APIRouter
+from app.core.metrics import metrics
+from app.services.model_registry import model_registry
+
+router = APIRouter()
+
+@router.get("", response_model=Dict[str, Any])
+async def get_metrics():
+    """Snapshot of counters, gauges and latency summaries for this worker process."""
+    return metrics.snapshot()
+
+@router.get("/models", response_model=List[Dict[str, Any]])
+async def get_models():
+    """Local models of this worker: resident or not, measured size, in-flight inferences, idle time."""
+    return model_registry.status()
@@ -0,0 +1,120 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class Priority:
+    """Lower value is served first."""
+    INTERACTIVE = 0  # Chat turns (user is waiting)
+    BACKGROUND = 1   # KB ingestion, summaries, pre-synthesis
+
+
+class UpstreamBusyError(Exception):
+    """Raised when a call waited longer than UPSTREAM_QUEUE_TIMEOUT for an upstream slot."""
+
+
+class AdmissionController:
+    """
+    Async admission control for one upstream operation (e.g. 'openai.chat'):
+    at most `concurrency` calls in flight, at most `rate` call starts per second
+    (token bucket), waiters served by priority then arrival order.
+    SDK retries happen inside the admitted slot, so they cannot multiply the load.
+    """
+
+    def __init__(self, name: str, concurrency: int, rate: Optional[float] = None, queue_timeout: Optional[float] = None):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.rate = rate
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._tokens = float(max(1.0, rate or 1.0))
+        self._last_refill = time.monotonic()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    @asynccontextmanager
+    async def slot(self, priority: int = Priority.INTERACTIVE):
+        start = time.monotonic()
+        await self._acquire(priority)
+        try:
+            await self._take_rate_token()
+            metrics.observe("upstream_wait_ms", (time.monotonic() - start) * 1000, upstream=self.name, priority=priority)
+            metrics.set_gauge("upstream_in_flight", self._active, upstream=self.name)
+            yield
+        finally:
+            self._release()
+            metrics.set_gauge("upstream_in_flight", self._active, upstream=self.name)
+
+    async def _acquire(self, priority: int):
+        if self._active < self.concurrency and not self.queue_depth:
+            self._active += 1
+            return
+
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        metrics.set_gauge("upstream_queue_depth", self.queue_depth, upstream=self.name)
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                self._release()
+            metrics.increment("upstream_queue_timeouts", upstream=self.name)
+            raise UpstreamBusyError(f"{self.name}: no slot after {self.queue_timeout}s")
+        except asyncio.CancelledError:
+            # Slot may have been handed to us right before cancellation
+            if fut.done() and not fut.cancelled():
+                self._release()
+            raise
+        finally:
+            metrics.set_gauge("upstream_queue_depth", self.queue_depth, upstream=self.name)
+
+    def _release(self):
+        # Hand the slot directly to the best live waiter, otherwise free it
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._active -= 1
+
+    async def _take_rate_token(self):
+        if not self.rate:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return
+            await asyncio.sleep((1.0 - self._tokens) / self.rate)
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+def get_admission_controller(name: str) -> AdmissionController:
+    """Shared controller per upstream operation, configured from settings.UPSTREAM_LIMITS."""
+    controller = _controllers.get(name)
+    if controller is None:
+        limits = settings.UPSTREAM_LIMITS.get(name, {})
+        controller = AdmissionController(
+            name,
+            concurrency=limits.get("concurrency", 8),
+            rate=limits.get("rate"),
+            queue_timeout=settings.UPSTREAM_QUEUE_TIMEOUT
+        )
+        _controllers[name] = controller
+    return controller
+
+def upstream_slot(name: str, priority: int = Priority.INTERACTIVE):
+    """`async with upstream_slot("openai.chat"):` around every upstream call."""
+    return get_admission_controller(name).slot(priority)
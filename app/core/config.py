@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import PostgresDsn, computed_field
-from typing import Optional
+from typing import Any, Optional, Dict, List
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Tontouma Voice Chatbot"
@@ -15,8 +15,119 @@ class Settings(BaseSettings):
     OPENAI_MODEL: str = "gpt-4o"
     OPENAI_TIMEOUT: float = 60.0 # Increased timeout for slow networks
     OPENAI_MAX_RETRIES: int = 3
+    OPENAI_BASE_URL: Optional[str] = None # e.g. http://127.0.0.1:9801/v1 for scripts/fake_upstreams.py
+    OPENAI_SUMMARY_MODEL: str = "gpt-4o-mini" # Cheap model for rolling conversation summaries
+
+    # Upstream admission control: max concurrent calls and call starts per second, per upstream operation
+    UPSTREAM_LIMITS: Dict[str, Dict[str, float]] = {
+        "openai.chat": {"concurrency": 16, "rate": 20},
+        "openai.embeddings": {"concurrency": 8, "rate": 20},
+        "openai.stt": {"concurrency": 8, "rate": 5},
+        "openai.tts": {"concurrency": 8, "rate": 5},
+        "lafricamobile.stt": {"concurrency": 4, "rate": 4},
+        "lafricamobile.translate": {"concurrency": 8, "rate": 8},
+        "lafricamobile.tts": {"concurrency": 4, "rate": 4},
+    }
+    UPSTREAM_QUEUE_TIMEOUT: float = 30.0 # Max wait for a slot before failing fast (callers fall back)
+
+    # Per-turn deadline: every stage gets min(its own timeout, time left in the turn)
+    CHAT_TURN_DEADLINE_SECONDS: float = 45.0
+    CHAT_FALLBACK_FLOOR_SECONDS: float = 10.0 # Minimum timeout kept for the OpenAI stages/fallbacks once the budget is spent
+
+    # LAfricaMobile resilience (Wolof pipeline)
+    LAFRICAMOBILE_TIMEOUTS: Dict[str, float] = {"stt": 15.0, "translate": 6.0, "tts": 15.0} # Per-call caps (seconds)
+    LAFRICAMOBILE_MIN_CALL_SECONDS: float = 1.0 # Below this budget left, skip the call and fall back
+    LAFRICAMOBILE_BREAKER_FAILURES: int = 3 # Consecutive failures/slow calls that open the circuit
+    LAFRICAMOBILE_SLOW_CALL_RATIO: float = 0.8 # A call slower than this share of its cap counts as a failure
+    LAFRICAMOBILE_BREAKER_OPEN_SECONDS: float = 30.0 # Fall back immediately for this long, then probe once
+    LAFRICAMOBILE_HEDGE_TRANSLATE: bool = True # Duplicate slow translate calls (idempotent)
+    LAFRICAMOBILE_HEDGE_PERCENTILE: float = 90.0 # Hedge once a call is slower than this percentile of recent calls
+
+    # Tool-calling loop budget per chat turn
+    CHAT_MAX_TOOL_ITERATIONS: int = 4 # LLM round trips that may request tools before a forced text answer
+    CHAT_TOOL_LOOP_TOKEN_BUDGET: int = 20000 # Prompt + completion tokens per turn before a forced text answer
+
+    # Text language identification: local n-gram detector, LLM fallback below this confidence
+    TEXT_LID_MIN_CONFIDENCE: float = 0.9
+    TEXT_LID_MIN_WORDS: int = 2 # Shorter inputs ("ok", "merci") keep the session language (else a confident local guess, else French)
+
+    # Intent fast path: the local classifier is trusted for appointment/doctor turns above this
+    INTENT_CLASSIFIER_MIN_CONFIDENCE: float = 0.85
+
+    # Chat history (prompt size control)
+    CHAT_HISTORY_WINDOW: int = 10 # Recent messages kept verbatim, older ones are folded into the session summary
+    CHAT_HISTORY_TOKEN_BUDGET: int = 2500 # Approximate token budget for summary + recent history
+
+    # Idempotency-Key support on chat endpoints (mobile client retries)
+    IDEMPOTENCY_TTL_SECONDS: float = 600.0 # How long a completed response is replayed for the same key
+
+    # Batch chat replay (QA of system prompts / KB)
+    EMBEDDING_CACHE_SIZE: int = 2048 # Query embeddings kept in memory by RAGService
+    CHAT_BATCH_MAX_ITEMS: int = 1000
+    CHAT_BATCH_MAX_CONCURRENCY: int = 16
     UPLOAD_DIR: str = "uploads"
 
+    # Audio decoding (ffmpeg subprocesses, in memory)
+    AUDIO_FFMPEG_CONCURRENCY: int = 4 # Max concurrent ffmpeg decodes
+    AUDIO_NORMALIZE_TIMEOUT: float = 30.0 # Kill ffmpeg after this many seconds
+    AUDIO_MAX_UPLOAD_BYTES: int = 20 * 1024 * 1024 # Voice uploads above this are rejected (413)
+    AUDIO_MAX_DURATION_SECONDS: float = 120.0 # Longer recordings are rejected (413); decoding stops just past it
+    AUDIO_OUTPUT_FORMAT: str = "mp3" # Response audio: opus, aac or mp3 (instances/clients may ask for another)
+    AUDIO_OUTPUT_BITRATE: str = "48k" # Bitrate when transcoding (mono speech)
+    UPLOADS_CACHE_MAX_AGE: int = 30 * 24 * 3600 # Cache-Control max-age for audio served from /uploads
+    AUDIO_VAD_TRIM_STT: bool = True # Send only the speech (leading/trailing silence cut) to Whisper/LAfricaMobile
+    AUDIO_VAD_MIN_TRIM_SECONDS: float = 0.5 # Below this much silence, the original audio is sent as is
+
+    # Spoken language identification (MMS-LID) window
+    LID_WINDOW_SECONDS: float = 6.0 # Speech classified first (0 = whole recording)
+    LID_EXTEND_BELOW_CONFIDENCE: float = 0.6 # Below this confidence the window is doubled and LID re-run
+    LID_MAX_WINDOW_SECONDS: float = 24.0
+
+    # Speculative STT: Whisper (auto language) runs alongside MMS-LID instead of after it
+    STT_SPECULATIVE: bool = True
+    STT_SPECULATIVE_WOLOF_CONFIDENCE: float = 0.6 # LID confidence needed to drop Whisper's result for LAfricaMobile
+    STT_SPECULATIVE_MAX_SECONDS: float = 60.0 # Longer recordings go sequential (a discarded Whisper call is still billed)
+    STT_SPECULATIVE_MAX_WOLOF_SHARE: float = 0.5 # Stop speculating while more recent turns than this go to LAfricaMobile
+    STT_SPECULATIVE_WINDOW: int = 200 # Recent routing decisions behind that share
+
+    # Streaming voice input (WebSocket /chat/stream): incremental VAD + LID while the user speaks
+    VOICE_STREAM_MAX_CONCURRENT: int = 32 # Open streams per app worker (others are closed with 1013)
+    VOICE_STREAM_END_SILENCE_MS: int = 700 # Trailing silence that ends the utterance
+    VOICE_STREAM_NO_SPEECH_SECONDS: float = 8.0 # Give up when no speech starts within this time
+    VOICE_STREAM_IDLE_SECONDS: float = 10.0 # Close streams that send nothing for this long
+    VOICE_STREAM_LID_FIRST_SECONDS: float = 2.0 # Speech before the first LID attempt (then doubled up to LID_MAX_WINDOW_SECONDS)
+
+    # Local models (MMS-LID, wolof-asr, ADIA_TTS, xTTS): see app/services/model_registry.py
+    LOCAL_MODELS_PRELOAD: List[str] = ["mms_lid"] # Loaded and warmed up at startup, never unloaded for idleness
+    LOCAL_MODELS_MAX_BYTES: int = 10 * 1024 * 1024 * 1024 # RAM budget for resident models (16 GB nodes)
+    LOCAL_MODELS_IDLE_SECONDS: float = 1800.0 # Unload models unused for this long (0 disables)
+
+    # Local inference: in-process thread pool, or worker processes over unix sockets (scripts/inference_server.py)
+    INFERENCE_SOCKET_DIR: Optional[str] = None # Set to use the inference workers (one model copy for all uvicorn workers)
+    INFERENCE_WORKERS: Dict[str, Dict[str, Any]] = {
+        "lid": {"models": ["mms_lid"], "torch_threads": 4, "concurrency": 2},
+        "asr": {"models": ["wolof_asr"], "torch_threads": 4, "concurrency": 1},
+        "tts": {"models": ["adia_tts", "xtts"], "torch_threads": 4, "concurrency": 1},
+    } # Worker process per group; concurrency = tasks in flight per model (others queue)
+    INFERENCE_TORCH_THREADS: int = 4 # torch intra-op threads for in-process inference
+    INFERENCE_TIMEOUT: float = 60.0 # Max wait for a result from an inference worker
+    INFERENCE_BATCHING: Dict[str, Dict[str, float]] = {
+        "detect_language": {"max_size": 8, "max_wait_ms": 10.0},
+    } # Micro-batching of concurrent calls (max_size 1 disables); batches per model = its concurrency
+
+    # Uploads lifecycle (UPLOAD_DIR/<ab>/<cd>/<file>, retention sweeper)
+    UPLOADS_SHARDED: bool = True # New files go to hash-sharded subdirectories
+    UPLOADS_RETENTION_DAYS: int = 90 # Chat audio kept on disk, for entities without audio_retention_days (0 = forever)
+    UPLOADS_RETENTION_ACTION: str = "archive" # Expired audio: "archive" (moved to MinIO) or "delete"
+    UPLOADS_ARCHIVE_PREFIX: str = "audio-archive/" # MinIO object prefix for archived audio
+    UPLOADS_SWEEP_INTERVAL_SECONDS: float = 3600.0 # Retention sweep + disk usage scan period (0 disables)
+    UPLOADS_SWEEP_BATCH: int = 500 # Messages processed per database round trip
+
+    # TTS audio cache (UPLOAD_DIR/tts_<hash>.<ext>, metadata in the tts_cache table)
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024 # LRU eviction above this size
+    TTS_CACHE_MAX_TEXT_CHARS: int = 1000 # Longer (one-off) answers are synthesized uncached
+
     # MinIO
     MINIO_ENDPOINT: str = "localhost:9100" # External access
     MINIO_ACCESS_KEY: str = "minioadmin"
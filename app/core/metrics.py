@@ -0,0 +1,69 @@
+import threading
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict
+
+
+def _key(name: str, labels: Dict[str, Any]) -> str:
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={labels[k]}" for k in sorted(labels)) + "}"
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry (counters, gauges, summaries).
+    Values are per worker process; exposed as JSON on GET /api/v1/metrics.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._summaries: Dict[str, Dict[str, float]] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def increment(self, name: str, value: float = 1.0, **labels):
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sample (latency, size...). Keeps count/sum/max and the last `window` samples for percentiles."""
+        key = _key(name, labels)
+        with self._lock:
+            summary = self._summaries.setdefault(key, {"count": 0, "sum": 0.0, "max": float("-inf")})
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(value)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0.0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            summaries = {}
+            for key, summary in self._summaries.items():
+                samples = sorted(self._samples[key])
+                pick = lambda pct: samples[min(len(samples) - 1, int(len(samples) * pct))]
+                summaries[key] = {
+                    "count": summary["count"],
+                    "mean": summary["sum"] / summary["count"],
+                    "max": summary["max"],
+                    "p50": pick(0.50),
+                    "p95": pick(0.95),
+                    "p99": pick(0.99),
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": summaries,
+            }
+
+
+metrics = Metrics()
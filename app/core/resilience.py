@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+from app.core.metrics import metrics
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open (caller falls back immediately)."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when the turn has no time budget left for an optional upstream call."""
+
+
+class CircuitBreaker:
+    """
+    Per-operation circuit breaker.
+    - closed: calls go through; `failure_threshold` consecutive failures or slow calls open it
+    - open: calls are rejected with CircuitOpenError for `open_seconds`
+    - half-open: one probe call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, slow_call_seconds: Optional[float] = None, open_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                metrics.increment("circuit_rejections", circuit=self.name)
+                raise CircuitOpenError(f"{self.name}: circuit open")
+            self._set_state("half_open")
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                metrics.increment("circuit_rejections", circuit=self.name)
+                raise CircuitOpenError(f"{self.name}: circuit half-open, probe in flight")
+            self._probe_in_flight = True
+
+    def record_success(self, duration: float):
+        if self.slow_call_seconds is not None and duration > self.slow_call_seconds:
+            metrics.increment("circuit_slow_calls", circuit=self.name)
+            self.record_failure()
+            return
+        self._probe_in_flight = False
+        self._failures = 0
+        if self.state != "closed":
+            self._set_state("closed")
+
+    def record_failure(self):
+        self._probe_in_flight = False
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+    def release_probe(self):
+        """Call ended without a verdict (e.g. cut by the turn deadline): let the next call probe."""
+        self._probe_in_flight = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"[Circuit] {self.name}: {self.state} -> {state}")
+        self.state = state
+        metrics.set_gauge("circuit_open", 1 if state == "open" else 0, circuit=self.name)
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_circuit_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Shared breaker per upstream operation (kwargs only apply on first creation)."""
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = CircuitBreaker(name, **kwargs)
+        _breakers[name] = breaker
+    return breaker
+
+
+# --- Per-turn deadline ---
+# Stored in a context variable so it follows the request through every stage
+# (and into tasks created from it) without threading a parameter everywhere.
+_deadline: ContextVar[Optional[float]] = ContextVar("turn_deadline", default=None)
+
+@contextmanager
+def turn_deadline(seconds: Optional[float]):
+    """`with turn_deadline(45):` around a chat turn. None disables the budget."""
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left in the current turn, or None when no deadline is set."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def stage_timeout(cap: float, floor: float = 0.0) -> float:
+    """Timeout for one stage: its own cap, clipped to the turn budget, never below `floor`."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return cap
+    return max(floor, min(cap, remaining))
+
+
+class LatencyTracker:
+    """Recent successful call durations, for hedging thresholds."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float, min_samples: int = 20) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def hedged(
+    send: Callable[[], Awaitable[Any]], hedge_after: Optional[float], name: str,
+    send_duplicate: Optional[Callable[[], Awaitable[Any]]] = None
+) -> Any:
+    """
+    Run `send()`; if it has not finished after `hedge_after` seconds, start a duplicate
+    (`send_duplicate()`, default `send()`) and return whichever succeeds first (the other
+    is cancelled). Only for idempotent calls.
+    """
+    first = asyncio.create_task(send())
+    tasks = [first]
+    try:
+        if hedge_after is None:
+            return await first
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return first.result()
+
+        metrics.increment("hedged_requests", upstream=name)
+        tasks.append(asyncio.create_task((send_duplicate or send)()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() is None:
+                    if task is not first:
+                        metrics.increment("hedged_requests_won", upstream=name)
+                    return task.result()
+        return first.result()  # Both failed: surface the primary's error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -1,6 +1,7 @@
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.crud.base import CRUDBase
 from app.models.chat import Session, Message
@@ -22,9 +23,46 @@ class CRUDSession(CRUDBase[Session, SessionCreate, SessionCreate]):
 
 class CRUDMessage(CRUDBase[Message, MessageCreate, MessageBase]):
     async def get_by_session_id(self, db: AsyncSession, *, session_id: UUID) -> List[Message]:
-        query = select(self.model).filter(self.model.session_id == session_id)
+        query = (
+            select(self.model)
+            .filter(self.model.session_id == session_id)
+            .order_by(self.model.created_at.asc())
+        )
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_after(
+        self, db: AsyncSession, *, session_id: UUID, after: Optional[datetime] = None, limit: int = 50
+    ) -> List[Message]:
+        """Messages newer than `after` (all if None), oldest first, capped to the `limit` most recent."""
+        query = select(self.model).filter(self.model.session_id == session_id)
+        if after is not None:
+            query = query.filter(self.model.created_at > after)
+        query = query.order_by(self.model.created_at.desc()).limit(limit)
+        result = await db.execute(query)
+        return list(reversed(result.scalars().all()))
+
+    async def get_usage_by_entity(self, db: AsyncSession, *, entity_id: UUID) -> dict:
+        """Sum of recorded LLM usage over all assistant messages of an entity."""
+        query = (
+            select(
+                func.count(self.model.message_id),
+                func.coalesce(func.sum(self.model.prompt_tokens), 0),
+                func.coalesce(func.sum(self.model.cached_tokens), 0),
+                func.coalesce(func.sum(self.model.completion_tokens), 0),
+            )
+            .join(Session, Session.session_id == self.model.session_id)
+            .filter(Session.entity_id == entity_id, self.model.role == "assistant", self.model.tokens.is_not(None))
+        )
+        count, prompt_tokens, cached_tokens, completion_tokens = (await db.execute(query)).one()
+        return {
+            "entity_id": entity_id,
+            "assistant_messages": count,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_hit_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        }
+
 session = CRUDSession(Session)
 message = CRUDMessage(Message)
@@ -1,9 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.api import uploads
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -22,8 +22,33 @@ if True: # settings.BACKEND_CORS_ORIGINS:
 
 app.include_router(api_router, prefix="/api/v1")
 
-# Serve uploaded files (audio) statically
-app.mount("/uploads", StaticFiles(directory=settings.UPLOAD_DIR), name="uploads")
+@app.on_event("startup")
+async def warm_up_local_models():
+    # Preloads LOCAL_MODELS_PRELOAD before traffic is accepted (no cold start on the first voice message)
+    if settings.INFERENCE_SOCKET_DIR:
+        return  # Models live in the inference workers (scripts/inference_server.py)
+    from app.services import local_models  # noqa: F401 (registers the local models)
+    from app.services.model_registry import model_registry
+    await model_registry.start()
+
+@app.on_event("shutdown")
+async def stop_local_models():
+    from app.services.model_registry import model_registry
+    await model_registry.stop()
+
+@app.on_event("startup")
+async def start_uploads_sweeper():
+    # Retention (archive/delete of old chat audio) and disk usage gauges for UPLOAD_DIR
+    from app.services.uploads_sweeper import uploads_sweeper
+    await uploads_sweeper.start()
+
+@app.on_event("shutdown")
+async def stop_uploads_sweeper():
+    from app.services.uploads_sweeper import uploads_sweeper
+    await uploads_sweeper.stop()
+
+# Serve uploaded files (audio) with Range/ETag/cache headers
+app.include_router(uploads.router)
 
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -7,3 +7,4 @@ from app.models.doctor import Doctor
 from app.models.timeslot import TimeSlot
 from app.models.appointment import Appointment, AppointmentStatus
 from app.models.custom_chat import CustomChatConfig, CustomChatMessage
+from app.models.tts_cache import TTSCacheEntry
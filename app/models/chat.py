@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import List, Optional
 from sqlalchemy import String, Text, ForeignKey, Integer, Boolean, DateTime
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from pgvector.sqlalchemy import Vector
 from app.models.base import Base, TimestampMixin
 
@@ -25,6 +25,9 @@ class Session(Base, TimestampMixin):
     speaker_id: Mapped[Optional[uuid.UUID]] = mapped_column(ForeignKey("speakers.speaker_id"), nullable=True)
     expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    # Rolling summary of the messages older than the verbatim history window
+    summary: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    summarized_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Relations
     entity: Mapped["Entity"] = relationship(back_populates="sessions")
@@ -43,6 +46,13 @@ class Message(Base, TimestampMixin):
     translated_content: Mapped[Optional[str]] = mapped_column(Text, nullable=True) # French translation if content is in another language
     audio_path: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # LLM usage for assistant messages (summed over the tool loop); cached = upstream prompt-cache hits
+    prompt_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    cached_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    completion_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Structured tool-call data so history can be rebuilt as OpenAI messages without re-parsing text
+    tool_call_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Set on role='tool' rows
+    tool_calls: Mapped[Optional[List[dict]]] = mapped_column(JSONB, nullable=True)  # [{"id", "name", "arguments"}]
 
     # Relations
     session: Mapped["Session"] = relationship(back_populates="messages")
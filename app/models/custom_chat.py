@@ -19,6 +19,9 @@ class CustomChatConfig(Base, TimestampMixin):
     question: Mapped[str] = mapped_column(Text, nullable=False)
     response: Mapped[str] = mapped_column(Text, nullable=False)
     response_lang: Mapped[str] = mapped_column(String(10), nullable=False, default="fr")  # 'fr', 'wo', 'en', etc.
+    # Pre-synthesized audio of `response` (generated in the background when the config is saved)
+    audio_url: Mapped[str] = mapped_column(String(500), nullable=True)
+    audio_status: Mapped[str] = mapped_column(String(20), nullable=True)  # 'pending', 'ready', 'failed'
 
 
 class CustomChatMessage(Base, TimestampMixin):
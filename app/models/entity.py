@@ -1,6 +1,6 @@
 import uuid
 from typing import List, Optional
-from sqlalchemy import String, Text, ForeignKey
+from sqlalchemy import Integer, String, Text, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from app.models.base import Base, TimestampMixin
@@ -16,6 +16,7 @@ class Entity(Base, TimestampMixin):
     system_prompt: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Custom chatbot personality
     dashboard_modules: Mapped[Optional[List[str]]] = mapped_column(JSONB, nullable=True, default=list)  # e.g. ["personnel"]
     custom_dashboard_component: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # e.g. "govathon"
+    audio_retention_days: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # Chat audio kept on disk (None = UPLOADS_RETENTION_DAYS, 0 = forever)
 
     # Relations
     instances: Mapped[List["Instance"]] = relationship(back_populates="entity", cascade="all, delete-orphan")
@@ -32,6 +33,7 @@ class Instance(Base, TimestampMixin):
     name: Mapped[str] = mapped_column(Text, nullable=False)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     api_key: Mapped[str] = mapped_column(Text, unique=True, nullable=False)
+    audio_format: Mapped[Optional[str]] = mapped_column(String(10), nullable=True)  # opus, aac, mp3 (None = server default)
 
     # Relations
     entity: Mapped["Entity"] = relationship(back_populates="instances")
@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import String, Text, Integer, BigInteger, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.models.base import Base, TimestampMixin
+
+class TTSCacheEntry(Base, TimestampMixin):
+    """Synthesized audio stored once per (normalized text, language, voice, backend, model)."""
+    __tablename__ = "tts_cache"
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True) # sha256 hex
+    backend: Mapped[str] = mapped_column(String(50), nullable=False) # 'openai', 'lafricamobile'
+    model: Mapped[str] = mapped_column(String(100), nullable=False)
+    voice: Mapped[str] = mapped_column(String(100), nullable=False)
+    language: Mapped[str] = mapped_column(String(10), nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    file_path: Mapped[str] = mapped_column(String(500), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
+    )
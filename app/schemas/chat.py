@@ -1,4 +1,4 @@
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from uuid import UUID
 from datetime import datetime
 from pydantic import BaseModel
@@ -28,6 +28,11 @@ class MessageBase(BaseModel):
     translated_content: Optional[str] = None
     audio_path: Optional[str] = None
     tokens: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    tool_call_id: Optional[str] = None
+    tool_calls: Optional[List[Dict[str, Any]]] = None
 
 class MessageCreate(MessageBase):
     session_id: UUID
@@ -41,3 +46,26 @@ class MessageResponse(MessageBase):
 
     class Config:
         from_attributes = True
+
+# --- LLM usage ---
+class LLMUsageResponse(BaseModel):
+    entity_id: UUID
+    assistant_messages: int
+    prompt_tokens: int
+    cached_tokens: int
+    completion_tokens: int
+    cache_hit_ratio: float
+
+# --- Batch replay (QA) ---
+class ChatBatchItem(BaseModel):
+    instance_id: str
+    text: str
+    forced_language: Optional[str] = None
+    session_id: Optional[str] = None
+    id: Optional[str] = None # Caller reference echoed in the result line
+
+class ChatBatchRequest(BaseModel):
+    items: List[ChatBatchItem]
+    concurrency: int = 8
+    synthesize_audio: bool = False
+    persist: bool = False
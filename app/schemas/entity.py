@@ -12,6 +12,7 @@ class EntityBase(BaseModel):
     system_prompt: Optional[str] = None  # Custom chatbot personality
     dashboard_modules: Optional[List[str]] = None  # e.g. ["personnel"]
     custom_dashboard_component: Optional[str] = None  # e.g. "govathon"
+    audio_retention_days: Optional[int] = None  # None = server default, 0 = keep forever
 
 class EntityCreate(EntityBase):
     pass
@@ -30,6 +31,7 @@ class EntityResponse(EntityBase):
 class InstanceBase(BaseModel):
     name: str
     description: Optional[str] = None
+    audio_format: Optional[str] = None # Response audio: opus, aac, mp3 (None = AUDIO_OUTPUT_FORMAT)
 
 class InstanceCreate(InstanceBase):
     entity_id: UUID
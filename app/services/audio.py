@@ -1,9 +1,65 @@
 import os
 import uuid
-import shutil
-from typing import Tuple, List, Optional
+from collections import deque
+from typing import Tuple, List, Optional, TYPE_CHECKING
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.admission import upstream_slot
+from app.core.resilience import stage_timeout
+from app.services.inference import inference_service
+from app.services.upload_storage import new_upload_path
+
+if TYPE_CHECKING:
+    from app.services.audio_clip import AudioClip
+
+
+def stt_language(detected_lang: Optional[str]) -> str:
+    """Target language for STT from an MMS-LID code ('wol' -> 'wo'; French when LID failed)."""
+    return "wo" if detected_lang == "wol" else (detected_lang or "fr")
+
+
+def stt_backend(target_lang: str) -> str:
+    """STT API a target language is routed to."""
+    return "lafricamobile" if target_lang == "wo" else "whisper"
+
+
+# Map ISO-639-3 (3-letter) codes to ISO-639-1 (2-letter) for Whisper
+# Whisper only accepts ISO-639-1 codes
+ISO639_3_TO_1 = {
+    "fra": "fr", "eng": "en", "ara": "ar", "spa": "es", "deu": "de",
+    "ita": "it", "por": "pt", "rus": "ru", "jpn": "ja", "kor": "ko",
+    "zho": "zh", "hin": "hi", "tur": "tr", "pol": "pl", "nld": "nl",
+    "swe": "sv", "dan": "da", "nor": "no", "fin": "fi", "ces": "cs",
+    "hun": "hu", "ron": "ro", "ell": "el", "heb": "he", "tha": "th",
+    "vie": "vi", "ind": "id", "mal": "ms", "ukr": "uk", "cat": "ca",
+    "aze": "az", "kaz": "kk", "uzb": "uz", "tat": "tt",
+}
+
+# Valid ISO-639-1 codes Whisper accepts (subset of common ones)
+VALID_WHISPER_LANGS = {
+    "fr", "en", "ar", "es", "de", "it", "pt", "ru", "ja", "ko",
+    "zh", "hi", "tr", "pl", "nl", "sv", "da", "no", "fi", "cs",
+    "hu", "ro", "el", "he", "th", "vi", "id", "ms", "uk", "ca",
+    "az", "kk", "uz"
+}
+
+# Language names returned by Whisper (verbose_json) for the codes above
+WHISPER_LANGUAGE_NAMES = {
+    "french": "fr", "english": "en", "arabic": "ar", "spanish": "es", "german": "de",
+    "italian": "it", "portuguese": "pt", "russian": "ru", "japanese": "ja", "korean": "ko",
+    "chinese": "zh", "hindi": "hi", "turkish": "tr", "polish": "pl", "dutch": "nl",
+    "swedish": "sv", "danish": "da", "norwegian": "no", "finnish": "fi", "czech": "cs",
+    "hungarian": "hu", "romanian": "ro", "greek": "el", "hebrew": "he", "thai": "th",
+    "vietnamese": "vi", "indonesian": "id", "malay": "ms", "ukrainian": "uk", "catalan": "ca",
+    "azerbaijani": "az", "kazakh": "kk", "uzbek": "uz",
+}
+
+
+def whisper_language(target_lang: Optional[str]) -> Optional[str]:
+    """ISO-639-1 code to pass to Whisper for a target language, None to let Whisper auto-detect."""
+    lang = ISO639_3_TO_1.get(target_lang) if target_lang and len(target_lang) == 3 else target_lang
+    return lang if lang in VALID_WHISPER_LANGS else None
 
 class AudioService:
     def __init__(self, upload_dir: str):
@@ -14,7 +70,8 @@ class AudioService:
         self.client = AsyncOpenAI(
             api_key=settings.OPENAI_API_KEY,
             timeout=settings.OPENAI_TIMEOUT,
-            max_retries=settings.OPENAI_MAX_RETRIES
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            base_url=settings.OPENAI_BASE_URL
         )
         
         # OpenAI Models
@@ -22,29 +79,17 @@ class AudioService:
         self.tts_model = "tts-1"
         self.tts_voice = "nova"  # alloy, echo, fable, onyx, nova, shimmer
         
-        # ADIA_TTS for Wolof (lazy loaded)
-        self._adia_model = None
-        self._adia_tokenizer = None
-        self._adia_device = None
-
-        # xTTS for Wolof (lazy loaded via GalsenAI)
-        self._xtts_model = None
-        self._xtts_latents = None
-        self._xtts_device = None
-        self._xtts_ref_audio = None
-
-        # Wolof STT (dofbi/wolof-asr)
-        self._wolof_stt_model = None
-        self._wolof_stt_processor = None
-        self._wolof_stt_device = None
-
-        # Facebook MMS-LID for language detection (lazy loaded)
-        self._mms_lid_model = None
-        self._mms_lid_processor = None
-        self._mms_lid_device = None
+        # Local models (MMS-LID, dofbi/wolof-asr, ADIA_TTS, xTTS) run through the inference
+        # service (app/services/local_models.py): in-process pool or inference worker processes.
 
         # LAfricaMobile Service (lazy loaded)
         self._lafricamobile_service = None
+        
+        # TTS audio cache (lazy loaded)
+        self._tts_cache = None
+
+        # Recent STT routes (1 = Wolof/LAfricaMobile), cost guard of speculative STT
+        self._routes = deque(maxlen=settings.STT_SPECULATIVE_WINDOW)
 
     def _get_lafricamobile_service(self):
         if self._lafricamobile_service is None:
@@ -52,122 +97,103 @@ class AudioService:
             self._lafricamobile_service = LAfricaMobileService()
         return self._lafricamobile_service
 
-    def _load_adia_tts(self):
-        """Lazy load ADIA_TTS model for Wolof synthesis."""
-        if self._adia_model is None:
-            print("[Wolof] Loading ADIA_TTS model...")
-            try:
-                import torch
-                from parler_tts import ParlerTTSForConditionalGeneration
-                from transformers import AutoTokenizer
-                
-                self._adia_device = "cuda:0" if torch.cuda.is_available() else "cpu"
-                self._adia_model = ParlerTTSForConditionalGeneration.from_pretrained(
-                    "CONCREE/Adia_TTS"
-                ).to(self._adia_device)
-                self._adia_tokenizer = AutoTokenizer.from_pretrained("CONCREE/Adia_TTS")
-                print(f"[Wolof] ADIA_TTS loaded on {self._adia_device}")
-            except Exception as e:
-                print(f"[Wolof] Failed to load ADIA_TTS: {e}")
-                raise
-
     async def save_upload_file(self, upload_file) -> str:
-        file_path = os.path.join(self.upload_dir, f"{uuid.uuid4()}.wav")
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(upload_file.file, buffer)
-        return file_path
+        return (await self.receive_upload(upload_file)).path
 
-    def _load_mms_lid(self):
-        """Lazy load Facebook MMS-LID model for language identification."""
-        if self._mms_lid_model is None:
-            print("[LID] Loading Facebook MMS-LID-256 model...")
-            try:
-                from transformers import Wav2Vec2ForSequenceClassification, AutoFeatureExtractor
-                import torch
-                
-                model_id = "facebook/mms-lid-256"
-                self._mms_lid_device = "cuda" if torch.cuda.is_available() else "cpu"
-                self._mms_lid_processor = AutoFeatureExtractor.from_pretrained(model_id)
-                self._mms_lid_model = Wav2Vec2ForSequenceClassification.from_pretrained(model_id).to(self._mms_lid_device)
-                
-                print(f"[LID] MMS-LID loaded on {self._mms_lid_device}")
-            except Exception as e:
-                print(f"[LID] Failed to load MMS-LID: {e}")
-                raise e
+    async def receive_upload(self, upload_file, chunk_size: int = 256 * 1024) -> "AudioClip":
+        """
+        Stream an audio upload to disk without blocking the event loop.
+        - chunked reads, disk writes offloaded to a thread
+        - rejects uploads over AUDIO_MAX_UPLOAD_BYTES (413) and unknown formats (415)
+        - sniffs the real format for the file extension and hashes the content while streaming
+        Returns the AudioClip (bytes kept in memory for LID/STT, path and sha256 set).
+        """
+        import asyncio
+        import hashlib
+        from fastapi import HTTPException
+        from app.services.audio_clip import AudioClip, sniff_audio_format
 
-    async def _detect_language(self, file_path: str) -> Tuple[str, float]:
+        loop = asyncio.get_event_loop()
+        max_bytes = settings.AUDIO_MAX_UPLOAD_BYTES
+        hasher = hashlib.sha256()
+        chunks = []
+        size = 0
+        audio_format = None
+        tmp_path = os.path.join(self.upload_dir, f"{uuid.uuid4()}.part")
+        out = await loop.run_in_executor(None, open, tmp_path, "wb")
+        try:
+            while True:
+                chunk = await upload_file.read(chunk_size)
+                if not chunk:
+                    break
+                if audio_format is None:
+                    audio_format = sniff_audio_format(chunk)
+                    if audio_format is None:
+                        raise HTTPException(status_code=415, detail="Unsupported audio format")
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"Audio upload exceeds {max_bytes // (1024 * 1024)} MB")
+                hasher.update(chunk)
+                chunks.append(chunk)
+                await loop.run_in_executor(None, out.write, chunk)
+            await loop.run_in_executor(None, out.close)
+            if size == 0:
+                raise HTTPException(status_code=400, detail="Empty audio upload")
+
+            file_path = new_upload_path(f".{audio_format}", self.upload_dir)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            out.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        clip = AudioClip(b"".join(chunks), filename=os.path.basename(file_path), path=file_path)
+        clip.sha256 = hasher.hexdigest()
+        clip.format = audio_format
+        return clip
+
+    async def _detect_language(self, clip: "AudioClip") -> Tuple[str, float]:
         """
         Detect language from audio using Facebook MMS-LID.
         Returns (language_code, confidence).
         Wolof = 'wol', French = 'fra', English = 'eng', etc.
         """
-        import asyncio
-        import librosa
-        import torch
-        import imageio_ffmpeg
-        import subprocess
-        
-        self._load_mms_lid()
-        
-        def run_detection():
-            # Convert audio to 16kHz mono WAV
-            ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-            temp_wav = f"{file_path}_lid.wav"
-            
-            try:
-                cmd = [ffmpeg_path, "-y", "-i", file_path, "-ar", "16000", "-ac", "1", temp_wav]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                load_path = temp_wav
-            except Exception as e:
-                print(f"[LID] Audio conversion warning: {e}")
-                load_path = file_path
-            
-            try:
-                # Load audio
-                audio, _ = librosa.load(load_path, sr=16000)
-                print(f"[LID] Audio loaded: {len(audio)/16000:.1f}s duration")
-                
-                # Process
-                inputs = self._mms_lid_processor(audio, sampling_rate=16000, return_tensors="pt")
-                inputs = {k: v.to(self._mms_lid_device) for k, v in inputs.items()}
-                
-                with torch.no_grad():
-                    outputs = self._mms_lid_model(**inputs).logits
-                
-                # Get prediction
-                probs = torch.softmax(outputs, dim=-1)
-                
-                # Show top 5 detected languages for debugging
-                top5_probs, top5_indices = torch.topk(probs[0], 5)
-                print("[LID] ===== MMS-LID Detection Results =====")
-                for i, (prob, idx) in enumerate(zip(top5_probs, top5_indices)):
-                    lang_code = self._mms_lid_model.config.id2label[idx.item()]
-                    is_wolof = " <-- WOLOF!" if lang_code == "wol" else ""
-                    print(f"[LID]   #{i+1}: {lang_code} ({prob.item():.1%}){is_wolof}")
-                print("[LID] ========================================")
-                
-                lang_id = torch.argmax(probs, dim=-1)[0].item()
-                confidence = probs[0, lang_id].item()
-                detected_lang = self._mms_lid_model.config.id2label[lang_id]
-                
-                # Explicit Wolof check
-                if detected_lang == "wol":
-                    print(f"[LID] ✓ WOLOF DETECTED with {confidence:.1%} confidence!")
-                else:
-                    print(f"[LID] ✗ Not Wolof. Detected: {detected_lang} ({confidence:.1%})")
-                
-                return detected_lang, confidence
-            finally:
-                if os.path.exists(temp_wav):
-                    try:
-                        os.remove(temp_wav)
-                    except:
-                        pass
-        
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, run_detection)
+        # Decoded once per request, silence trimmed (shorter input, LID only needs speech)
+        speech = await self._load_pcm_16k(clip, "[LID]", speech_only=True)
+
+        # Classify the first LID_WINDOW_SECONDS of speech; widen the window only while unsure
+        window = settings.LID_WINDOW_SECONDS or len(speech) / 16000
+        while True:
+            segment = speech[:int(window * 16000)]
+            lang, confidence = await inference_service.run("detect_language", segment)
+            metrics.observe("lid_audio_seconds", len(segment) / 16000)
+            if (confidence >= settings.LID_EXTEND_BELOW_CONFIDENCE or len(segment) >= len(speech)
+                    or window >= settings.LID_MAX_WINDOW_SECONDS):
+                return lang, confidence
+            window = min(window * 2, settings.LID_MAX_WINDOW_SECONDS)
+            metrics.increment("lid_window_extensions")
+            print(f"[LID] Low confidence ({confidence:.1%}), extending window to {window:.0f}s")
 
-    async def transcribe(self, file_path: str, forced_language: Optional[str] = None) -> Tuple[str, str]:
+    async def _load_pcm_16k(self, clip: "AudioClip", log_prefix: str, speech_only: bool = False):
+        """16kHz mono float32 samples for the local models (librosa fallback if ffmpeg fails)."""
+        from app.services.audio_normalize import AudioDecodeError
+
+        try:
+            return await (clip.speech_samples() if speech_only else clip.samples())
+        except AudioDecodeError as e:
+            if not clip.path:
+                raise
+            print(f"{log_prefix} Audio conversion warning: {e}")
+            import asyncio
+            import librosa
+            loop = asyncio.get_event_loop()
+            audio, _ = await loop.run_in_executor(None, lambda: librosa.load(clip.path, sr=16000))
+            return audio
+
+    async def transcribe(
+        self, file_path: str, forced_language: Optional[str] = None, clip: Optional["AudioClip"] = None
+    ) -> Tuple[str, str]:
         """
         Transcribe audio with automatic language detection or forced language.
         Pipeline:
@@ -175,8 +201,14 @@ class AudioService:
         2. Else, detect language with Facebook MMS-LID
         3. If Wolof (forced 'wo' or detected 'wol') -> use LAfricaMobile
         4. Otherwise -> use OpenAI Whisper with language parameter
+        The audio is decoded at most once (AudioClip) and shared by LID and the STT backends.
         Returns (transcribed_text, language_code).
         """
+        from app.services.audio_clip import AudioClip
+
+        if clip is None:
+            clip = await AudioClip.from_path(file_path)
+
         detected_lang = None
         confidence = 0.0
         
@@ -185,69 +217,137 @@ class AudioService:
             # Map 'wo' to 'wol' for consistency with detection codes if needed, 
             # but we use 'wo' as our internal standard.
             target_lang = forced_language
+        elif await self._should_speculate(clip):
+            # Whisper (auto language) runs while MMS-LID classifies: LID latency off the critical path
+            return await self._transcribe_speculative(clip)
         else:
             # Step 1: Detect language using MMS-LID
             try:
-                detected_lang, confidence = await self._detect_language(file_path)
+                detected_lang, confidence = await self._detect_language(clip)
                 print(f"[LID] Detected: {detected_lang} (confidence: {confidence:.1%})")
             except Exception as e:
                 print(f"[LID] Language detection failed ({e}), defaulting to OpenAI Whisper...")
-            target_lang = "wo" if detected_lang == "wol" else (detected_lang or "fr")
+            target_lang = stt_language(detected_lang)
+            self._record_route(target_lang)
 
         # Step 2: Route based on target language
-        if target_lang == "wo":
+        return await self.transcribe_in_language(clip, target_lang)
+
+    async def _should_speculate(self, clip: "AudioClip") -> bool:
+        """
+        Cost guard for speculative STT (a Whisper call is wasted whenever LID picks Wolof):
+        only for recordings up to STT_SPECULATIVE_MAX_SECONDS, while the openai.stt queue is
+        empty, and while recent traffic is not mostly Wolof.
+        """
+        from app.core.admission import get_admission_controller
+
+        if not settings.STT_SPECULATIVE:
+            return False
+        reason = None
+        if await clip.duration() > settings.STT_SPECULATIVE_MAX_SECONDS:
+            reason = "long_audio"
+        elif get_admission_controller("openai.stt").queue_depth:
+            reason = "upstream_busy"
+        elif len(self._routes) >= 20 and sum(self._routes) / len(self._routes) > settings.STT_SPECULATIVE_MAX_WOLOF_SHARE:
+            reason = "wolof_share"
+        if reason:
+            metrics.increment("stt_speculative_skipped", reason=reason)
+            return False
+        return True
+
+    def _record_route(self, target_lang: str):
+        # Recent LID routing decisions (1 = LAfricaMobile) for the speculation cost guard
+        self._routes.append(1 if stt_backend(target_lang) == "lafricamobile" else 0)
+        metrics.set_gauge("stt_wolof_share", sum(self._routes) / len(self._routes))
+
+    async def _transcribe_speculative(self, clip: "AudioClip") -> Tuple[str, str]:
+        """
+        Whisper with auto-detected language and MMS-LID started together, LID decides:
+        - Wolof with >= STT_SPECULATIVE_WOLOF_CONFIDENCE: Whisper is cancelled, LAfricaMobile transcribes
+        - otherwise Whisper's result is used, unless LID confidently heard another language than
+          Whisper detected (Whisper is re-run with LID's language as hint)
+        - speculative Whisper failed: sequential STT in LID's language
+        """
+        import asyncio
+
+        whisper = asyncio.create_task(self._transcribe_whisper(clip, None))
+        whisper.add_done_callback(lambda t: t.cancelled() or t.exception())  # Retrieved even if unused
+        try:
+            try:
+                detected_lang, confidence = await self._detect_language(clip)
+                print(f"[LID] Detected: {detected_lang} (confidence: {confidence:.1%})")
+            except Exception as e:
+                print(f"[LID] Language detection failed ({e}), using the Whisper result...")
+                detected_lang, confidence = None, 0.0
+            target_lang = stt_language(detected_lang)
+            self._record_route(target_lang)
+
+            if stt_backend(target_lang) == "lafricamobile" and confidence >= settings.STT_SPECULATIVE_WOLOF_CONFIDENCE:
+                whisper.cancel()
+                metrics.increment("stt_speculative", outcome="wolof")
+                return await self.transcribe_in_language(clip, target_lang)
+
+            try:
+                text, whisper_lang = await whisper
+            except Exception as e:
+                print(f"[STT] Speculative Whisper failed ({e}), transcribing in {target_lang}...")
+                metrics.increment("stt_speculative", outcome="whisper_failed")
+                return await self.transcribe_in_language(clip, target_lang)
+
+            lid_lang = whisper_language(target_lang) if detected_lang else None
+            heard_lang = WHISPER_LANGUAGE_NAMES.get(str(whisper_lang).lower(), whisper_lang)
+            if lid_lang and heard_lang != lid_lang and confidence >= settings.LID_EXTEND_BELOW_CONFIDENCE:
+                print(f"[STT] Whisper heard {whisper_lang}, LID {detected_lang}: re-running Whisper with the LID language")
+                metrics.increment("stt_speculative", outcome="redo")
+                return await self._transcribe_whisper(clip, target_lang)
+
+            metrics.increment("stt_speculative", outcome="hit")
+            return text, whisper_lang
+        finally:
+            if not whisper.done():
+                whisper.cancel()
+
+    async def transcribe_in_language(self, clip: "AudioClip", target_lang: str) -> Tuple[str, str]:
+        """
+        STT with the language already decided (forced, or detected by MMS-LID beforehand):
+        Wolof -> LAfricaMobile (Whisper as fallback), anything else -> Whisper.
+        Returns (transcribed_text, language_code).
+        """
+        if stt_backend(target_lang) == "lafricamobile":
             print("[STT] Wolof target! Using LAfricaMobile API...")
             try:
                 service = self._get_lafricamobile_service()
-                text = await service.stt(file_path, lang="wolof")
+                text = await service.stt(clip.path or clip.filename, lang="wolof", clip=clip)
                 print(f"[STT] LAfricaMobile result: {text[:60]}...")
                 return text, "wo"
             except Exception as e:
                 print(f"[STT] LAfricaMobile failed ({e}), falling back to Whisper...")
         
         # Fallback to OpenAI Whisper
-        print(f"[STT] Using OpenAI Whisper for language: {target_lang}...")
-        
-        # Map ISO-639-3 (3-letter) codes to ISO-639-1 (2-letter) for Whisper
-        # Whisper only accepts ISO-639-1 codes
-        ISO639_3_TO_1 = {
-            "fra": "fr", "eng": "en", "ara": "ar", "spa": "es", "deu": "de",
-            "ita": "it", "por": "pt", "rus": "ru", "jpn": "ja", "kor": "ko",
-            "zho": "zh", "hin": "hi", "tur": "tr", "pol": "pl", "nld": "nl",
-            "swe": "sv", "dan": "da", "nor": "no", "fin": "fi", "ces": "cs",
-            "hun": "hu", "ron": "ro", "ell": "el", "heb": "he", "tha": "th",
-            "vie": "vi", "ind": "id", "mal": "ms", "ukr": "uk", "cat": "ca",
-            "aze": "az", "kaz": "kk", "uzb": "uz", "tat": "tt",
-        }
-        
-        # Valid ISO-639-1 codes Whisper accepts (subset of common ones)
-        VALID_WHISPER_LANGS = {
-            "fr", "en", "ar", "es", "de", "it", "pt", "ru", "ja", "ko", 
-            "zh", "hi", "tr", "pl", "nl", "sv", "da", "no", "fi", "cs",
-            "hu", "ro", "el", "he", "th", "vi", "id", "ms", "uk", "ca",
-            "az", "kk", "uz"
+        return await self._transcribe_whisper(clip, target_lang)
+
+    async def _transcribe_whisper(self, clip: "AudioClip", target_lang: Optional[str]) -> Tuple[str, str]:
+        """OpenAI Whisper, with the language as hint when Whisper supports it (None = auto-detect)."""
+        print(f"[STT] Using OpenAI Whisper for language: {target_lang or 'auto'}...")
+        lang_for_whisper = whisper_language(target_lang)
+        
+        # Whisper takes compressed audio: the speech only (Ogg/Opus) or the original upload
+        whisper_args = {
+            "model": self.stt_model,
+            "file": await clip.stt_upload(),
+            "response_format": "verbose_json"
         }
-        
-        # Convert 3-letter to 2-letter if needed
-        lang_for_whisper = target_lang
-        if target_lang and len(target_lang) == 3:
-            lang_for_whisper = ISO639_3_TO_1.get(target_lang, None)
-            if lang_for_whisper:
-                print(f"[STT] Converted {target_lang} -> {lang_for_whisper}")
-        
-        with open(file_path, "rb") as audio_file:
-            whisper_args = {
-                "model": self.stt_model,
-                "file": audio_file,
-                "response_format": "verbose_json"
-            }
-            # Only pass language if it's a valid 2-letter code
-            if lang_for_whisper and lang_for_whisper in VALID_WHISPER_LANGS:
-                whisper_args["language"] = lang_for_whisper
-            else:
-                print(f"[STT] Language '{target_lang}' not in valid list, letting Whisper auto-detect")
+        # Only pass language if it's a valid 2-letter code
+        if lang_for_whisper:
+            whisper_args["language"] = lang_for_whisper
+        elif target_lang:
+            print(f"[STT] Language '{target_lang}' not in valid list, letting Whisper auto-detect")
 
-            transcript = await self.client.audio.transcriptions.create(**whisper_args)
+        async with upstream_slot("openai.stt"):
+            transcript = await self.client.audio.transcriptions.create(
+                **whisper_args,
+                timeout=stage_timeout(settings.OPENAI_TIMEOUT, floor=settings.CHAT_FALLBACK_FLOOR_SECONDS)
+            )
         
         text = transcript.text
         whisper_lang = getattr(transcript, 'language', lang_for_whisper or 'fr')
@@ -261,54 +361,79 @@ class AudioService:
         emb_vector = [0.0] * 256
         return fingerprint, emb_vector
 
-    async def text_to_speech(self, text: str, language: str = "fr") -> str:
+    async def text_to_speech(self, text: str, language: str = "fr", output_format: Optional[str] = None) -> str:
         """
         Generate speech from text.
-        Uses GalsenAI xTTS or ADIA_TTS for Wolof ('wo'), OpenAI TTS for others.
-        Fallbacks: xTTS -> ADIA -> OpenAI.
+        Uses LAfricaMobile for Wolof ('wo'), OpenAI TTS for others (and as fallback).
+        output_format (opus/aac/mp3, see audio_output.resolve_output_format) is requested
+        natively from OpenAI; other backends' audio is transcoded to it.
         """
+        from app.services.audio_output import resolve_output_format, transcode_file
+
+        output_format = resolve_output_format(output_format)
         import logging
         logger = logging.getLogger("uvicorn")
         logger.info(f"[TTS] Request - Language: {language}, Text length: {len(text)}")
         
+        # Identical answers (greetings, FAQ, fixed custom chat replies) are served from the TTS cache
+        tts_cache = self._get_tts_cache()
+        
         if language in ["wo", "wolof"]:
             # LAfricaMobile for Wolof
             logger.info("[TTS] Wolof detected, using LAfricaMobile API...")
             try:
                 service = self._get_lafricamobile_service()
                 # Use 'wolof' as language code for their API
-                return await service.tts(text, lang="wolof")
+                async def synthesize_wolof():
+                    # LAfricaMobile returns large WAV files: transcode before caching/serving
+                    return await transcode_file(await service.tts(text, lang="wolof"), output_format)
+
+                return await tts_cache.get_or_synthesize(
+                    text, "wo", voice="default", backend="lafricamobile", model="lafricamobile-tts",
+                    output_format=f"{output_format}@{settings.AUDIO_OUTPUT_BITRATE}",
+                    synthesize=synthesize_wolof
+                )
             except Exception as e:
                 # Fallback to OpenAI (or ADIA if we wanted deeper fallback hierarchy)
                 logger.error(f"[TTS] LAfricaMobile failed ({e}), falling back to OpenAI TTS...")
-                return await self._text_to_speech_openai(text)
         else:
             logger.info(f"[TTS] Using OpenAI TTS for language: {language}")
-            return await self._text_to_speech_openai(text)
-
-    async def _text_to_speech_openai(self, text: str) -> str:
-        """Generate speech using OpenAI TTS API."""
-        filename = f"{uuid.uuid4()}.mp3"
-        file_path = os.path.join(self.upload_dir, filename)
         
-        response = await self.client.audio.speech.create(
-            model=self.tts_model,
-            voice=self.tts_voice,
-            input=text
+        return await tts_cache.get_or_synthesize(
+            text, language, voice=self.tts_voice, backend="openai", model=self.tts_model,
+            output_format=output_format,
+            synthesize=lambda: self._text_to_speech_openai(text, output_format)
         )
+
+    def _get_tts_cache(self):
+        if self._tts_cache is None:
+            from app.services.tts_cache import TTSCache
+            self._tts_cache = TTSCache(self.upload_dir)
+        return self._tts_cache
+
+    async def _text_to_speech_openai(self, text: str, output_format: str = "mp3") -> str:
+        """Generate speech using OpenAI TTS API, directly in the output format."""
+        import asyncio
+        from app.services.audio_output import OUTPUT_FORMATS, OPENAI_RESPONSE_FORMATS
+
+        file_path = new_upload_path(OUTPUT_FORMATS[output_format][0], self.upload_dir)
+        
+        async with upstream_slot("openai.tts"):
+            response = await self.client.audio.speech.create(
+                model=self.tts_model,
+                voice=self.tts_voice,
+                input=text,
+                response_format=OPENAI_RESPONSE_FORMATS[output_format],
+                timeout=stage_timeout(settings.OPENAI_TIMEOUT, floor=settings.CHAT_FALLBACK_FLOOR_SECONDS)
+            )
         
-        response.stream_to_file(file_path)
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, response.write_to_file, file_path)
         return file_path
 
     async def _text_to_speech_wolof(self, text: str) -> str:
         """Generate Wolof speech using ADIA_TTS (Parler-TTS)."""
-        import asyncio
-        
-        # Load model if not already loaded
-        self._load_adia_tts()
-        
-        filename = f"{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.upload_dir, filename)
+        file_path = new_upload_path(".wav", self.upload_dir)
         
         # Voice description for natural Wolof speech
         description = "A warm and natural voice, with a conversational flow"
@@ -316,46 +441,8 @@ class AudioService:
         # ADIA_TTS has 200 char limit per inference, segment if needed
         segments = self._segment_text(text, max_chars=180)
         
-        # Run TTS in thread pool to not block async
-        def generate_audio():
-            import torch
-            import soundfile as sf
-            import numpy as np
-            
-            all_audio = []
-            
-            for segment in segments:
-                input_ids = self._adia_tokenizer(
-                    description, return_tensors="pt"
-                ).input_ids.to(self._adia_device)
-                
-                prompt_ids = self._adia_tokenizer(
-                    segment, return_tensors="pt"
-                ).input_ids.to(self._adia_device)
-                
-                with torch.no_grad():
-                    audio = self._adia_model.generate(
-                        input_ids=input_ids,
-                        prompt_input_ids=prompt_ids,
-                        temperature=0.8,
-                        do_sample=True
-                    )
-                
-                all_audio.append(audio.cpu().numpy().squeeze())
-            
-            # Concatenate all segments
-            if len(all_audio) > 1:
-                combined = np.concatenate(all_audio)
-            else:
-                combined = all_audio[0]
-            
-            # Save as WAV
-            sf.write(file_path, combined, self._adia_model.config.sampling_rate)
-            return file_path
-        
-        # Run in executor to not block event loop
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, generate_audio)
+        # Runs on the inference pool / worker process, not the event loop
+        result = await inference_service.run("synthesize_adia", segments, description, os.path.abspath(file_path))
         
         print(f"[Wolof] Generated TTS audio: {file_path}")
         return result
@@ -386,182 +473,25 @@ class AudioService:
         
         return segments if segments else [text[:max_chars]]
 
-    def _load_wolof_stt_model(self):
-        """Lazy load dofbi/wolof-asr model."""
-        if self._wolof_stt_model is None:
-            print("[STT] Loading dofbi/wolof-asr model...")
-            try:
-                from transformers import WhisperForConditionalGeneration, WhisperProcessor
-                import torch
-                
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                self._wolof_stt_device = device
-                
-                model_name = "dofbi/wolof-asr"
-                self._wolof_stt_processor = WhisperProcessor.from_pretrained(model_name)
-                self._wolof_stt_model = WhisperForConditionalGeneration.from_pretrained(model_name).to(device)
-                
-                print(f"[STT] Wolof ASR model loaded on {device}")
-            except Exception as e:
-                print(f"[STT] Failed to load Wolof ASR: {e}")
-                raise e
-
-    async def _transcribe_wolof(self, file_path: str) -> Tuple[str, str]:
+    async def _transcribe_wolof(self, clip: "AudioClip") -> Tuple[str, str]:
         """
         Transcribe using dofbi/wolof-asr (Whisper-based).
         Returns (transcription, 'wo').
         Language detection is handled by MMS-LID before this is called.
         """
-        import asyncio
-        import librosa
-        import torch
-        import imageio_ffmpeg
-        import subprocess
-        
-        self._load_wolof_stt_model()
+        # Decode to 16kHz mono in memory (WebM/OGG/MP3 -> PCM, no temp WAV)
+        audio_input = await self._load_pcm_16k(clip, "[STT]")
         
-        def run_inference():
-            # Conversion using imageio-ffmpeg binary to ensure compatibility (WebM -> WAV 16k)
-            ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-            temp_wav = f"{file_path}_16k.wav"
-            
-            try:
-                # Convert explicitly to 16k mono wav
-                cmd = [
-                    ffmpeg_path, "-y", 
-                    "-i", file_path, 
-                    "-ar", "16000", 
-                    "-ac", "1", 
-                    temp_wav
-                ]
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                load_path = temp_wav
-            except Exception as e:
-                print(f"[STT] Audio conversion fallback warning: {e}")
-                load_path = file_path
-
-            try:
-                # Load audio at 16k
-                audio_input, _ = librosa.load(load_path, sr=16000)
-                
-                input_features = self._wolof_stt_processor(
-                    audio_input, 
-                    return_tensors="pt", 
-                    sampling_rate=16000
-                ).input_features.to(self._wolof_stt_device)
-                
-                # Generate transcription
-                with torch.no_grad():
-                    predicted_ids = self._wolof_stt_model.generate(input_features)
-                
-                transcription = self._wolof_stt_processor.batch_decode(
-                    predicted_ids, skip_special_tokens=True
-                )[0]
-                
-                return transcription, "wo"
-                
-            finally:
-                # Cleanup temp file
-                if os.path.exists(temp_wav):
-                    try:
-                        os.remove(temp_wav)
-                    except:
-                        pass
-
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, run_inference)
-
-    def _load_xtts_model(self):
-        """Lazy load GalsenAI xTTS model."""
-        if self._xtts_model is None:
-            import sys
-            import torch
-            # Adjust path to the cloned repo
-            repo_path = os.path.join(os.getcwd(), "libs", "Wolof-TTS", "notebooks", "Models", "xTTS v2")
-            if repo_path not in sys.path:
-                sys.path.append(repo_path)
-            
-            try:
-                from TTS.tts.configs.xtts_config import XttsConfig
-                from TTS.tts.models.xtts import Xtts
-                
-                checkpoint_dir = os.path.join(os.getcwd(), "uploads", "models", "xtts", "galsenai-xtts-wo-checkpoints")
-                
-                # Check for model existence (assume user extracted zip keeping structure)
-                # We expect Anta_GPT_XTTS_Wo folder
-                checkpoint_path = os.path.join(checkpoint_dir, "Anta_GPT_XTTS_Wo")
-                model_path = os.path.join(checkpoint_path, "best_model_89250.pth")
-                config_path = os.path.join(checkpoint_path, "config.json")
-                vocab_path = os.path.join(checkpoint_dir, "XTTS_v2.0_original_model_files", "vocab.json")
-                self._xtts_ref_audio = os.path.join(checkpoint_dir, "anta_sample.wav")
-                
-                if not os.path.exists(config_path):
-                    raise FileNotFoundError(f"xTTS config not found at {config_path}. Did you unzip the model correctly into uploads/models/xtts?")
-                
-                print("[Wolof] Loading xTTS model...")
-                config = XttsConfig()
-                config.load_json(config_path)
-                
-                self._xtts_model = Xtts.init_from_config(config)
-                self._xtts_model.load_checkpoint(config, checkpoint_path=model_path, vocab_path=vocab_path, use_deepspeed=False)
-                
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-                self._xtts_model.to(device)
-                self._xtts_device = device
-                
-                print(f"[Wolof] xTTS model loaded on {device}!")
-                
-                # Pre-compute speaker latents
-                if not os.path.exists(self._xtts_ref_audio):
-                     print(f"[Wolof] Reference audio not found at {self._xtts_ref_audio}, checking root...")
-                     # Try searching recursively? Or just warn.
-                     raise FileNotFoundError(f"Reference audio missing: {self._xtts_ref_audio}")
-
-                gpt_cond_latent, speaker_embedding = self._xtts_model.get_conditioning_latents(
-                    audio_path=[self._xtts_ref_audio],
-                    gpt_cond_len=self._xtts_model.config.gpt_cond_len,
-                    max_ref_length=self._xtts_model.config.max_ref_len,
-                    sound_norm_refs=self._xtts_model.config.sound_norm_refs
-                )
-                self._xtts_latents = (gpt_cond_latent, speaker_embedding)
-                
-            except Exception as e:
-                print(f"[Wolof] Failed to load xTTS: {e}")
-                raise e
+        return await inference_service.run("transcribe_wolof", audio_input)
 
     async def _text_to_speech_xtts(self, text: str) -> str:
         """Generate Wolof speech using GalsenAI xTTS."""
-        import asyncio
         import logging
         logger = logging.getLogger("uvicorn")
         
-        self._load_xtts_model()
-        
-        filename = f"{uuid.uuid4()}.wav"
-        file_path = os.path.join(self.upload_dir, filename)
+        file_path = new_upload_path(".wav", self.upload_dir)
         
-        def generate_audio():
-            import soundfile as sf
-            
-            # Use pre-computed latents
-            gpt_cond_latent, speaker_embedding = self._xtts_latents
-            
-            # Inference
-            output = self._xtts_model.inference(
-                text=text.lower(),
-                gpt_cond_latent=gpt_cond_latent,
-                speaker_embedding=speaker_embedding,
-                do_sample=False,
-                speed=1.06,
-                language="wo",
-                enable_text_splitting=True
-            )
-            
-            # Save audio
-            sf.write(file_path, output['wav'], self._xtts_model.config.sampling_rate)
-            return file_path
-
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(None, generate_audio)
+        result = await inference_service.run("synthesize_xtts", text, os.path.abspath(file_path))
         logger.info(f"[Wolof] Generated xTTS audio: {file_path}")
         return result
+
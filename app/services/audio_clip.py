@@ -0,0 +1,173 @@
+import asyncio
+import os
+from typing import Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.audio_normalize import AudioDecodeError, NormalizedAudio, encode_speech, normalize_audio, SAMPLE_RATE
+
+# Energy VAD parameters (trim leading/trailing silence)
+VAD_FRAME_MS = 30
+VAD_PADDING_MS = 200
+VAD_MIN_DBFS = -45.0
+
+
+class AudioClip:
+    """
+    One voice input, decoded at most once per request and shared by every stage:
+    - `data`: original upload bytes (Whisper takes the compressed original)
+    - `await normalized()`: 16 kHz mono PCM (local models), its WAV encoding (LAfricaMobile) and duration
+    - `await speech_samples()`: the same samples with leading/trailing silence trimmed (LID)
+    - `await stt_upload()` / `await stt_wav()`: speech-only audio for the cloud STT APIs
+    Each representation is computed lazily on first use and cached.
+    """
+
+    def __init__(self, data: bytes, filename: str = "audio.wav", path: Optional[str] = None):
+        self.data = data
+        self.filename = filename
+        self.path = path
+        self.sha256: Optional[str] = None # Content hash (set when streamed from an upload)
+        self.format: Optional[str] = None # Sniffed container: wav, mp3, ogg, webm, m4a...
+        self._normalized: Optional[NormalizedAudio] = None
+        self._speech_bounds: Optional[Tuple[int, int]] = None
+        self._stt_upload: Optional[Tuple[str, bytes]] = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    async def from_upload(cls, upload_file) -> "AudioClip":
+        data = await upload_file.read()
+        return cls(data, filename=upload_file.filename or "audio.wav")
+
+    @classmethod
+    async def from_path(cls, path: str) -> "AudioClip":
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(None, lambda: open(path, "rb").read())
+        return cls(data, filename=os.path.basename(path), path=path)
+
+    @classmethod
+    def from_pcm(cls, pcm_bytes: bytes, filename: str = "stream.wav", path: Optional[str] = None) -> "AudioClip":
+        """Clip around audio already decoded to 16 kHz mono PCM (streamed voice input): no ffmpeg decode."""
+        normalized = NormalizedAudio(pcm_bytes)
+        clip = cls(normalized.wav_bytes, filename=filename, path=path)
+        clip.format = "wav"
+        clip._normalized = normalized
+        metrics.observe("voice_input_seconds", normalized.duration)
+        return clip
+
+    async def normalized(self) -> NormalizedAudio:
+        """Decode once (concurrent callers share the same decode)."""
+        if self._normalized is None:
+            async with self._lock:
+                if self._normalized is None:
+                    self._normalized = await normalize_audio(
+                        data=self.data, path=self.path, max_seconds=settings.AUDIO_MAX_DURATION_SECONDS + 1
+                    )
+                    metrics.observe("voice_input_seconds", self._normalized.duration)
+        return self._normalized
+
+    async def samples(self) -> np.ndarray:
+        return (await self.normalized()).samples
+
+    async def wav_16k(self) -> bytes:
+        return (await self.normalized()).wav_bytes
+
+    async def duration(self) -> float:
+        return (await self.normalized()).duration
+
+    async def speech_bounds(self) -> Tuple[int, int]:
+        """(start, end) sample indices of the speech (energy VAD), never empty."""
+        if self._speech_bounds is None:
+            self._speech_bounds = find_speech_bounds(await self.samples())
+        return self._speech_bounds
+
+    async def speech_samples(self) -> np.ndarray:
+        """Samples with leading/trailing silence removed."""
+        start, end = await self.speech_bounds()
+        return (await self.samples())[start:end]
+
+    async def _trimmed_speech_pcm(self) -> Optional[bytes]:
+        """PCM of the speech only, or None when trimming is disabled or would save too little."""
+        if not settings.AUDIO_VAD_TRIM_STT:
+            return None
+        start, end = await self.speech_bounds()
+        normalized = await self.normalized()
+        trimmed_seconds = (len(normalized.pcm_bytes) // 2 - (end - start)) / SAMPLE_RATE
+        if trimmed_seconds < settings.AUDIO_VAD_MIN_TRIM_SECONDS:
+            return None
+        metrics.observe("vad_trimmed_seconds", trimmed_seconds)
+        return normalized.pcm_bytes[start * 2:end * 2]
+
+    async def stt_wav(self) -> bytes:
+        """16 kHz WAV for STT APIs that want PCM (LAfricaMobile): speech only when worth trimming."""
+        speech = await self._trimmed_speech_pcm()
+        if speech is None:
+            return await self.wav_16k()
+        return NormalizedAudio(speech).wav_bytes
+
+    async def stt_upload(self) -> Tuple[str, bytes]:
+        """
+        (filename, bytes) for compressed-input STT APIs (Whisper): the speech re-encoded as
+        Ogg/Opus when trimming silence (or a WAV original) makes it smaller, otherwise the original upload.
+        """
+        if self._stt_upload is None:
+            upload = (self.filename, self.data)
+            try:
+                speech = await self._trimmed_speech_pcm()
+                if speech is None and self.format == "wav":
+                    speech = (await self.normalized()).pcm_bytes  # Uncompressed original: always worth encoding
+                if speech is not None:
+                    ext, encoded = await encode_speech(speech)
+                    if len(encoded) < len(self.data):
+                        metrics.observe("stt_upload_bytes_saved", len(self.data) - len(encoded))
+                        upload = (f"{os.path.splitext(self.filename)[0]}_speech.{ext}", encoded)
+            except AudioDecodeError as e:
+                print(f"[VAD] Sending original audio ({e})")
+            self._stt_upload = upload
+        return self._stt_upload
+
+
+def find_speech_bounds(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[int, int]:
+    """Speech span without leading/trailing frames quieter than max(VAD_MIN_DBFS, loudest frame - 35 dB), plus padding."""
+    frame = int(sample_rate * VAD_FRAME_MS / 1000)
+    n_frames = len(samples) // frame
+    if n_frames < 3:
+        return 0, len(samples)
+
+    frames = samples[:n_frames * frame].reshape(n_frames, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10
+    dbfs = 20 * np.log10(rms)
+    threshold = max(VAD_MIN_DBFS, float(dbfs.max()) - 35.0)
+    voiced = np.flatnonzero(dbfs > threshold)
+    if len(voiced) == 0:
+        return 0, len(samples)
+
+    padding = int(VAD_PADDING_MS / VAD_FRAME_MS)
+    start = max(0, voiced[0] - padding) * frame
+    end = min(n_frames, voiced[-1] + 1 + padding) * frame
+    if end >= n_frames * frame:
+        end = len(samples)  # Keep the partial last frame
+    return start, end
+
+
+def sniff_audio_format(header: bytes) -> Optional[str]:
+    """Container/codec from the first bytes of a file (used as file extension), None if not audio we accept."""
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"OggS":
+        return "ogg"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[4:8] == b"ftyp":
+        return "m4a"  # MP4/M4A/3GP (iOS and Android recorders)
+    if header[:5] == b"#!AMR":
+        return "amr"
+    if header[:3] == b"ID3":
+        return "mp3"
+    if len(header) >= 2 and header[0] == 0xFF:
+        if header[1] & 0xF6 == 0xF0:
+            return "aac"  # ADTS
+        if header[1] & 0xE0 == 0xE0:
+            return "mp3"
+    return None
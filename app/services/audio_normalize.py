@@ -0,0 +1,196 @@
+import asyncio
+import io
+import wave
+from typing import Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SAMPLE_RATE = 16000
+
+
+class AudioDecodeError(Exception):
+    """ffmpeg could not decode (or encode) the audio."""
+
+
+class NormalizedAudio:
+    """16 kHz mono audio decoded in memory: int16 PCM bytes, float32 array and WAV bytes (lazy)."""
+
+    def __init__(self, pcm_bytes: bytes, sample_rate: int = SAMPLE_RATE):
+        self.pcm_bytes = pcm_bytes
+        self.sample_rate = sample_rate
+        self._samples: Optional[np.ndarray] = None
+        self._wav_bytes: Optional[bytes] = None
+
+    @property
+    def samples(self) -> np.ndarray:
+        """float32 samples in [-1, 1] (what librosa.load(sr=16000) used to return)."""
+        if self._samples is None:
+            self._samples = np.frombuffer(self.pcm_bytes, dtype="<i2").astype(np.float32) / 32768.0
+        return self._samples
+
+    @property
+    def wav_bytes(self) -> bytes:
+        """PCM 16-bit WAV container around the same samples (for HTTP STT APIs)."""
+        if self._wav_bytes is None:
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as w:
+                w.setnchannels(1)
+                w.setsampwidth(2)
+                w.setframerate(self.sample_rate)
+                w.writeframes(self.pcm_bytes)
+            self._wav_bytes = buffer.getvalue()
+        return self._wav_bytes
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm_bytes) / 2 / self.sample_rate
+
+
+_ffmpeg_slots: Optional[asyncio.Semaphore] = None
+
+def _get_ffmpeg_slots() -> asyncio.Semaphore:
+    global _ffmpeg_slots
+    if _ffmpeg_slots is None:
+        _ffmpeg_slots = asyncio.Semaphore(settings.AUDIO_FFMPEG_CONCURRENCY)
+    return _ffmpeg_slots
+
+
+async def _run_ffmpeg(input_args, data: Optional[bytes], sample_rate: int, max_seconds: Optional[float] = None) -> bytes:
+    return await _ffmpeg_pipe([
+        *input_args,
+        *(["-t", str(max_seconds)] if max_seconds else []),
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1"
+    ], data)
+
+
+async def _ffmpeg_pipe(args, data: Optional[bytes]) -> bytes:
+    """Run ffmpeg with `args`, feeding `data` on stdin, and return stdout."""
+    import imageio_ffmpeg
+
+    cmd = [imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", *args]
+    async with _get_ffmpeg_slots():
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            # communicate() feeds stdin and drains stdout/stderr concurrently (no pipe deadlock)
+            stdout, stderr = await asyncio.wait_for(proc.communicate(input=data), settings.AUDIO_NORMALIZE_TIMEOUT)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            proc.kill()
+            await proc.wait()
+            raise
+    if proc.returncode != 0 or not stdout:
+        raise AudioDecodeError(stderr.decode("utf-8", "replace").strip()[-300:] or f"ffmpeg exit code {proc.returncode}")
+    return stdout
+
+
+async def normalize_audio(
+    data: Optional[bytes] = None, path: Optional[str] = None, sample_rate: int = SAMPLE_RATE,
+    max_seconds: Optional[float] = None
+) -> NormalizedAudio:
+    """
+    Decode any ffmpeg-readable audio to 16 kHz mono PCM in memory (asyncio subprocess, no temp files).
+    Bytes are streamed through stdin; when a path is also given it is used as a fallback
+    for containers that need a seekable input (e.g. MP4/M4A with the index at the end).
+    max_seconds stops decoding after that much audio (bounds CPU for oversized recordings).
+    """
+    if data is None and path is None:
+        raise ValueError("normalize_audio needs data or path")
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    try:
+        if data is not None:
+            try:
+                pcm = await _run_ffmpeg(["-i", "pipe:0"], data, sample_rate, max_seconds)
+            except AudioDecodeError:
+                if path is None:
+                    raise
+                pcm = await _run_ffmpeg(["-i", path], None, sample_rate, max_seconds)
+        else:
+            pcm = await _run_ffmpeg(["-i", path], None, sample_rate, max_seconds)
+    except AudioDecodeError:
+        metrics.increment("audio_normalize_errors")
+        raise
+
+    audio = NormalizedAudio(pcm, sample_rate)
+    metrics.observe("audio_normalize_ms", (loop.time() - start) * 1000)
+    return audio
+
+
+# Compact encodings for uploading speech to STT APIs: (extension, ffmpeg output args)
+_SPEECH_ENCODINGS = [
+    ("ogg", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"]),
+    ("flac", ["-c:a", "flac", "-f", "flac"]),  # Always built in, if this ffmpeg has no libopus
+]
+
+
+async def encode_speech(pcm_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> Tuple[str, bytes]:
+    """Encode 16-bit mono PCM for upload (Ogg/Opus, FLAC fallback). Returns (extension, bytes)."""
+    error = None
+    for ext, output_args in _SPEECH_ENCODINGS:
+        try:
+            encoded = await _ffmpeg_pipe(
+                ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0", *output_args, "pipe:1"],
+                pcm_bytes
+            )
+            return ext, encoded
+        except AudioDecodeError as e:
+            error = e
+    raise error
+
+
+class StreamDecoder:
+    """
+    Incremental decode of a live recording to 16 kHz mono PCM: client bytes (WebM/Ogg from
+    MediaRecorder, or raw PCM at another rate) are written to one long-lived ffmpeg process
+    as they arrive, and `read()` returns PCM as soon as ffmpeg emits it.
+    Streams do not take an AUDIO_FFMPEG_CONCURRENCY slot (they live as long as the utterance);
+    their number is bounded by VOICE_STREAM_MAX_CONCURRENT instead.
+    """
+
+    def __init__(self, input_args):
+        self.input_args = input_args
+        self._proc: Optional[asyncio.subprocess.Process] = None
+
+    async def start(self):
+        import imageio_ffmpeg
+
+        self._proc = await asyncio.create_subprocess_exec(
+            imageio_ffmpeg.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error",
+            # Emit output as soon as input is available instead of probing seconds of audio
+            "-fflags", "nobuffer", "-probesize", "32768", "-analyzeduration", "0",
+            *self.input_args, "-i", "pipe:0",
+            "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "-acodec", "pcm_s16le", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+
+    async def feed(self, data: bytes):
+        try:
+            self._proc.stdin.write(data)
+            await self._proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise AudioDecodeError("ffmpeg stopped reading the stream (undecodable input?)")
+
+    async def read(self, size: int = 16384) -> bytes:
+        """Next decoded PCM bytes (b"" once the input is closed and fully decoded)."""
+        return await self._proc.stdout.read(size)
+
+    def close_input(self):
+        if self._proc and not self._proc.stdin.is_closing():
+            self._proc.stdin.close()
+
+    async def stop(self):
+        """Terminate ffmpeg (remaining output is not needed once the utterance is over)."""
+        if self._proc is None:
+            return
+        self.close_input()
+        if self._proc.returncode is None:
+            self._proc.kill()
+        await self._proc.wait()
@@ -0,0 +1,57 @@
+import asyncio
+import os
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.audio_normalize import _ffmpeg_pipe
+from app.services.upload_storage import new_upload_path
+
+# Output format -> (file extension, ffmpeg output args without bitrate)
+# Mono speech: these bitrates are 5-10x smaller than the 16/24 kHz WAV some TTS backends return.
+OUTPUT_FORMATS = {
+    "opus": (".ogg", ["-c:a", "libopus", "-application", "voip", "-f", "ogg"]),
+    "aac": (".aac", ["-c:a", "aac", "-f", "adts"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame", "-f", "mp3"]),
+}
+
+# Formats OpenAI TTS can return natively (response_format)
+OPENAI_RESPONSE_FORMATS = {"opus": "opus", "aac": "aac", "mp3": "mp3"}
+
+
+def resolve_output_format(requested: Optional[str] = None, instance_format: Optional[str] = None) -> str:
+    """Audio format for a response: client request > instance setting > AUDIO_OUTPUT_FORMAT."""
+    for fmt in (requested, instance_format, settings.AUDIO_OUTPUT_FORMAT):
+        if fmt and fmt.lower() in OUTPUT_FORMATS:
+            return fmt.lower()
+    return "mp3"
+
+
+async def transcode_file(path: str, output_format: str, bitrate: Optional[str] = None) -> str:
+    """
+    Transcode an audio file to `output_format` (mono, AUDIO_OUTPUT_BITRATE) with an ffmpeg
+    subprocess into a new upload file; the original is removed. Returns the new path.
+    Files already in the target container are returned as is.
+    """
+    ext, output_args = OUTPUT_FORMATS[output_format]
+    if os.path.splitext(path)[1].lower() == ext:
+        return path
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    encoded = await _ffmpeg_pipe(
+        ["-i", path, "-vn", "-ac", "1", "-b:a", bitrate or settings.AUDIO_OUTPUT_BITRATE, *output_args, "pipe:1"],
+        None
+    )
+    out_path = new_upload_path(ext)
+
+    def write_and_replace():
+        with open(out_path, "wb") as f:
+            f.write(encoded)
+        original_size = os.path.getsize(path)
+        os.remove(path)
+        return original_size
+
+    original_size = await loop.run_in_executor(None, write_and_replace)
+    metrics.observe("audio_transcode_ms", (loop.time() - start) * 1000, format=output_format)
+    metrics.observe("audio_transcode_ratio", original_size / max(1, len(encoded)), format=output_format)
+    return out_path
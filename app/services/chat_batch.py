@@ -0,0 +1,96 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List
+from fastapi import HTTPException
+from app.core.admission import UpstreamBusyError
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.schemas.chat import ChatBatchItem
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run_chat_batch(
+    items: List[ChatBatchItem],
+    concurrency: int = 8,
+    synthesize_audio: bool = False,
+    persist: bool = False
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Replay many text turns through process_chat_request (QA of a system prompt / KB).
+    Yields one result per item as it completes (with per-item timings), then a summary.
+    - bounded concurrency (each item gets its own DB session)
+    - query embeddings are computed up front in batched API calls and shared through the RAG cache
+    - TTS and persistence are off by default (booking tools are simulated when not persisting)
+    """
+    from app.api.v1.endpoints.chat import process_chat_request, get_llm_service, get_rag_service
+
+    concurrency = max(1, min(concurrency, settings.CHAT_BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    llm_service = get_llm_service()
+    started = time.perf_counter()
+
+    # Warm the embedding cache (Wolof turns are embedded after translation, so they are skipped)
+    to_embed = [item.text for item in items if item.forced_language not in ("wo", "wolof")]
+    if to_embed:
+        try:
+            await get_rag_service().embed_texts(to_embed)
+        except UpstreamBusyError as e:
+            print(f"[Batch] Embedding warm-up skipped ({e})")  # Items embed (or skip RAG) on their own
+
+    async def run_item(index: int, item: ChatBatchItem) -> Dict[str, Any]:
+        async with semaphore:
+            t0 = time.perf_counter()
+            line = {"index": index, "id": item.id, "instance_id": item.instance_id, "text": item.text}
+            try:
+                if not item.forced_language or item.forced_language == "auto":
+                    detected_language = await llm_service.detect_language(item.text)
+                else:
+                    detected_language = item.forced_language
+                async with AsyncSessionLocal() as db:
+                    result = await process_chat_request(
+                        db, item.instance_id, item.text, None,
+                        detected_language=detected_language,
+                        forced_language=item.forced_language,
+                        session_id=item.session_id,
+                        synthesize_audio=synthesize_audio,
+                        persist=persist
+                    )
+                line.update(ok=True, result=result)
+            except HTTPException as e:
+                line.update(ok=False, error=e.detail)
+            except Exception as e:
+                line.update(ok=False, error=str(e))
+            line["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            return line
+
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    timings = []
+    errors = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            timings.append(line["elapsed_ms"])
+            errors += 0 if line["ok"] else 1
+            yield line
+    finally:
+        # Client went away: do not keep spending API calls
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "summary": {
+            "items": len(items),
+            "errors": errors,
+            "concurrency": concurrency,
+            "total_ms": round((time.perf_counter() - started) * 1000, 1),
+            "p50_ms": _percentile(timings, 50),
+            "p95_ms": _percentile(timings, 95),
+            "max_ms": max(timings) if timings else 0.0
+        }
+    }
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.crud import crud_chat
+from app.models.chat import Session
+
+logger = logging.getLogger("uvicorn")
+
+
+def estimate_tokens(message: Dict[str, Any]) -> int:
+    """Rough token estimate (~4 chars per token) for an OpenAI message dict."""
+    size = len(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        size += len(call["function"]["name"]) + len(call["function"]["arguments"])
+    return size // 4 + 4
+
+
+class ConversationMemory:
+    """
+    Bounded LLM history for a session: a rolling summary of older turns
+    plus the most recent messages verbatim, within a token budget.
+    The summary is refreshed in the background after the response is sent.
+    """
+
+    def __init__(self, llm_service):
+        self.llm_service = llm_service
+        self.window = settings.CHAT_HISTORY_WINDOW
+        self.token_budget = settings.CHAT_HISTORY_TOKEN_BUDGET
+        self._refreshing: Set[UUID] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def load_history(
+        self, db: AsyncSession, session: Session, exclude_message_id: Optional[UUID] = None
+    ) -> List[Dict[str, Any]]:
+        """Summary (as a system message) + recent messages, trimmed to the token budget."""
+        # Summary refresh may lag a few turns behind, so fetch more than the window
+        messages = await crud_chat.message.get_after(
+            db=db, session_id=session.session_id, after=session.summarized_until, limit=self.window * 3
+        )
+        messages = [m for m in messages if m.message_id != exclude_message_id]
+        history = self.llm_service.build_history_messages(messages)
+
+        summary_message = None
+        budget = self.token_budget
+        if session.summary:
+            summary_message = {"role": "system", "content": f"Résumé de la conversation précédente:\n{session.summary}"}
+            budget -= estimate_tokens(summary_message)
+
+        total = sum(estimate_tokens(m) for m in history)
+        while history and total > budget:
+            total -= estimate_tokens(history.pop(0))
+        # Never start on orphan tool replies (their assistant tool_calls message was trimmed)
+        while history and history[0]["role"] == "tool":
+            history.pop(0)
+
+        return ([summary_message] if summary_message else []) + history
+
+    def schedule_refresh(self, session_id: UUID, background_tasks=None) -> None:
+        """Refresh the session summary once the current response has been sent."""
+        if background_tasks is not None:
+            background_tasks.add_task(self.refresh_summary, session_id)
+            return
+        task = asyncio.create_task(self.refresh_summary(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def refresh_summary(self, session_id: UUID) -> None:
+        """Fold messages beyond the verbatim window into Session.summary."""
+        if session_id in self._refreshing:
+            return
+        self._refreshing.add(session_id)
+        try:
+            async with AsyncSessionLocal() as db:
+                session = await db.get(Session, session_id)
+                if not session:
+                    return
+                messages = await crud_chat.message.get_after(
+                    db=db, session_id=session_id, after=session.summarized_until, limit=200
+                )
+                if len(messages) <= self.window:
+                    return
+
+                # Keep tool calls together with their results on the verbatim side
+                cut = len(messages) - self.window
+                while cut < len(messages) and messages[cut].role == "tool":
+                    cut += 1
+                to_fold = messages[:cut]
+                if not to_fold:
+                    return
+
+                summary = await self.llm_service.summarize_conversation(
+                    session.summary, self.llm_service.build_history_messages(to_fold)
+                )
+                session.summary = summary
+                session.summarized_until = to_fold[-1].created_at
+                db.add(session)
+                await db.commit()
+                logger.info(f"[Memory] Session {session_id}: folded {len(to_fold)} messages into summary")
+        except Exception as e:
+            logger.error(f"[Memory] Summary refresh failed for session {session_id}: {e}")
+        finally:
+            self._refreshing.discard(session_id)
@@ -0,0 +1,86 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import HTTPException
+from app.core.config import settings
+from app.core.metrics import metrics
+
+
+class IdempotencyStore:
+    """
+    Single-flight execution and short-TTL replay for requests carrying an
+    `Idempotency-Key` header (mobile clients retrying on flaky networks).
+    - first request with a key runs the pipeline
+    - concurrent duplicates await that same execution
+    - completed results are replayed until they expire (IDEMPOTENCY_TTL_SECONDS)
+    - failures are not cached, so a retry after an error runs again
+    The store is in-process: keys are shared by requests hitting the same worker.
+    """
+
+    def __init__(self, ttl: float, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._completed: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._in_flight: Dict[str, Tuple[str, asyncio.Task]] = {}
+
+    @staticmethod
+    def fingerprint(*parts: Any) -> str:
+        """Stable hash of the request parameters, to reject a key reused for a different request."""
+        return hashlib.sha256("\x1f".join("" if p is None else str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _purge(self):
+        now = time.monotonic()
+        while self._completed:
+            key, (expires_at, _, _) = next(iter(self._completed.items()))
+            if expires_at > now and len(self._completed) <= self.max_entries:
+                break
+            self._completed.popitem(last=False)
+
+    def _check_fingerprint(self, stored: str, fingerprint: str):
+        if stored != fingerprint:
+            metrics.increment("idempotency_requests", outcome="conflict")
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+    async def execute(
+        self, key: str, fingerprint: str, fn: Callable[[], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Run `fn` once per key. Returns (result, replayed)."""
+        self._purge()
+
+        completed = self._completed.get(key)
+        if completed:
+            self._check_fingerprint(completed[1], fingerprint)
+            metrics.increment("idempotency_requests", outcome="replayed")
+            return completed[2], True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            self._check_fingerprint(in_flight[0], fingerprint)
+            metrics.increment("idempotency_requests", outcome="joined")
+            # Shield: a disconnecting duplicate must not cancel the shared execution
+            return await asyncio.shield(in_flight[1]), True
+
+        # Run as a task so the execution survives the first caller disconnecting
+        task = asyncio.create_task(fn())
+        self._in_flight[key] = (fingerprint, task)
+        metrics.increment("idempotency_requests", outcome="executed")
+        try:
+            result = await asyncio.shield(task)
+            self._completed[key] = (time.monotonic() + self.ttl, fingerprint, result)
+            return result, False
+        finally:
+            if task.done():
+                self._in_flight.pop(key, None)
+            else:
+                task.add_done_callback(lambda t: self._on_detached_done(key, fingerprint, t))
+
+    def _on_detached_done(self, key: str, fingerprint: str, task: asyncio.Task):
+        """First caller went away before completion: still record the result for its retries."""
+        self._in_flight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._completed[key] = (time.monotonic() + self.ttl, fingerprint, task.result())
+
+
+idempotency_store = IdempotencyStore(ttl=settings.IDEMPOTENCY_TTL_SECONDS)
@@ -0,0 +1,247 @@
+import asyncio
+import os
+import pickle
+import struct
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Awaitable, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.model_registry import model_registry, ModelUnavailableError
+
+# Frames on the inference socket: 4-byte big-endian length + pickle.
+# The socket is local (unix domain, directory mode 0700) and both ends are this codebase.
+_HEADER = struct.Struct(">I")
+
+
+async def send_frame(writer: asyncio.StreamWriter, obj: Any):
+    payload = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    writer.write(_HEADER.pack(len(payload)) + payload)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Any:
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return pickle.loads(await reader.readexactly(size))
+
+
+def worker_group_for(model_name: str) -> Optional[str]:
+    for group, spec in settings.INFERENCE_WORKERS.items():
+        if model_name in spec["models"]:
+            return group
+    return None
+
+
+def socket_path(group: str) -> str:
+    return os.path.join(settings.INFERENCE_SOCKET_DIR, f"{group}.sock")
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching for one single-input task: calls are collected for up to
+    `max_wait` seconds (or until `max_batch` are pending) and run as one batch; each
+    caller gets its own result. At most `concurrency` batches run at once and calls
+    arriving meanwhile join the next batch, so batches grow with load instead of
+    utterances queueing one by one.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch: int,
+        max_wait: float,
+        concurrency: int = 1
+    ):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._runner_waiting = False
+        self._tasks: set = set()
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None and not self._runner_waiting:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._runner_waiting:
+            return  # The runner waiting for a slot takes everything pending when it gets one
+        self._runner_waiting = True
+        task = asyncio.get_running_loop().create_task(self._run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self):
+        async with self._slots:
+            self._runner_waiting = False
+            batch = [(item, future) for item, future in self._pending[:self.max_batch] if not future.done()]
+            del self._pending[:self.max_batch]
+            if self._pending:
+                self._flush()
+            if not batch:
+                return
+
+            metrics.observe("inference_batch_size", len(batch), task=self.name)
+            try:
+                results = await self.run_batch([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class InferenceService:
+    """
+    Runs local model tasks (see app/services/local_models.TASKS) off the event loop.
+    - in-process (INFERENCE_SOCKET_DIR unset): on a dedicated thread pool, not the default
+      executor used for file I/O, with torch intra-op threads pinned to INFERENCE_TORCH_THREADS
+    - remote (INFERENCE_SOCKET_DIR set): sent to the inference worker process that owns the
+      model (scripts/inference_server.py), so every uvicorn worker shares one model copy
+      and CPU inference does not compete with request handling
+    Each model admits at most its group's `concurrency` tasks at a time, enforced where the
+    model runs (in the inference worker when remote, so the limit holds across uvicorn workers).
+    Tasks in INFERENCE_BATCHING are micro-batched where the model runs (MicroBatcher).
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._batchers: Dict[str, MicroBatcher] = {}
+        self._groups: Optional[List[str]] = None  # INFERENCE_WORKERS groups run here (None: all)
+
+    def serve_groups(self, groups: List[str]):
+        """Restrict this process to some INFERENCE_WORKERS groups (an inference worker)."""
+        self._groups = list(groups)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            configure_torch_threads(settings.INFERENCE_TORCH_THREADS)
+            # One thread per task that may be in flight on the models served here
+            workers = sum(
+                spec.get("concurrency", 1) * len(spec["models"])
+                for group, spec in settings.INFERENCE_WORKERS.items()
+                if self._groups is None or group in self._groups
+            )
+            self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="inference")
+        return self._executor
+
+    def _concurrency(self, model_name: str) -> int:
+        group = worker_group_for(model_name)
+        return settings.INFERENCE_WORKERS[group].get("concurrency", 1) if group else 1
+
+    def _slot(self, model_name: str) -> asyncio.Semaphore:
+        slot = self._slots.get(model_name)
+        if slot is None:
+            slot = self._slots[model_name] = asyncio.Semaphore(self._concurrency(model_name))
+        return slot
+
+    def _batch_config(self, task: str) -> Optional[Dict[str, float]]:
+        from app.services.local_models import BATCHED_TASKS
+
+        config = settings.INFERENCE_BATCHING.get(task)
+        if task not in BATCHED_TASKS or not config or config.get("max_size", 1) <= 1:
+            return None
+        return config
+
+    def _batcher(self, task: str) -> Optional[MicroBatcher]:
+        from app.services.local_models import BATCHED_TASKS, TASKS
+
+        config = self._batch_config(task)
+        if config is None:
+            return None
+        batcher = self._batchers.get(task)
+        if batcher is None:
+            batch_task = BATCHED_TASKS[task]
+            batcher = self._batchers[task] = MicroBatcher(
+                task,
+                run_batch=lambda items: self._run_on_model(batch_task, items),
+                max_batch=int(config["max_size"]),
+                max_wait=config.get("max_wait_ms", 10.0) / 1000,
+                concurrency=self._concurrency(TASKS[task][0])
+            )
+        return batcher
+
+    async def run(self, task: str, *args) -> Any:
+        from app.services.local_models import TASKS
+
+        model_name, _ = TASKS[task]
+        start = time.monotonic()
+        if settings.INFERENCE_SOCKET_DIR:
+            # Queued in the worker process, which admits the model's concurrency for all uvicorn workers
+            result = await self._run_remote(model_name, task, args)
+        else:
+            result = await self.run_local(task, *args)
+        metrics.observe("inference_ms", (time.monotonic() - start) * 1000, task=task)
+        return result
+
+    async def run_local(self, task: str, *args) -> Any:
+        """Run a task on a model resident in this process (also used by the inference workers)."""
+        from app.services.local_models import TASKS
+
+        batcher = self._batcher(task)
+        if batcher is not None:
+            return await batcher.submit(args[0])  # The batcher bounds concurrent batches
+        start = time.monotonic()
+        async with self._slot(TASKS[task][0]):
+            metrics.observe("inference_queue_ms", (time.monotonic() - start) * 1000, task=task)
+            return await self._run_on_model(task, *args)
+
+    async def _run_on_model(self, task: str, *args) -> Any:
+        from app.services.local_models import TASKS
+
+        model_name, fn = TASKS[task]
+        loop = asyncio.get_running_loop()
+        async with model_registry.use(model_name) as objects:
+            return await loop.run_in_executor(self._get_executor(), fn, objects, *args)
+
+    async def _run_remote(self, model_name: str, task: str, args) -> Any:
+        group = worker_group_for(model_name)
+        if group is None:
+            raise ModelUnavailableError(f"No inference worker serves {model_name}")
+        try:
+            reader, writer = await asyncio.open_unix_connection(socket_path(group))
+        except OSError as e:
+            metrics.increment("inference_remote_errors", group=group, error="connect")
+            raise ModelUnavailableError(f"Inference worker '{group}' unreachable: {e}") from e
+        try:
+            await send_frame(writer, (task, args))
+            ok, result = await asyncio.wait_for(read_frame(reader), settings.INFERENCE_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+            metrics.increment("inference_remote_errors", group=group, error=type(e).__name__)
+            raise ModelUnavailableError(f"Inference worker '{group}' failed: {e!r}") from e
+        finally:
+            writer.close()
+        if not ok:
+            raise ModelUnavailableError(f"{task} failed in worker '{group}': {result}")
+        return result
+
+
+def configure_torch_threads(threads: int):
+    """Pin torch intra-op threads (default is one per core, oversubscribed by concurrent tasks)."""
+    try:
+        import torch
+        torch.set_num_threads(max(1, threads))
+        torch.set_num_interop_threads(1)
+    except (ImportError, RuntimeError):
+        # RuntimeError: interop threads can only be set before the first parallel op
+        pass
+
+
+inference_service = InferenceService()
@@ -0,0 +1,92 @@
+"""
+Inference worker processes for the local models.
+
+    python scripts/inference_server.py
+
+Starts one process per group of INFERENCE_WORKERS (e.g. lid: mms_lid, asr: wolof_asr,
+tts: adia_tts + xtts). Each process pins its torch thread count, owns its models (model
+registry with the usual preload / memory budget / idle unloading) and serves tasks on
+INFERENCE_SOCKET_DIR/<group>.sock, admitting at most the group's `concurrency` tasks per
+model whatever the number of uvicorn workers sending them. Every uvicorn worker started with the same
+INFERENCE_SOCKET_DIR sends its inference there instead of loading its own copy.
+A worker that dies is restarted by the supervisor.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+
+async def _serve(group: str, spec: dict):
+    from app.services import local_models  # noqa: F401 (registers the models)
+    from app.services.inference import inference_service, read_frame, send_frame, socket_path
+    from app.services.model_registry import model_registry
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            task, args = await read_frame(reader)
+            try:
+                result = (True, await inference_service.run_local(task, *args))
+            except Exception as e:
+                result = (False, f"{type(e).__name__}: {e}")
+            await send_frame(writer, result)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away (timeout, cancelled request)
+        finally:
+            writer.close()
+
+    inference_service.serve_groups([group])  # Executor sized for this group's models only
+    await model_registry.start(preload=[m for m in settings.LOCAL_MODELS_PRELOAD if m in spec["models"]])
+
+    path = socket_path(group)
+    if os.path.exists(path):
+        os.remove(path)
+    server = await asyncio.start_unix_server(handle, path=path)
+    print(f"[Inference] Worker '{group}' ({', '.join(spec['models'])}) listening on {path}")
+    async with server:
+        await server.serve_forever()
+
+
+def _worker_main(group: str, spec: dict):
+    from app.services.inference import configure_torch_threads
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Supervisor handles Ctrl+C
+    configure_torch_threads(spec.get("torch_threads", settings.INFERENCE_TORCH_THREADS))
+    asyncio.run(_serve(group, spec))
+
+
+def run_supervisor():
+    os.makedirs(settings.INFERENCE_SOCKET_DIR, mode=0o700, exist_ok=True)
+    ctx = multiprocessing.get_context("spawn")  # No forked torch/OpenMP state
+    processes: Dict[str, multiprocessing.Process] = {}
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while not stopping:
+        for group, spec in settings.INFERENCE_WORKERS.items():
+            proc = processes.get(group)
+            if proc is not None and proc.is_alive():
+                continue
+            if proc is not None:
+                logger.error(f"[Inference] Worker '{group}' exited with code {proc.exitcode}, restarting")
+            proc = ctx.Process(target=_worker_main, args=(group, spec), name=f"inference-{group}", daemon=True)
+            proc.start()
+            processes[group] = proc
+        time.sleep(1.0)
+
+    for proc in processes.values():
+        proc.terminate()
+    for proc in processes.values():
+        proc.join(timeout=10)
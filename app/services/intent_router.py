@@ -0,0 +1,320 @@
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+from datetime import date
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.chat import Message
+from app.models.doctor import Doctor
+from app.models.specialty import Specialty
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_corpus")
+
+DAYS_FR = ["lundi", "mardi", "mercredi", "jeudi", "vendredi", "samedi", "dimanche"]
+MONTHS_FR = ["janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+             "août", "septembre", "octobre", "novembre", "décembre"]
+
+GREETINGS = {"bonjour", "bonsoir", "salut", "hello", "hi", "hey", "coucou", "salam", "salaam",
+             "aleykoum", "alaykoum", "aleekum", "alaikum", "assalamou", "asalamalekum", "nanga", "def"}
+THANKS = {"merci", "thanks", "thank", "jerejef"}
+GOODBYES = {"revoir", "bye", "goodbye", "bientot"}
+# Words that may surround a greeting/thanks without changing its meaning
+FILLER = {"a", "au", "et", "vous", "you", "tu", "ca", "va", "comment", "allez", "monsieur", "madame",
+          "beaucoup", "bien", "tres", "much", "very", "so", "lot", "good", "morning", "day", "journee",
+          "bonne", "the", "de", "la", "le", "ok", "d'accord", "daccord"}
+
+APPOINTMENT_WORDS = ("rendez-vous", "rendez vous", "rdv", "consultation", "consulter", "creneau",
+                     "disponibilit", "appointment", "slot")
+DOCTOR_LIST_WORDS = ("quels medecins", "quels docteurs", "liste des medecins", "which doctors", "medecins disponibles")
+# Anything that needs the LLM: cancellation/changes, explicit times, personal details
+# (matched against the lowercased text without accents)
+FALLTHROUGH = re.compile(r"annul|modifi|deplac|report|cancel|change|@|\b\d{1,2}\s*(h|heures?|:)\s*\d{0,2}\b|\bmon nom\b|\bje m'appelle\b")
+
+DATE_PATTERNS: List[Tuple[re.Pattern, Optional[str]]] = [
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b"), None),
+    (re.compile(r"apr[eè]s[- ]demain"), "après-demain"),
+    (re.compile(r"aujourd['’]hui|today"), "aujourd'hui"),
+    (re.compile(r"\bdemain\b|\btomorrow\b"), "demain"),
+    (re.compile(r"\b(" + "|".join(DAYS_FR) + r")\b(\s+prochaine?)?"), None),
+]
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFD", text) if unicodedata.category(c) != "Mn")
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z']+", _strip_accents(text.lower()))
+
+
+def _language_code(language: Optional[str]) -> str:
+    """'fr' / 'french' (Whisper) / 'fra' (MMS-LID) -> 'fr'."""
+    from app.services.audio import ISO639_3_TO_1, WHISPER_LANGUAGE_NAMES
+
+    lang = (language or "").strip().lower()
+    if lang in ("wolof", "wol"):
+        return "wo"
+    lang = WHISPER_LANGUAGE_NAMES.get(lang, lang)
+    return ISO639_3_TO_1.get(lang, lang) if len(lang) == 3 else lang
+
+
+class IntentClassifier:
+    """
+    Local intent classifier for turns the keyword rules miss: word unigram + bigram
+    naive Bayes trained on the shipped examples in intent_corpus/ (one utterance per
+    line, file name = intent; 'other' collects turns that need the LLM).
+    Returns (intent, confidence); the router only trusts it above
+    INTENT_CLASSIFIER_MIN_CONFIDENCE.
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR, alpha: float = 0.5):
+        self.alpha = alpha
+        self._log_priors: Dict[str, float] = {}
+        self._log_probs: Dict[str, Dict[str, float]] = {}
+        self._unseen_log_prob: Dict[str, float] = {}
+        self._train(corpus_dir)
+
+    def _features(self, words: List[str]) -> List[str]:
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def _train(self, corpus_dir: str):
+        counts: Dict[str, Counter] = {}
+        examples: Dict[str, int] = {}
+        for filename in sorted(os.listdir(corpus_dir)):
+            intent, ext = os.path.splitext(filename)
+            if ext != ".txt":
+                continue
+            with open(os.path.join(corpus_dir, filename), encoding="utf-8") as f:
+                lines = [line for line in f.read().splitlines() if line.strip()]
+            counts[intent] = Counter(g for line in lines for g in self._features(_words(line)))
+            examples[intent] = len(lines)
+
+        vocab_size = len(set().union(*counts.values()))
+        total_examples = sum(examples.values())
+        for intent, counter in counts.items():
+            total = sum(counter.values()) + self.alpha * vocab_size
+            self._log_priors[intent] = math.log(examples[intent] / total_examples)
+            self._log_probs[intent] = {g: math.log((c + self.alpha) / total) for g, c in counter.items()}
+            self._unseen_log_prob[intent] = math.log(self.alpha / total)
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        features = self._features(_words(text))
+        if not features:
+            return "other", 0.0
+        scores = {
+            intent: self._log_priors[intent] + sum(log_probs.get(g, self._unseen_log_prob[intent]) for g in features)
+            for intent, log_probs in self._log_probs.items()
+        }
+        # Same tempering as the text language detector: raw naive Bayes posteriors are overconfident
+        best = max(scores.values())
+        weights = {intent: math.exp((s - best) / math.sqrt(len(features))) for intent, s in scores.items()}
+        intent = max(weights, key=weights.get)
+        return intent, weights[intent] / sum(weights.values())
+
+
+class IntentRouter:
+    """
+    Deterministic fast path for structurally simple turns (greetings, thanks,
+    "un rendez-vous en cardiologie demain", "quels médecins en pédiatrie").
+    Intents are recognised with keyword rules, then the local IntentClassifier;
+    entities are extracted with parse_natural_date and the entity's specialty list.
+    Confident turns are answered from templates, calling the appointment tools
+    directly; everything else returns None and goes through RAG + LLM.
+    Small-talk templates (greeting, thanks, goodbye) are only used when the assistant
+    is not waiting for an answer, so "d'accord merci" to a confirmation question
+    reaches the LLM with the pending action.
+    """
+
+    SPECIALTY_CACHE_TTL = 300.0
+    SMALL_TALK = ("greeting", "thanks", "goodbye")
+
+    def __init__(self):
+        self._specialties: Dict[UUID, Tuple[float, List[str]]] = {}
+        self._classifier: Optional[IntentClassifier] = None
+
+    @property
+    def classifier(self) -> IntentClassifier:
+        if self._classifier is None:
+            self._classifier = IntentClassifier()
+        return self._classifier
+
+    async def _get_specialties(self, db: AsyncSession, entity_id: UUID) -> List[str]:
+        """Specialty names offered by the entity's active doctors (cached a few minutes)."""
+        cached = self._specialties.get(entity_id)
+        if cached and time.monotonic() - cached[0] < self.SPECIALTY_CACHE_TTL:
+            return cached[1]
+        result = await db.execute(
+            select(Specialty.name)
+            .join(Doctor, Doctor.specialty_id == Specialty.specialty_id)
+            .filter(Doctor.entity_id == entity_id, Doctor.is_active == True)
+            .distinct()
+        )
+        names = list(result.scalars().all())
+        self._specialties[entity_id] = (time.monotonic(), names)
+        return names
+
+    def _match_specialty(self, text: str, specialties: List[str]) -> Optional[str]:
+        """Match on the first 7 letters so 'cardiologue' finds 'Cardiologie', 'pédiatre' finds 'Pédiatrie'."""
+        normalized = _strip_accents(text.lower())
+        for name in specialties:
+            stem = _strip_accents(name.lower())[:7]
+            if len(stem) >= 5 and stem in normalized:
+                return name
+        return None
+
+    def _extract_date(self, text: str) -> Optional[str]:
+        from app.api.v1.endpoints.chat import parse_natural_date
+
+        lowered = text.lower()
+        for pattern, canonical in DATE_PATTERNS:
+            match = pattern.search(lowered)
+            if match:
+                parsed = parse_natural_date(canonical or match.group(0))
+                try:
+                    date.fromisoformat(parsed)
+                    return parsed
+                except ValueError:
+                    return None
+        return None
+
+    def classify(self, text: str) -> Optional[str]:
+        """Rule-based intent: 'greeting', 'thanks', 'goodbye', 'appointment', 'doctors' or None."""
+        words = _words(text)
+        if not words or len(words) > 20:
+            return None
+        normalized = " ".join(words)
+
+        for intent, keywords in (("greeting", GREETINGS), ("thanks", THANKS), ("goodbye", GOODBYES)):
+            if any(w in keywords for w in words) and all(w in keywords or w in FILLER for w in words):
+                return intent
+
+        if FALLTHROUGH.search(_strip_accents(text.lower())):
+            return None
+        if any(w in normalized for w in DOCTOR_LIST_WORDS):
+            return "doctors"
+        if any(w in normalized for w in APPOINTMENT_WORDS) or re.search(r"\b(voir|see) (un|une|le|la|a|the) (medecin|docteur|doctor|specialiste)", normalized):
+            return "appointment"
+
+        intent, confidence = self.classifier.predict(text)
+        if intent in ("appointment", "doctors") and confidence >= settings.INTENT_CLASSIFIER_MIN_CONFIDENCE:
+            return intent
+        return None
+
+    async def _awaiting_answer(self, db: AsyncSession, session_id: Optional[UUID]) -> bool:
+        """Whether the last assistant message of the session asked the user something."""
+        if session_id is None:
+            return False
+        result = await db.execute(
+            select(Message.translated_content, Message.content)
+            .filter(Message.session_id == session_id, Message.role == "assistant")
+            .order_by(Message.created_at.desc())
+            .limit(1)
+        )
+        last = result.first()
+        if not last:
+            return False
+        return (last[0] or last[1] or "").rstrip().endswith("?")
+
+    async def route(
+        self,
+        db: AsyncSession,
+        entity: Any,
+        text: str,
+        language: str,
+        execute_tools: Callable[[List[Dict[str, Any]]], Awaitable[List[str]]],
+        session_id: Optional[UUID] = None
+    ) -> Optional[str]:
+        """Return a templated answer for a confident intent, or None to fall through to the LLM."""
+        language = _language_code(language)
+        intent = self.classify(text) if language in ("fr", "en", "wo") else None
+        if intent in self.SMALL_TALK and await self._awaiting_answer(db, session_id):
+            intent = None  # Mid-flow "merci" / "d'accord": the LLM keeps the pending action
+        response = None
+        if intent:
+            response = await self._answer(db, entity, intent, text, "en" if language == "en" else "fr", execute_tools)
+
+        metrics.increment("intent_router_turns", intent=intent or "none", routed=response is not None)
+        return response
+
+    async def _answer(self, db, entity, intent, text, lang, execute_tools) -> Optional[str]:
+        entity_name = entity.name if entity else "cette organisation"
+
+        if intent == "greeting":
+            if lang == "en":
+                return f"Hello, I am the virtual assistant of {entity_name}. How can I help you?"
+            return f"Bonjour, je suis l'assistant virtuel de {entity_name}. Comment puis-je vous aider ?"
+        if intent == "thanks":
+            if lang == "en":
+                return "You are welcome. Can I help you with anything else?"
+            return "Je vous en prie. Puis-je vous aider pour autre chose ?"
+        if intent == "goodbye":
+            if lang == "en":
+                return "Goodbye and have a nice day."
+            return "Au revoir et bonne journée."
+
+        # Appointment intents need a specialty we actually offer
+        if not entity:
+            return None
+        specialty = self._match_specialty(text, await self._get_specialties(db, entity.entity_id))
+        if not specialty:
+            return None
+
+        if intent == "doctors":
+            call = {"id": f"fastpath_{uuid4().hex}", "name": "search_doctors", "args": {"specialty": specialty}}
+            result = await self._run_tool(execute_tools, call)
+            doctors = result.get("doctors") or []
+            if not doctors:
+                return None
+            names = ", ".join(d["name"] for d in doctors[:5])
+            if lang == "en":
+                return f"Our {specialty} doctors are: {names}. Would you like to book an appointment?"
+            return f"Nos médecins en {specialty} sont: {names}. Souhaitez-vous prendre rendez-vous ?"
+
+        # intent == "appointment"
+        args = {"specialty": specialty}
+        target_date = self._extract_date(text)
+        if target_date:
+            args["date"] = target_date
+        call = {"id": f"fastpath_{uuid4().hex}", "name": "get_available_slots", "args": args}
+        result = await self._run_tool(execute_tools, call)
+        slots = result.get("slots") or []
+        if not slots:
+            if lang == "en":
+                return f"I could not find any available {specialty} slot for that date. Would you like another date?"
+            return f"Je n'ai trouvé aucun créneau disponible en {specialty} pour cette date. Souhaitez-vous une autre date ?"
+
+        options = "; ".join(
+            f"{self._format_date(s['date'], lang)} {'at' if lang == 'en' else 'à'} {s['start_time']} "
+            f"{'with' if lang == 'en' else 'avec'} Dr. {s['doctor_name']}"
+            for s in slots[:5]
+        )
+        if lang == "en":
+            return f"Here are the next available {specialty} slots: {options}. Which one suits you?"
+        return f"Voici les prochains créneaux disponibles en {specialty}: {options}. Lequel vous convient ?"
+
+    async def _run_tool(self, execute_tools, call: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one tool through the chat pipeline (persisted like an LLM tool call, so later turns see the IDs)."""
+        results = await execute_tools([call])
+        try:
+            return json.loads(results[0])
+        except (ValueError, IndexError):
+            return {}
+
+    def _format_date(self, iso_date: str, lang: str) -> str:
+        d = date.fromisoformat(iso_date)
+        if lang == "en":
+            return d.strftime("%A %d %B")
+        return f"le {DAYS_FR[d.weekday()]} {d.day} {MONTHS_FR[d.month - 1]}"
+
+
+# Singleton
+intent_router = IntentRouter()
@@ -1,9 +1,16 @@
+import asyncio
 import httpx
 import os
-import uuid
+import time
 import logging
 from typing import Optional, Tuple
 from app.core.config import settings
+from app.core.admission import upstream_slot, UpstreamBusyError
+from app.core.metrics import metrics
+from app.services.upload_storage import new_upload_path
+from app.core.resilience import (
+    DeadlineExceeded, LatencyTracker, get_circuit_breaker, hedged, stage_timeout
+)
 
 logger = logging.getLogger("uvicorn")
 
@@ -15,6 +22,75 @@ class LAfricaMobileService:
         self.token = None
         self.client = httpx.AsyncClient(timeout=60.0)
         self.upload_dir = settings.UPLOAD_DIR
+        self._latency = {op: LatencyTracker() for op in settings.LAFRICAMOBILE_TIMEOUTS}
+
+    async def _call(self, operation: str, send, hedge: bool = False):
+        """
+        Run one API operation under its circuit breaker, its admission slot and the turn deadline.
+        The timeout is the operation's own cap clipped to the time left in the turn.
+        Raises CircuitOpenError / DeadlineExceeded without calling the API when the
+        provider is failing or the turn has no budget left, so callers fall back at once.
+        With hedge (idempotent calls only), a duplicate request is sent once the call
+        is slower than LAFRICAMOBILE_HEDGE_PERCENTILE of recent calls.
+        Only the exchange with the provider is timed: waiting for a slot in our own
+        admission queue is neither a provider timeout nor a slow call.
+        """
+        name = f"lafricamobile.{operation}"
+        cap = settings.LAFRICAMOBILE_TIMEOUTS[operation]
+        timeout = stage_timeout(cap)
+        if timeout < settings.LAFRICAMOBILE_MIN_CALL_SECONDS:
+            metrics.increment("deadline_skips", upstream=name)
+            raise DeadlineExceeded(f"{name}: {timeout:.1f}s left in turn budget")
+
+        breaker = get_circuit_breaker(
+            name,
+            failure_threshold=settings.LAFRICAMOBILE_BREAKER_FAILURES,
+            slow_call_seconds=cap * settings.LAFRICAMOBILE_SLOW_CALL_RATIO,
+            open_seconds=settings.LAFRICAMOBILE_BREAKER_OPEN_SECONDS
+        )
+        breaker.before_call()
+
+        hedge_after = None
+        if hedge and settings.LAFRICAMOBILE_HEDGE_TRANSLATE:
+            hedge_after = self._latency[operation].percentile(settings.LAFRICAMOBILE_HEDGE_PERCENTILE)
+
+        async def send_duplicate():
+            async with upstream_slot(name):
+                return await send()
+
+        try:
+            async with upstream_slot(name):
+                # The queue wait came out of the turn budget
+                timeout = stage_timeout(cap)
+                if timeout < settings.LAFRICAMOBILE_MIN_CALL_SECONDS:
+                    metrics.increment("deadline_skips", upstream=name)
+                    raise DeadlineExceeded(f"{name}: {timeout:.1f}s left in turn budget after queueing")
+                start = time.monotonic()
+                result = await asyncio.wait_for(
+                    hedged(send, hedge_after, name, send_duplicate) if hedge else send(), timeout
+                )
+                duration = time.monotonic() - start
+        except asyncio.TimeoutError:
+            metrics.increment("upstream_timeouts", upstream=name)
+            if timeout < cap:
+                # Cut by the turn budget, not necessarily the provider's fault
+                breaker.release_probe()
+                raise DeadlineExceeded(f"{name}: turn budget exhausted after {timeout:.1f}s") from None
+            breaker.record_failure()
+            raise
+        except (UpstreamBusyError, DeadlineExceeded, asyncio.CancelledError):
+            # No verdict on the provider (queue full, no budget left after queueing, or the caller
+            # went away, e.g. a cancelled batch item): a half-open probe must not stay "in flight" forever
+            breaker.release_probe()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+
+        breaker.record_success(duration)
+        self._latency[operation].record(duration)
+        metrics.observe("upstream_latency_ms", duration * 1000, upstream=name)
+        return result
 
     async def _authenticate(self):
         """Authenticate and retrieve access token"""
@@ -46,41 +122,35 @@ class LAfricaMobileService:
             await self._authenticate()
         return {"Authorization": f"Bearer {self.token}"}
 
-    async def stt(self, file_path: str, lang: str = "wolof") -> str:
+    async def stt(self, file_path: str, lang: str = "wolof", clip=None) -> str:
         """
         Perform Speech-to-Text.
         Returns the transcription text.
+        Pass the request's AudioClip to reuse its 16kHz decode instead of decoding again.
         """
-        import imageio_ffmpeg
-        import subprocess
+        from app.services.audio_clip import AudioClip
         
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Audio file not found: {file_path}")
+        if clip is None:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"Audio file not found: {file_path}")
+            clip = await AudioClip.from_path(file_path)
 
-        headers = await self._get_headers()
-        # Remove Content-Type from headers as multipart/form-data boundary is handled by client
-        if "Content-Type" in headers:
-            headers.pop("Content-Type", None)
-            
-        # Convert to 16kHz Mono WAV to ensure compatibility
-        ffmpeg_path = imageio_ffmpeg.get_ffmpeg_exe()
-        converted_path = f"{file_path}_clean.wav"
-        
         try:
-            # Convert
-            subprocess.run(
-                [ffmpeg_path, "-y", "-i", file_path, "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", converted_path], 
-                check=True, 
-                stdout=subprocess.DEVNULL, 
-                stderr=subprocess.DEVNULL
-            )
+            # 16kHz Mono WAV to ensure compatibility (decoded in memory, leading/trailing silence trimmed)
+            wav_bytes = await clip.stt_wav()
+            wav_name = f"{os.path.splitext(os.path.basename(file_path))[0]}_clean.wav"
             
-            with open(converted_path, "rb") as f:
+            async def send():
+                headers = await self._get_headers()
+                # Remove Content-Type from headers as multipart/form-data boundary is handled by client
+                if "Content-Type" in headers:
+                    headers.pop("Content-Type", None)
+
                 # Send as standard WAV
-                files = {"audio": (os.path.basename(converted_path), f, "audio/wav")}
+                files = {"audio": (wav_name, wav_bytes, "audio/wav")}
                 data = {"to_lang": lang}
                 
-                logger.info(f"[LAfricaMobile] Sending STT request for {os.path.basename(converted_path)} (16kHz WAV)...")
+                logger.info(f"[LAfricaMobile] Sending STT request for {wav_name} (16kHz WAV)...")
                 
                 response = await self.client.post(
                     f"{self.base_url}/stt/",
@@ -88,15 +158,13 @@ class LAfricaMobileService:
                     files=files,
                     data=data
                 )
-                
+                    
                 if response.status_code == 401: # Token expired
                     await self._authenticate()
                     headers = await self._get_headers()
                     if "Content-Type" in headers:
                         headers.pop("Content-Type", None)
-                        
-                    # Reset file pointer for retry
-                    f.seek(0)
+                            
                     response = await self.client.post(
                         f"{self.base_url}/stt/",
                         headers=headers,
@@ -108,45 +176,39 @@ class LAfricaMobileService:
                     logger.error(f"[LAfricaMobile] API Error: {response.text}")
                     
                 response.raise_for_status()
-                result = response.json()
-                logger.info(f"[LAfricaMobile] STT Result: {result}")
-                
-                # Check for transcription key
-                if "transcription" in result:
-                     return result["transcription"]
-                else:
-                     logger.warning(f"[LAfricaMobile] Unexpected response format: {result}")
-                     return ""
+                return response.json()
+
+            result = await self._call("stt", send)
+            logger.info(f"[LAfricaMobile] STT Result: {result}")
+            
+            # Check for transcription key
+            if "transcription" in result:
+                 return result["transcription"]
+            else:
+                 logger.warning(f"[LAfricaMobile] Unexpected response format: {result}")
+                 return ""
                      
         except Exception as e:
             logger.error(f"[LAfricaMobile] STT failed: {e}")
             raise e
-        finally:
-            # Clean up converted file
-            if os.path.exists(converted_path):
-                try:
-                    os.remove(converted_path)
-                except:
-                    pass
 
     async def translate(self, text: str, to_lang: str) -> str:
         """
         Translate text.
         """
-        headers = await self._get_headers()
         payload = {
             "text": text,
             "to_lang": to_lang
         }
-        
-        try:
-            logger.info(f"[LAfricaMobile] Translating '{text[:20]}...' to {to_lang}")
+
+        async def send():
+            headers = await self._get_headers()
             response = await self.client.post(
                 f"{self.base_url}/tts/translate",
                 headers=headers,
                 json=payload
             )
-            
+                
             if response.status_code == 401:
                 await self._authenticate()
                 headers = await self._get_headers()
@@ -157,7 +219,12 @@ class LAfricaMobileService:
                 )
 
             response.raise_for_status()
-            result = response.json()
+            return response.json()
+        
+        try:
+            logger.info(f"[LAfricaMobile] Translating '{text[:20]}...' to {to_lang}")
+            # Translation is idempotent: safe to hedge a slow call with a duplicate
+            result = await self._call("translate", send, hedge=True)
             return result.get("translated_text", text) # fallback to original if key missing
         except Exception as e:
             logger.error(f"[LAfricaMobile] Translation failed: {e}")
@@ -170,22 +237,21 @@ class LAfricaMobileService:
         Perform Text-to-Speech.
         Returns the local path of the generated audio file.
         """
-        headers = await self._get_headers()
         payload = {
             "text": text,
             "to_lang": lang,
             "pitch": 0.0,
             "speed": 1.0
         }
-        
-        try:
-            logger.info(f"[LAfricaMobile] Requesting TTS for '{text[:20]}...'")
+
+        async def send():
+            headers = await self._get_headers()
             response = await self.client.post(
                 f"{self.base_url}/tts/",
                 headers=headers,
                 json=payload
             )
-            
+                
             if response.status_code == 401:
                 await self._authenticate()
                 headers = await self._get_headers()
@@ -202,8 +268,12 @@ class LAfricaMobileService:
             if not remote_audio_url:
                 raise ValueError("No audio path returned from API")
 
-            # Download the audio file
+            # Download the audio file (within the same deadline)
             return await self._download_audio(remote_audio_url)
+        
+        try:
+            logger.info(f"[LAfricaMobile] Requesting TTS for '{text[:20]}...'")
+            return await self._call("tts", send)
             
         except Exception as e:
             logger.error(f"[LAfricaMobile] TTS failed: {e}")
@@ -220,8 +290,7 @@ class LAfricaMobileService:
             
             # Use UUID for local filename
             ext = os.path.splitext(url)[1] or ".wav" # default to wav if no extension
-            filename = f"{uuid.uuid4()}{ext}"
-            file_path = os.path.join(self.upload_dir, filename)
+            file_path = new_upload_path(ext, self.upload_dir)
             
             logger.info(f"[LAfricaMobile] Downloading audio from {url} to {file_path}")
             
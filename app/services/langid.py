@@ -0,0 +1,123 @@
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langid_corpus")
+
+# Arabic script blocks (Arabic, Arabic Supplement, Presentation Forms)
+ARABIC_CHAR = re.compile(r"[؀-ۿݐ-ݿﭐ-﷿ﹰ-﻿]")
+NON_LETTER = re.compile(r"[^\w'À-ɏŋ]+")
+
+# Wolof function words and frequent words that are not also French/English words. Kiosk users
+# code-switch: Wolof sentences full of French terms ("dama bëgg annuler mon rendez-vous")
+# look French to the n-gram model, but these words only come from a Wolof speaker.
+WOLOF_MARKERS = {
+    "bi", "yi", "gi", "ji", "dama", "damay", "dafa", "dafay", "dañu", "dañuy", "sama", "ngi", "mangi",
+    "maa", "naa", "nga", "ngay", "laa", "lay", "ndax", "lan", "kañ", "waaw", "déedéet", "jërëjëf",
+    "bëgg", "nekk", "ubbi", "ëllëg", "démb", "lool", "rekk", "itam", "xam", "wax", "koy", "ñu", "ñi",
+    "yow", "moo", "mooy", "naka", "nanga", "baax", "xaar", "jënde", "ñaata", "dégg", "jox", "ñëw",
+}
+CODE_SWITCH_CONFIDENCE = 0.95
+
+
+class TextLanguageDetector:
+    """
+    Local text language identification for 'wo', 'fr', 'en' (character n-gram
+    naive Bayes trained on the shipped corpus in langid_corpus/) and 'ar' (script).
+    Runs in well under a millisecond for chat-sized inputs.
+    French/English-looking text containing Wolof marker words is code-switched Wolof.
+    Returns (language_code, confidence) so callers can fall back to the LLM
+    when the text is too short or ambiguous.
+    """
+
+    def __init__(self, corpus_dir: str = CORPUS_DIR, ngram_range: Tuple[int, int] = (1, 4), alpha: float = 0.5):
+        self.ngram_range = ngram_range
+        self.alpha = alpha
+        self._log_probs: Dict[str, Dict[str, float]] = {}
+        self._unseen_log_prob: Dict[str, float] = {}
+        self._train(corpus_dir)
+
+    def _normalize(self, text: str) -> str:
+        text = unicodedata.normalize("NFC", text.lower())
+        text = NON_LETTER.sub(" ", text)
+        text = re.sub(r"\d+", " ", text)
+        return " ".join(text.split())
+
+    def _ngrams(self, text: str) -> List[str]:
+        grams = []
+        low, high = self.ngram_range
+        for word in text.split():
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                for i in range(len(padded) - n + 1):
+                    gram = padded[i:i + n]
+                    if gram.strip():
+                        grams.append(gram)
+        return grams
+
+    def _train(self, corpus_dir: str):
+        counts: Dict[str, Counter] = {}
+        for filename in sorted(os.listdir(corpus_dir)):
+            lang, ext = os.path.splitext(filename)
+            if ext != ".txt":
+                continue
+            with open(os.path.join(corpus_dir, filename), encoding="utf-8") as f:
+                counts[lang] = Counter(self._ngrams(self._normalize(f.read())))
+
+        vocabulary = set()
+        for counter in counts.values():
+            vocabulary.update(counter)
+        vocab_size = len(vocabulary)
+
+        for lang, counter in counts.items():
+            total = sum(counter.values()) + self.alpha * vocab_size
+            self._log_probs[lang] = {gram: math.log((c + self.alpha) / total) for gram, c in counter.items()}
+            self._unseen_log_prob[lang] = math.log(self.alpha / total)
+
+    @property
+    def languages(self) -> List[str]:
+        return sorted(self._log_probs) + ["ar"]
+
+    def detect(self, text: str) -> Tuple[str, float]:
+        """Return (language_code, confidence in [0, 1]). Empty input gives ('fr', 0.0)."""
+        letters = [c for c in text if c.isalpha()]
+        if not letters:
+            return "fr", 0.0
+
+        arabic_ratio = sum(1 for c in letters if ARABIC_CHAR.match(c)) / len(letters)
+        if arabic_ratio > 0.5:
+            return "ar", arabic_ratio
+
+        grams = self._ngrams(self._normalize(text))
+        if not grams:
+            return "fr", 0.0
+
+        scores = {}
+        for lang, log_probs in self._log_probs.items():
+            unseen = self._unseen_log_prob[lang]
+            scores[lang] = sum(log_probs.get(g, unseen) for g in grams)
+
+        # Average per n-gram before the softmax: raw naive Bayes posteriors are
+        # overconfident, this keeps short inputs ("ok", "merci") below threshold.
+        best = max(scores.values())
+        weights = {lang: math.exp((s - best) / math.sqrt(len(grams))) for lang, s in scores.items()}
+        total = sum(weights.values())
+        lang = max(weights, key=weights.get)
+        if lang != "wo" and "wo" in weights and any(w in WOLOF_MARKERS for w in self._normalize(text).split()):
+            return "wo", max(weights["wo"] / total, CODE_SWITCH_CONFIDENCE)
+        return lang, weights[lang] / total
+
+    def word_count(self, text: str) -> int:
+        return len(self._normalize(text).split())
+
+
+_detector = None
+
+def get_text_language_detector() -> TextLanguageDetector:
+    global _detector
+    if _detector is None:
+        _detector = TextLanguageDetector()
+    return _detector
@@ -1,7 +1,10 @@
 import json
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Awaitable, Callable
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.admission import upstream_slot, Priority
+from app.core.resilience import remaining_budget, stage_timeout
 
 # Define appointment-related tools for OpenAI
 APPOINTMENT_TOOLS = [
@@ -97,7 +100,8 @@ class LLMService:
             self.client = AsyncOpenAI(
                 api_key=settings.OPENAI_API_KEY,
                 timeout=settings.OPENAI_TIMEOUT,
-                max_retries=settings.OPENAI_MAX_RETRIES
+                max_retries=settings.OPENAI_MAX_RETRIES,
+                base_url=settings.OPENAI_BASE_URL
             )
             self.model = settings.OPENAI_MODEL
         else:
@@ -122,149 +126,204 @@ class LLMService:
     # def _load_nllb_model(self):
     #     ...
 
-    def _parse_history(self, history_str: str) -> List[Dict[str, str]]:
+    def build_history_messages(self, messages: List[Any]) -> List[Dict[str, Any]]:
         """
-        Parse the string history into OpenAI message format.
-        History is expected to be in format:
-        User: ...
-        Assistant: ...
-        System (Tool Output): ...
+        Build OpenAI chat messages directly from stored Message rows (oldest first).
+        - user/assistant rows use the French working text (translated_content when present)
+        - consecutive tool rows carrying tool_call_id are emitted as one assistant
+          message with `tool_calls`, followed by the matching `tool` messages
+        - legacy tool rows (stored before tool_call_id existed) become a system note
         """
-        messages = []
-        lines = history_str.strip().split('\n')
-        
-        current_role = None
-        current_content = []
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
+        history: List[Dict[str, Any]] = []
+        pending_calls: List[Dict[str, Any]] = []
+        pending_results: List[Dict[str, Any]] = []
+
+        def flush_tool_group():
+            if pending_calls:
+                history.append({"role": "assistant", "content": None, "tool_calls": list(pending_calls)})
+                history.extend(pending_results)
+            pending_calls.clear()
+            pending_results.clear()
+
+        for msg in messages:
+            if msg.role == "tool" and msg.tool_call_id:
+                call = (msg.tool_calls or [{}])[0]
+                arguments = call.get("arguments", {})
+                pending_calls.append({
+                    "id": msg.tool_call_id,
+                    "type": "function",
+                    "function": {
+                        "name": call.get("name", ""),
+                        "arguments": arguments if isinstance(arguments, str) else json.dumps(arguments, ensure_ascii=False)
+                    }
+                })
+                pending_results.append({"role": "tool", "tool_call_id": msg.tool_call_id, "content": msg.content or ""})
                 continue
-                
-            if line.startswith("User:"):
-                if current_role:
-                    messages.append({"role": current_role, "content": " ".join(current_content)})
-                current_role = "user"
-                current_content = [line.replace("User:", "").strip()]
-            elif line.startswith("Assistant:"):
-                if current_role:
-                    messages.append({"role": current_role, "content": " ".join(current_content)})
-                current_role = "assistant"
-                current_content = [line.replace("Assistant:", "").strip()]
-            elif line.startswith("System (Tool Output"):
-                if current_role:
-                    messages.append({"role": current_role, "content": " ".join(current_content)})
-                
-                # Extract content removing the prefix
-                content = line.split("):", 1)[1].strip() if "):" in line else line
-                
-                current_role = "system" 
-                current_content = ["Tool output from previous turn: " + content]
-            else:
-                if current_role:
-                    current_content.append(line)
-        
-        if current_role:
-            messages.append({"role": current_role, "content": " ".join(current_content)})
-            
-        return messages
 
-    async def generate_response_with_tools(
-        self, 
-        system_instruction: str, 
-        context: str, 
-        history: str, 
-        user_message: str
+            flush_tool_group()
+            content = msg.translated_content if msg.translated_content else msg.content
+            if msg.role in ("user", "assistant"):
+                if content:
+                    history.append({"role": msg.role, "content": content})
+            elif msg.role == "tool":
+                history.append({"role": "system", "content": f"Tool output from previous turn: {content}"})
+
+        flush_tool_group()
+        return history
+
+    def _parse_tool_calls(self, message) -> List[Dict[str, Any]]:
+        """All tool calls of an assistant message as [{'id', 'name', 'args'}] (parallel calls included)."""
+        calls = []
+        for tool_call in message.tool_calls or []:
+            try:
+                args = json.loads(tool_call.function.arguments or "{}")
+            except json.JSONDecodeError:
+                args = {}
+            calls.append({"id": tool_call.id, "name": tool_call.function.name, "args": args})
+        return calls
+
+    async def run_tool_loop(
+        self,
+        system_instruction: str,
+        context: str,
+        history: List[Dict[str, Any]],
+        user_message: str,
+        execute_tools: Callable[[List[Dict[str, Any]]], Awaitable[List[str]]]
     ) -> Dict[str, Any]:
         """
-        Generate response with potential function calls for appointment booking.
-        Returns a dict with:
-        - 'type': 'text' or 'function_call'
-        - 'content': text response or function call details
+        Generate the answer for a turn, executing appointment tools as the model requests them.
+        The full message list (KB context, history, user question, assistant tool_calls and
+        tool results) is carried across iterations so the model never loses the conversation.
+        `execute_tools` runs a list of calls [{'id', 'name', 'args'}] and returns their
+        JSON results in the same order.
+        Bounded by CHAT_MAX_TOOL_ITERATIONS and CHAT_TOOL_LOOP_TOKEN_BUDGET; once a budget
+        is spent, the model is asked for a final text answer without tools.
+        Returns a dict with 'content', 'round_trips', 'prompt_tokens', 'cached_tokens' and 'completion_tokens'.
         """
         if not self.client:
-            return {"type": "text", "content": "OpenAI API Key not configured. Mock response."}
+            return {"content": "OpenAI API Key not configured. Mock response.", "round_trips": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
         
+        # Prompt layout: static first, variable last, so consecutive calls share a
+        # cacheable prefix upstream (tools schema + entity system prompt + history).
         messages = [
-            {"role": "system", "content": f"{system_instruction}\n\nContext from Knowledge Base:\n{context}"}
+            {"role": "system", "content": system_instruction}
         ]
-        
-        # Add history
-        # Note: In a real production system, we should store structured messages in DB
-        # instead of parsing a string history. This is an adaptation layer.
-        parsed_history = self._parse_history(history)
-        messages.extend(parsed_history)
-        
+        # Add history (already structured OpenAI messages, see build_history_messages)
+        messages.extend(history)
+        # Per-turn KB context right before the question it was retrieved for
+        messages.append({"role": "system", "content": f"Context from Knowledge Base:\n{context}"})
         # Add current user message
         messages.append({"role": "user", "content": user_message})
-        
+
+        round_trips = 0
+        prompt_tokens = 0
+        cached_tokens = 0
+        completion_tokens = 0
+        content = None
+
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                tools=APPOINTMENT_TOOLS,
-                tool_choice="auto"
-            )
-            
-            message = response.choices[0].message
-            
-            # Check for tool calls
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                return {
-                    "type": "function_call",
-                    "content": {
-                        "name": tool_call.function.name,
-                        "args": json.loads(tool_call.function.arguments)
-                    }
-                }
-            
-            return {"type": "text", "content": message.content or "Je n'ai pas compris."}
-            
+            while True:
+                time_left = remaining_budget()
+                budget_spent = (
+                    round_trips >= settings.CHAT_MAX_TOOL_ITERATIONS
+                    or prompt_tokens + completion_tokens >= settings.CHAT_TOOL_LOOP_TOKEN_BUDGET
+                    or (time_left is not None and time_left < settings.CHAT_FALLBACK_FLOOR_SECONDS)
+                )
+                if budget_spent:
+                    metrics.increment("llm_tool_loop_budget_exhausted")
+
+                async with upstream_slot("openai.chat"):
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        tools=APPOINTMENT_TOOLS,
+                        tool_choice="none" if budget_spent else "auto",
+                        parallel_tool_calls=True,
+                        timeout=stage_timeout(settings.OPENAI_TIMEOUT, floor=settings.CHAT_FALLBACK_FLOOR_SECONDS)
+                    )
+                round_trips += 1
+                if response.usage:
+                    prompt_tokens += response.usage.prompt_tokens
+                    completion_tokens += response.usage.completion_tokens
+                    details = getattr(response.usage, "prompt_tokens_details", None)
+                    cached_tokens += (getattr(details, "cached_tokens", None) or 0)
+
+                message = response.choices[0].message
+                tool_calls = self._parse_tool_calls(message)
+                if not tool_calls or budget_spent:
+                    content = message.content
+                    break
+
+                # Keep the assistant tool_calls message and every result in the running prompt
+                messages.append({
+                    "role": "assistant",
+                    "content": message.content,
+                    "tool_calls": [
+                        {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                        for call in message.tool_calls
+                    ]
+                })
+                results = await execute_tools(tool_calls)
+                messages.extend(
+                    {"role": "tool", "tool_call_id": call["id"], "content": result}
+                    for call, result in zip(tool_calls, results)
+                )
         except Exception as e:
-            return {"type": "text", "content": f"Error generating response: {str(e)}"}
+            content = f"Error generating response: {str(e)}"
+        finally:
+            metrics.observe("llm_round_trips_per_turn", round_trips)
+            metrics.observe("llm_tokens_per_turn", prompt_tokens + completion_tokens)
+            metrics.increment("llm_prompt_tokens", prompt_tokens)
+            metrics.increment("llm_cached_prompt_tokens", cached_tokens)
+            metrics.increment("llm_completion_tokens", completion_tokens)
 
-    async def continue_with_function_result(
-        self,
-        system_instruction: str,
-        function_name: str,
-        function_result: str
-    ) -> Dict[str, Any]:
+        return {
+            "content": content or "Je n'ai pas compris.",
+            "round_trips": round_trips,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens
+        }
+
+    async def summarize_conversation(self, previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
         """
-        Continue the conversation after executing a function call.
+        Fold older conversation messages into a short running summary (French).
+        Uses the cheap summary model; keeps IDs, dates and patient details the tools need later.
         """
+        if not messages:
+            return previous_summary or ""
         if not self.client:
-            return {"type": "text", "content": "OpenAI API Key not configured."}
-        
-        messages = [
-            {"role": "system", "content": system_instruction},
-            {"role": "system", "content": f"System (Tool '{function_name}' Output): {function_result}"},
-            {"role": "user", "content": "Continue la conversation en te basant sur ce résultat. Si c'est une liste de créneaux, propose-les clairement."}
-        ]
-        
-        try:
+            return previous_summary or ""
+
+        lines = []
+        for msg in messages:
+            if msg.get("tool_calls"):
+                for call in msg["tool_calls"]:
+                    lines.append(f"Appel outil {call['function']['name']}: {call['function']['arguments']}")
+            elif msg["role"] == "tool":
+                lines.append(f"Résultat outil: {msg['content']}")
+            else:
+                lines.append(f"{msg['role']}: {msg['content']}")
+        transcript = "\n".join(lines)
+
+        async with upstream_slot("openai.chat", Priority.BACKGROUND):
             response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages
+                model=settings.OPENAI_SUMMARY_MODEL,
+                messages=[
+                    {
+                        "role": "system",
+                        "content": """Tu résumes une conversation entre un utilisateur et un assistant vocal.
+Mets à jour le résumé existant avec les nouveaux échanges, en 10 lignes maximum.
+Conserve les faits utiles pour la suite: demandes de l'utilisateur, spécialité, médecin (avec son ID), dates et heures, nom, email, téléphone, motif, rendez-vous réservés.
+N'inclus pas les listes complètes de créneaux, seulement ce que l'utilisateur a retenu ou choisi.
+Réponds uniquement avec le résumé."""
+                    },
+                    {"role": "user", "content": f"Résumé existant:\n{previous_summary or '(aucun)'}\n\nNouveaux échanges:\n{transcript}"}
+                ],
+                temperature=0,
+                max_tokens=400
             )
-            
-            message = response.choices[0].message
-             
-            # Check for MORE tool calls (nested)
-            if message.tool_calls:
-                tool_call = message.tool_calls[0]
-                return {
-                    "type": "function_call",
-                    "content": {
-                        "name": tool_call.function.name,
-                        "args": json.loads(tool_call.function.arguments)
-                    }
-                }
-            
-            return {"type": "text", "content": message.content}
-            
-        except Exception as e:
-            return {"type": "text", "content": f"Error: {str(e)}"}
+        return (response.choices[0].message.content or previous_summary or "").strip()
 
     async def translate_wolof_to_french(self, text: str) -> str:
         """Translate Wolof text to French using LAfricaMobile."""
@@ -294,21 +353,39 @@ class LLMService:
 
         # NLLB and GPT Fallback REMOVED to ensure strict usage of LAfricaMobile
 
-    async def detect_language(self, text: str) -> str:
+    async def detect_language(self, text: str, session_language: Optional[str] = None) -> str:
         """
-        Detect the language of the given text using GPT.
+        Detect the language of the given text.
+        Uses the local n-gram detector first and only asks GPT when its confidence
+        is below TEXT_LID_MIN_CONFIDENCE (mixed or ambiguous inputs).
+        Inputs shorter than TEXT_LID_MIN_WORDS ("ok", "merci") say little about the
+        language: they keep the session's language when it is known, otherwise a confident
+        local guess, otherwise French (no LLM call for a single token).
         Returns ISO language code: 'wo' for Wolof, 'fr' for French, etc.
         """
+        from app.services.langid import get_text_language_detector
+
+        detector = get_text_language_detector()
+        local_lang, confidence = detector.detect(text)
+        if local_lang != "ar" and detector.word_count(text) < settings.TEXT_LID_MIN_WORDS:
+            if session_language:
+                return session_language
+            return local_lang if confidence >= settings.TEXT_LID_MIN_CONFIDENCE else "fr"
+        if confidence >= settings.TEXT_LID_MIN_CONFIDENCE:
+            return local_lang
+        print(f"[Language] Local detection unsure ({local_lang}, {confidence:.0%}), asking LLM...")
+
         if not self.client or not text.strip():
-            return "fr"  # Default to French
+            return local_lang if confidence > 0 else (session_language or "fr")  # Default to French
         
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """Tu es un detecteur de langue expert. Identifie la langue du texte suivant.
+            async with upstream_slot("openai.chat"):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": """Tu es un detecteur de langue expert. Identifie la langue du texte suivant.
 Reponds UNIQUEMENT avec le code ISO de la langue:
 - 'wo' pour Wolof
 - 'fr' pour Francais
@@ -316,12 +393,12 @@ Reponds UNIQUEMENT avec le code ISO de la langue:
 - 'ar' pour Arabe
 
 Reponds seulement avec le code, rien d'autre."""
-                    },
-                    {"role": "user", "content": text}
-                ],
-                temperature=0,
-                max_tokens=5
-            )
+                        },
+                        {"role": "user", "content": text}
+                    ],
+                    temperature=0,
+                    max_tokens=5
+                )
             detected = response.choices[0].message.content.strip().lower()
             # Clean up response
             if detected in ['wo', 'wolof']:
@@ -0,0 +1,289 @@
+"""
+Local models (MMS-LID, dofbi/wolof-asr, ADIA_TTS, xTTS): loaders and inference tasks.
+Tasks are module-level functions `task(objects, *args)` so they can run either in the API
+process or in an inference worker process (app/services/inference_server.py); arguments
+and results are plain picklable values (numpy arrays, strings, file paths).
+"""
+import os
+from typing import Any, Callable, Dict, List, Tuple
+from app.services.model_registry import model_registry, ModelSpec
+
+
+def _torch_device(cuda_name: str = "cuda") -> str:
+    import torch
+    return cuda_name if torch.cuda.is_available() else "cpu"
+
+
+def _load_mms_lid() -> dict:
+    """Facebook MMS-LID model for language identification."""
+    from transformers import Wav2Vec2ForSequenceClassification, AutoFeatureExtractor
+
+    model_id = "facebook/mms-lid-256"
+    device = _torch_device()
+    processor = AutoFeatureExtractor.from_pretrained(model_id)
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(model_id).to(device)
+    model.eval()
+    print(f"[LID] MMS-LID loaded on {device}")
+    return {"model": model, "processor": processor, "device": device}
+
+
+def _warmup_mms_lid(lid: dict):
+    import numpy as np
+    import torch
+
+    inputs = lid["processor"](np.zeros(16000, dtype=np.float32), sampling_rate=16000, return_tensors="pt")
+    with torch.no_grad():
+        lid["model"](**{k: v.to(lid["device"]) for k, v in inputs.items()})
+
+
+def _load_wolof_asr() -> dict:
+    """dofbi/wolof-asr (Whisper fine-tune) for local Wolof transcription."""
+    from transformers import WhisperForConditionalGeneration, WhisperProcessor
+
+    model_name = "dofbi/wolof-asr"
+    device = _torch_device()
+    processor = WhisperProcessor.from_pretrained(model_name)
+    model = WhisperForConditionalGeneration.from_pretrained(model_name).to(device)
+    print(f"[STT] Wolof ASR model loaded on {device}")
+    return {"model": model, "processor": processor, "device": device}
+
+
+def _load_adia_tts() -> dict:
+    """ADIA_TTS (Parler-TTS) for Wolof synthesis."""
+    from parler_tts import ParlerTTSForConditionalGeneration
+    from transformers import AutoTokenizer
+
+    device = _torch_device("cuda:0")
+    model = ParlerTTSForConditionalGeneration.from_pretrained("CONCREE/Adia_TTS").to(device)
+    tokenizer = AutoTokenizer.from_pretrained("CONCREE/Adia_TTS")
+    print(f"[Wolof] ADIA_TTS loaded on {device}")
+    return {"model": model, "tokenizer": tokenizer, "device": device}
+
+
+def _load_xtts() -> dict:
+    """GalsenAI xTTS (Wolof) with pre-computed speaker latents."""
+    import sys
+    # Adjust path to the cloned repo
+    repo_path = os.path.join(os.getcwd(), "libs", "Wolof-TTS", "notebooks", "Models", "xTTS v2")
+    if repo_path not in sys.path:
+        sys.path.append(repo_path)
+
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+
+    checkpoint_dir = os.path.join(os.getcwd(), "uploads", "models", "xtts", "galsenai-xtts-wo-checkpoints")
+
+    # Check for model existence (assume user extracted zip keeping structure)
+    # We expect Anta_GPT_XTTS_Wo folder
+    checkpoint_path = os.path.join(checkpoint_dir, "Anta_GPT_XTTS_Wo")
+    model_path = os.path.join(checkpoint_path, "best_model_89250.pth")
+    config_path = os.path.join(checkpoint_path, "config.json")
+    vocab_path = os.path.join(checkpoint_dir, "XTTS_v2.0_original_model_files", "vocab.json")
+    ref_audio = os.path.join(checkpoint_dir, "anta_sample.wav")
+
+    if not os.path.exists(config_path):
+        raise FileNotFoundError(f"xTTS config not found at {config_path}. Did you unzip the model correctly into uploads/models/xtts?")
+    if not os.path.exists(ref_audio):
+        raise FileNotFoundError(f"Reference audio missing: {ref_audio}")
+
+    print("[Wolof] Loading xTTS model...")
+    config = XttsConfig()
+    config.load_json(config_path)
+
+    model = Xtts.init_from_config(config)
+    model.load_checkpoint(config, checkpoint_path=model_path, vocab_path=vocab_path, use_deepspeed=False)
+    device = _torch_device()
+    model.to(device)
+    print(f"[Wolof] xTTS model loaded on {device}!")
+
+    # Pre-compute speaker latents
+    latents = model.get_conditioning_latents(
+        audio_path=[ref_audio],
+        gpt_cond_len=model.config.gpt_cond_len,
+        max_ref_length=model.config.max_ref_len,
+        sound_norm_refs=model.config.sound_norm_refs
+    )
+    return {"model": model, "latents": latents, "device": device}
+
+
+# --- Inference tasks ---
+
+def detect_language(lid: dict, audio) -> Tuple[str, float]:
+    """MMS-LID on 16 kHz samples. Returns (ISO 639-3 code, confidence)."""
+    import torch
+
+    print(f"[LID] Audio loaded: {len(audio)/16000:.1f}s duration")
+    
+    # Process
+    inputs = lid["processor"](audio, sampling_rate=16000, return_tensors="pt")
+    inputs = {k: v.to(lid["device"]) for k, v in inputs.items()}
+    
+    with torch.no_grad():
+        outputs = lid["model"](**inputs).logits
+    
+    # Get prediction
+    probs = torch.softmax(outputs, dim=-1)
+    
+    # Show top 5 detected languages for debugging
+    top5_probs, top5_indices = torch.topk(probs[0], 5)
+    print("[LID] ===== MMS-LID Detection Results =====")
+    for i, (prob, idx) in enumerate(zip(top5_probs, top5_indices)):
+        lang_code = lid["model"].config.id2label[idx.item()]
+        is_wolof = " <-- WOLOF!" if lang_code == "wol" else ""
+        print(f"[LID]   #{i+1}: {lang_code} ({prob.item():.1%}){is_wolof}")
+    print("[LID] ========================================")
+    
+    lang_id = torch.argmax(probs, dim=-1)[0].item()
+    confidence = probs[0, lang_id].item()
+    detected_lang = lid["model"].config.id2label[lang_id]
+    
+    # Explicit Wolof check
+    if detected_lang == "wol":
+        print(f"[LID] ✓ WOLOF DETECTED with {confidence:.1%} confidence!")
+    else:
+        print(f"[LID] ✗ Not Wolof. Detected: {detected_lang} ({confidence:.1%})")
+    
+    return detected_lang, confidence
+
+
+def detect_language_batch(lid: dict, audios: List[Any], max_pad_ratio: float = 2.0) -> List[Tuple[str, float]]:
+    """
+    MMS-LID over several utterances. Inputs are sorted by length and split into padded
+    sub-batches whose longest item is at most `max_pad_ratio` x the shortest (padding is
+    masked, but still costs compute). Results come back in input order.
+    """
+    import torch
+
+    order = sorted(range(len(audios)), key=lambda i: len(audios[i]))
+    groups, current = [], []
+    for i in order:
+        if current and len(audios[i]) > max_pad_ratio * max(1, len(audios[current[0]])):
+            groups.append(current)
+            current = []
+        current.append(i)
+    if current:
+        groups.append(current)
+
+    results: List[Tuple[str, float]] = [None] * len(audios)
+    id2label = lid["model"].config.id2label
+    for group in groups:
+        inputs = lid["processor"](
+            [audios[i] for i in group], sampling_rate=16000, padding=True,
+            return_attention_mask=True, return_tensors="pt"
+        )
+        inputs = {k: v.to(lid["device"]) for k, v in inputs.items()}
+        with torch.no_grad():
+            probs = torch.softmax(lid["model"](**inputs).logits, dim=-1)
+        confidences, lang_ids = probs.max(dim=-1)
+        for row, i in enumerate(group):
+            results[i] = (id2label[lang_ids[row].item()], confidences[row].item())
+
+    print(f"[LID] Batch of {len(audios)} ({len(groups)} forward pass(es)): "
+          + ", ".join(f"{lang} {conf:.0%}" for lang, conf in results))
+    return results
+
+
+def transcribe_wolof(asr: dict, audio) -> Tuple[str, str]:
+    """dofbi/wolof-asr on 16 kHz samples. Returns (transcription, 'wo')."""
+    import torch
+
+    input_features = asr["processor"](
+        audio, 
+        return_tensors="pt", 
+        sampling_rate=16000
+    ).input_features.to(asr["device"])
+    
+    # Generate transcription
+    with torch.no_grad():
+        predicted_ids = asr["model"].generate(input_features)
+    
+    transcription = asr["processor"].batch_decode(
+        predicted_ids, skip_special_tokens=True
+    )[0]
+    
+    return transcription, "wo"
+
+
+def synthesize_adia(adia: dict, segments: List[str], description: str, file_path: str) -> str:
+    """ADIA_TTS over pre-segmented text (200 char limit per inference), written as WAV."""
+    import torch
+    import soundfile as sf
+    import numpy as np
+    
+    all_audio = []
+    
+    for segment in segments:
+        input_ids = adia["tokenizer"](
+            description, return_tensors="pt"
+        ).input_ids.to(adia["device"])
+        
+        prompt_ids = adia["tokenizer"](
+            segment, return_tensors="pt"
+        ).input_ids.to(adia["device"])
+        
+        with torch.no_grad():
+            audio = adia["model"].generate(
+                input_ids=input_ids,
+                prompt_input_ids=prompt_ids,
+                temperature=0.8,
+                do_sample=True
+            )
+        
+        all_audio.append(audio.cpu().numpy().squeeze())
+    
+    # Concatenate all segments
+    if len(all_audio) > 1:
+        combined = np.concatenate(all_audio)
+    else:
+        combined = all_audio[0]
+    
+    # Save as WAV
+    sf.write(file_path, combined, adia["model"].config.sampling_rate)
+    return file_path
+
+
+def synthesize_xtts(xtts: dict, text: str, file_path: str) -> str:
+    """GalsenAI xTTS with the pre-computed speaker latents, written as WAV."""
+    import soundfile as sf
+    
+    # Use pre-computed latents
+    gpt_cond_latent, speaker_embedding = xtts["latents"]
+    
+    # Inference
+    output = xtts["model"].inference(
+        text=text.lower(),
+        gpt_cond_latent=gpt_cond_latent,
+        speaker_embedding=speaker_embedding,
+        do_sample=False,
+        speed=1.06,
+        language="wo",
+        enable_text_splitting=True
+    )
+    
+    # Save audio
+    sf.write(file_path, output['wav'], xtts["model"].config.sampling_rate)
+    return file_path
+
+
+# Task name -> (model it runs on, function)
+TASKS: Dict[str, Tuple[str, Callable[..., Any]]] = {
+    "detect_language": ("mms_lid", detect_language),
+    "detect_language_batch": ("mms_lid", detect_language_batch),
+    "transcribe_wolof": ("wolof_asr", transcribe_wolof),
+    "synthesize_adia": ("adia_tts", synthesize_adia),
+    "synthesize_xtts": ("xtts", synthesize_xtts),
+}
+
+# Single-input tasks micro-batched across concurrent requests (INFERENCE_BATCHING):
+# task -> batch task taking the list of inputs and returning results in the same order
+BATCHED_TASKS: Dict[str, str] = {
+    "detect_language": "detect_language_batch",
+}
+
+
+# Estimated sizes (fp32 weights) are only used to make room before the first load;
+# the measured size replaces them once a model is resident.
+model_registry.register(ModelSpec("mms_lid", _load_mms_lid, estimated_bytes=4 * 1024 ** 3, warmup=_warmup_mms_lid))
+model_registry.register(ModelSpec("wolof_asr", _load_wolof_asr, estimated_bytes=1 * 1024 ** 3))
+model_registry.register(ModelSpec("adia_tts", _load_adia_tts, estimated_bytes=4 * 1024 ** 3))
+model_registry.register(ModelSpec("xtts", _load_xtts, estimated_bytes=2 * 1024 ** 3))
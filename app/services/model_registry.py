@@ -0,0 +1,262 @@
+import asyncio
+import gc
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+from app.core.config import settings
+from app.core.metrics import metrics
+
+logger = logging.getLogger("uvicorn")
+
+
+class ModelUnavailableError(Exception):
+    """Raised when a local model cannot be made resident (memory budget full of busy models, load failure)."""
+
+
+def _rss_bytes() -> int:
+    """Resident memory of this process (Linux), 0 when unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _tensor_bytes(objects: Dict[str, Any]) -> int:
+    """Parameter + buffer bytes of the torch modules among a model's objects."""
+    total = 0
+    for obj in objects.values():
+        for attr in ("parameters", "buffers"):
+            tensors = getattr(obj, attr, None)
+            if not callable(tensors):
+                continue
+            try:
+                total += sum(t.numel() * t.element_size() for t in tensors())
+            except Exception:
+                pass
+    return total
+
+
+class ModelSpec:
+    """How to load one local model. `loader` is blocking and returns a dict of objects (model, processor, device...)."""
+
+    def __init__(
+        self,
+        name: str,
+        loader: Callable[[], Dict[str, Any]],
+        estimated_bytes: int,
+        warmup: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.name = name
+        self.loader = loader
+        self.estimated_bytes = estimated_bytes
+        self.warmup = warmup
+
+
+class ResidentModel:
+    def __init__(self, name: str, objects: Dict[str, Any], size_bytes: int):
+        self.name = name
+        self.objects = objects
+        self.size_bytes = size_bytes
+        self.in_use = 0
+        self.last_used = time.monotonic()
+
+
+class ModelRegistry:
+    """
+    Owns the local (in-process) models: MMS-LID, dofbi/wolof-asr, ADIA_TTS, xTTS.
+    - single-flight loading: concurrent first requests wait for one load (run in a thread,
+      so the event loop keeps serving other requests meanwhile)
+    - shared by every AudioService instance (one copy of each model per process)
+    - memory budget: before a load, least recently used idle models are unloaded until the
+      new one fits LOCAL_MODELS_MAX_BYTES; models in use are never unloaded
+    - idle models are unloaded after LOCAL_MODELS_IDLE_SECONDS (preloaded ones are kept)
+    - LOCAL_MODELS_PRELOAD are loaded and warmed up at startup
+    Usage:
+        async with model_registry.use("mms_lid") as lid:
+            await loop.run_in_executor(None, lambda: lid["model"](...))
+    """
+
+    def __init__(self):
+        self._specs: Dict[str, ModelSpec] = {}
+        self._resident: Dict[str, ResidentModel] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._reserved: Dict[str, int] = {}  # Loads in progress -> estimated bytes (counted in the budget)
+        self._loads_changed = asyncio.Condition()
+        self._pinned: set = set()
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def register(self, spec: ModelSpec):
+        self._specs[spec.name] = spec
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(m.size_bytes for m in self._resident.values())
+
+    @property
+    def reserved_bytes(self) -> int:
+        return sum(self._reserved.values())
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "name": name,
+                "resident": name in self._resident,
+                "size_bytes": self._resident[name].size_bytes if name in self._resident else None,
+                "in_use": self._resident[name].in_use if name in self._resident else 0,
+                "idle_seconds": round(now - self._resident[name].last_used, 1) if name in self._resident else None,
+                "pinned": name in self._pinned,
+            }
+            for name in self._specs
+        ]
+
+    @asynccontextmanager
+    async def use(self, name: str):
+        """Hold a model resident for the duration of one inference and yield its objects."""
+        model = await self._acquire(name)
+        start = time.monotonic()
+        try:
+            yield model.objects
+        finally:
+            model.in_use -= 1
+            model.last_used = time.monotonic()
+            metrics.observe("model_inference_ms", (model.last_used - start) * 1000, model=name)
+
+    async def _acquire(self, name: str) -> ResidentModel:
+        if name not in self._specs:
+            raise ModelUnavailableError(f"Unknown local model '{name}'")
+
+        model = self._resident.get(name)
+        if model is None:
+            lock = self._locks.setdefault(name, asyncio.Lock())
+            if lock.locked():
+                metrics.increment("model_load_waits", model=name)
+            async with lock:
+                model = self._resident.get(name)
+                if model is None:
+                    model = await self._load(self._specs[name])
+        # Taken before any await so a concurrent eviction cannot unload it under us
+        model.in_use += 1
+        return model
+
+    async def _load(self, spec: ModelSpec) -> ResidentModel:
+        await self._make_room(spec.estimated_bytes, for_model=spec.name)
+        # Reserved with no await since the budget check: concurrent loads of other models see it
+        self._reserved[spec.name] = spec.estimated_bytes
+
+        logger.info(f"[Models] Loading {spec.name}...")
+        loop = asyncio.get_running_loop()
+        rss_before = _rss_bytes()
+        start = time.monotonic()
+        try:
+            objects = await loop.run_in_executor(None, spec.loader)
+            if spec.warmup:
+                # First forward pass allocates kernels/buffers: pay it here, not on a user request
+                await loop.run_in_executor(None, spec.warmup, objects)
+        except Exception as e:
+            metrics.increment("model_load_failures", model=spec.name)
+            logger.error(f"[Models] Failed to load {spec.name}: {e}")
+            raise ModelUnavailableError(f"{spec.name}: {e}") from e
+        finally:
+            self._reserved.pop(spec.name, None)
+            async with self._loads_changed:
+                self._loads_changed.notify_all()
+        elapsed = time.monotonic() - start
+
+        size = _tensor_bytes(objects) or max(0, _rss_bytes() - rss_before) or spec.estimated_bytes
+        model = ResidentModel(spec.name, objects, size)
+        self._resident[spec.name] = model
+        metrics.observe("model_load_seconds", elapsed, model=spec.name)
+        metrics.increment("model_loads", model=spec.name)
+        self._update_gauges()
+        logger.info(f"[Models] {spec.name} loaded in {elapsed:.1f}s ({size / 1024 ** 3:.2f} GB, "
+                    f"{self.resident_bytes / 1024 ** 3:.2f} GB resident)")
+        return model
+
+    async def _make_room(self, needed: int, for_model: str):
+        """
+        Unload least recently used idle models until `needed` more bytes fit the budget.
+        Loads in progress count with their estimated size; when only they stand in the way,
+        wait for them to finish (the loaded model may then be idle and evictable).
+        """
+        budget = settings.LOCAL_MODELS_MAX_BYTES
+        while self.resident_bytes + self.reserved_bytes + needed > budget:
+            idle = [m for m in self._resident.values() if m.in_use == 0]
+            if not idle:
+                if not self._resident and not self._reserved:
+                    return  # Nothing to free: a lone model larger than the budget still loads
+                if self._reserved:
+                    metrics.increment("model_budget_waits", model=for_model)
+                    async with self._loads_changed:
+                        await self._loads_changed.wait()
+                    continue
+                metrics.increment("model_budget_rejections", model=for_model)
+                raise ModelUnavailableError(
+                    f"{for_model}: memory budget full ({self.resident_bytes / 1024 ** 3:.2f} GB in use)"
+                )
+            self._unload(min(idle, key=lambda m: m.last_used), reason="budget")
+
+    def _unload(self, model: ResidentModel, reason: str):
+        self._resident.pop(model.name, None)
+        model.objects.clear()
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        metrics.increment("model_evictions", model=model.name, reason=reason)
+        self._update_gauges()
+        logger.info(f"[Models] Unloaded {model.name} ({reason})")
+
+    def evict_idle(self):
+        """Unload models unused for LOCAL_MODELS_IDLE_SECONDS (except preloaded ones)."""
+        idle_seconds = settings.LOCAL_MODELS_IDLE_SECONDS
+        if not idle_seconds:
+            return
+        now = time.monotonic()
+        for model in list(self._resident.values()):
+            if model.in_use == 0 and model.name not in self._pinned and now - model.last_used > idle_seconds:
+                self._unload(model, reason="idle")
+
+    def _update_gauges(self):
+        for name in self._specs:
+            model = self._resident.get(name)
+            metrics.set_gauge("model_resident_bytes", model.size_bytes if model else 0, model=name)
+        metrics.set_gauge("models_resident_bytes_total", self.resident_bytes)
+
+    async def start(self, preload: Optional[List[str]] = None):
+        """Startup: preload/warm up `preload` (default LOCAL_MODELS_PRELOAD) and start the idle sweeper."""
+        for name in settings.LOCAL_MODELS_PRELOAD if preload is None else preload:
+            if name not in self._specs:
+                logger.warning(f"[Models] Unknown model in LOCAL_MODELS_PRELOAD: {name}")
+                continue
+            self._pinned.add(name)
+            try:
+                model = await self._acquire(name)
+                model.in_use -= 1
+            except ModelUnavailableError:
+                pass  # Logged; loaded lazily on first use instead
+        if self._sweeper is None and settings.LOCAL_MODELS_IDLE_SECONDS:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            self._sweeper = None
+
+    async def _sweep(self):
+        interval = max(10.0, settings.LOCAL_MODELS_IDLE_SECONDS / 4)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"[Models] Idle sweep failed: {e}")
+
+
+model_registry = ModelRegistry()
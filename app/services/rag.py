@@ -1,6 +1,9 @@
-from typing import List
+from array import array
+from collections import OrderedDict
+from typing import Dict, List
 from openai import AsyncOpenAI
 from app.core.config import settings
+from app.core.admission import upstream_slot, Priority
 
 class RAGService:
     def __init__(self):
@@ -8,15 +11,56 @@ class RAGService:
         self.client = AsyncOpenAI(
             api_key=settings.OPENAI_API_KEY,
             timeout=settings.OPENAI_TIMEOUT,
-            max_retries=settings.OPENAI_MAX_RETRIES
+            max_retries=settings.OPENAI_MAX_RETRIES,
+            base_url=settings.OPENAI_BASE_URL
         )
         self.model = "text-embedding-3-small"
+        # Small LRU of recent query embeddings (repeated questions, batch replays), stored as
+        # float32 arrays (~6 KB each instead of ~50 KB as a list of Python floats)
+        self._cache: "OrderedDict[str, array]" = OrderedDict()
+        self.cache_size = settings.EMBEDDING_CACHE_SIZE
 
-    async def embed_text(self, text: str) -> List[float]:
-        """Generate embedding using OpenAI API"""
-        text = text.replace("\n", " ")
-        response = await self.client.embeddings.create(input=[text], model=self.model)
-        return response.data[0].embedding
+    def _cache_get(self, text: str):
+        embedding = self._cache.get(text)
+        if embedding is None:
+            return None
+        self._cache.move_to_end(text)
+        return embedding.tolist()
+
+    def _cache_put(self, text: str, embedding: List[float]):
+        self._cache[text] = array("f", embedding)
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def embed_text(self, text: str, priority: int = Priority.INTERACTIVE) -> List[float]:
+        """
+        Generate embedding using OpenAI API (use Priority.BACKGROUND for KB ingestion).
+        Only interactive embeds use the cache: ingestion chunks are embedded once and would
+        push the hot query entries out.
+        """
+        return (await self.embed_texts([text], priority))[0]
+
+    async def embed_texts(self, texts: List[str], priority: int = Priority.INTERACTIVE, batch_size: int = 100) -> List[List[float]]:
+        """Embed many texts with one API call per batch_size uncached inputs (interactive results are cached for embed_text)"""
+        use_cache = priority == Priority.INTERACTIVE
+        texts = [t.replace("\n", " ") for t in texts]
+        embeddings: Dict[str, List[float]] = {}
+        if use_cache:
+            for t in texts:
+                cached = self._cache_get(t)
+                if cached is not None:
+                    embeddings[t] = cached
+        missing = [t for t in dict.fromkeys(texts) if t not in embeddings]
+        for i in range(0, len(missing), batch_size):
+            batch = missing[i:i + batch_size]
+            async with upstream_slot("openai.embeddings", priority):
+                response = await self.client.embeddings.create(input=batch, model=self.model)
+            for text, item in zip(batch, response.data):
+                embeddings[text] = item.embedding
+                if use_cache:
+                    self._cache_put(text, item.embedding)
+        return [embeddings[t] for t in texts]
 
     async def search_kb(self, db, entity_id, query_embedding, top_k=3):
         from sqlalchemy import select
@@ -41,6 +41,20 @@ class MinioService:
         """
         return self.client.presigned_get_object(self.bucket_name, file_name)
 
+    def upload_path(self, file_path: str, object_name: str, content_type: str) -> str:
+        """Uploads a local file (streamed from disk) and returns the object name."""
+        self.client.fput_object(self.bucket_name, object_name, file_path, content_type=content_type)
+        return object_name
+
+    def object_exists(self, object_name: str) -> bool:
+        try:
+            self.client.stat_object(self.bucket_name, object_name)
+            return True
+        except S3Error as e:
+            if e.code in ("NoSuchKey", "NoSuchObject"):
+                return False
+            raise
+
     def delete_file(self, file_name: str):
         self.client.remove_object(self.bucket_name, file_name)
 
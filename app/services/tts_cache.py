@@ -0,0 +1,221 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Optional
+from sqlalchemy import select, func, update, delete, literal
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.chat import Message
+from app.models.custom_chat import CustomChatMessage
+from app.models.tts_cache import TTSCacheEntry
+from app.services.upload_storage import upload_path
+
+logger = logging.getLogger("uvicorn")
+
+# Cached files are named tts_<sha256>.<ext> (the uploads sweeper leaves them to the cache eviction,
+# which hands them back to the sweeper when messages still reference them)
+TTS_CACHE_PREFIX = "tts_"
+EVICT_DEBOUNCE_SECONDS = 10.0  # One eviction pass per burst of stores, off the request path
+# Only entries idle longer than any turn are evicted: a turn that looked a file up has stored its message
+EVICT_MIN_IDLE_SECONDS = 300.0
+
+
+def normalize_tts_text(text: str) -> str:
+    """Same spoken output for trivially different strings (unicode form, whitespace)."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def tts_cache_key(text: str, language: str, voice: str, backend: str, model: str, output_format: str = "") -> str:
+    raw = "\x1f".join([backend, model, voice, language, output_format, normalize_tts_text(text)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Content-addressed TTS audio cache.
+    Files are tts_<sha256>.<ext> uploads (same storage layout as the other audio, since clients
+    build /uploads/<basename> URLs from the returned path). Metadata (hits, last use, size) is
+    in the tts_cache table; least recently used entries are evicted once the cache exceeds
+    TTS_CACHE_MAX_BYTES, in a debounced background pass.
+    Database errors never fail a TTS request: synthesis just runs uncached.
+    """
+
+    def __init__(self, upload_dir: str):
+        self.cache_dir = upload_dir
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._evict_task: Optional[asyncio.Task] = None
+
+    async def get_or_synthesize(
+        self,
+        text: str,
+        language: str,
+        voice: str,
+        backend: str,
+        model: str,
+        synthesize: Callable[[], Awaitable[str]],
+        output_format: str = ""
+    ) -> str:
+        """Return a cached audio path for this utterance and output format, synthesizing (once) on a miss."""
+        if not settings.TTS_CACHE_ENABLED or len(text) > settings.TTS_CACHE_MAX_TEXT_CHARS:
+            return await synthesize()
+
+        key = tts_cache_key(text, language, voice, backend, model, output_format)
+
+        cached = await self._lookup(key)
+        if cached:
+            metrics.increment("tts_cache_requests", backend=backend, result="hit")
+            return cached
+
+        # Concurrent misses for the same utterance share one synthesis
+        in_flight = self._in_flight.get(key)
+        if in_flight:
+            metrics.increment("tts_cache_requests", backend=backend, result="joined")
+            return await asyncio.shield(in_flight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            metrics.increment("tts_cache_requests", backend=backend, result="miss")
+            path = await synthesize()
+            path = await self._store(key, path, text, language, voice, backend, model)
+            future.set_result(path)
+            return path
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody joined
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _lookup(self, key: str) -> Optional[str]:
+        try:
+            async with AsyncSessionLocal() as db:
+                # Touch and read in one statement: an entry evicted concurrently is a miss, never a stale path
+                file_path = (await db.execute(
+                    update(TTSCacheEntry)
+                    .where(TTSCacheEntry.cache_key == key)
+                    .values(hit_count=TTSCacheEntry.hit_count + 1, last_used_at=func.now())
+                    .returning(TTSCacheEntry.file_path)
+                )).scalar_one_or_none()
+                if file_path and not os.path.exists(file_path):
+                    # File removed behind our back: forget the entry and re-synthesize
+                    await db.execute(delete(TTSCacheEntry).where(TTSCacheEntry.cache_key == key))
+                    file_path = None
+                await db.commit()
+                return file_path
+        except Exception as e:
+            logger.warning(f"[TTSCache] Lookup failed ({e}), synthesizing uncached")
+            return None
+
+    async def _store(self, key, path, text, language, voice, backend, model) -> str:
+        """Move the fresh file into the cache and record it. Returns the path to serve."""
+        ext = os.path.splitext(path)[1] or ".mp3"
+        cached_path = upload_path(f"{TTS_CACHE_PREFIX}{key}{ext}", self.cache_dir)
+        try:
+            os.replace(path, cached_path)
+            async with AsyncSessionLocal() as db:
+                await db.merge(TTSCacheEntry(
+                    cache_key=key,
+                    backend=backend,
+                    model=model,
+                    voice=voice,
+                    language=language,
+                    text=normalize_tts_text(text),
+                    file_path=cached_path,
+                    size_bytes=os.path.getsize(cached_path),
+                    hit_count=0,
+                    last_used_at=datetime.now(timezone.utc)
+                ))
+                await db.commit()
+            self._schedule_evict()
+            return cached_path
+        except Exception as e:
+            logger.warning(f"[TTSCache] Store failed ({e}), serving uncached file")
+            return cached_path if os.path.exists(cached_path) else path
+
+    def _schedule_evict(self):
+        if self._evict_task is None or self._evict_task.done():
+            self._evict_task = asyncio.get_running_loop().create_task(self._evict_later())
+
+    async def _evict_later(self):
+        await asyncio.sleep(EVICT_DEBOUNCE_SECONDS)
+        try:
+            async with AsyncSessionLocal() as db:
+                await self._evict(db)
+        except Exception as e:
+            logger.warning(f"[TTSCache] Eviction failed: {e}")
+
+    async def _evict(self, db):
+        """Drop least recently used entries until the cache fits TTS_CACHE_MAX_BYTES."""
+        total = (await db.execute(select(func.coalesce(func.sum(TTSCacheEntry.size_bytes), 0)))).scalar_one()
+        metrics.set_gauge("tts_cache_bytes", total)
+        if total <= settings.TTS_CACHE_MAX_BYTES:
+            return
+
+        idle = TTSCacheEntry.last_used_at < func.now() - func.make_interval(0, 0, 0, 0, 0, 0, EVICT_MIN_IDLE_SECONDS)
+        result = await db.execute(
+            select(TTSCacheEntry.cache_key, TTSCacheEntry.size_bytes)
+            .where(idle)
+            .order_by(TTSCacheEntry.last_used_at.asc())
+            .limit(500)
+        )
+        candidates = []
+        for key, size in result.all():
+            if total <= settings.TTS_CACHE_MAX_BYTES:
+                break
+            candidates.append(key)
+            total -= size
+        if not candidates:
+            return
+
+        # Delete the entries and read whether messages reference their files in one statement: once
+        # the row is gone no lookup can hand the path out, so "unreferenced" stays true
+        file_name = func.regexp_replace(TTSCacheEntry.file_path, r"^.*[/\\]", "")
+        referenced = (
+            select(Message.message_id).where(Message.audio_path == TTSCacheEntry.file_path)
+            .correlate(TTSCacheEntry).exists()
+            | select(CustomChatMessage.id).where(CustomChatMessage.audio_url == literal("/uploads/") + file_name)
+            .correlate(TTSCacheEntry).exists()
+        )
+        columns = [column for column in TTSCacheEntry.__table__.columns]
+        evicted = (await db.execute(
+            delete(TTSCacheEntry)
+            .where(TTSCacheEntry.cache_key.in_(candidates), idle)
+            .returning(*columns, referenced.label("referenced"))
+            .execution_options(synchronize_session=False)
+        )).mappings().all()
+        await db.commit()
+        if not evicted:
+            return
+
+        loop = asyncio.get_running_loop()
+        for row in evicted:
+            if not row["referenced"]:
+                await loop.run_in_executor(None, _remove, row["file_path"])
+
+        # Files messages still play: the sweeper archives/deletes them and updates the references
+        from app.services.uploads_sweeper import uploads_sweeper
+        in_use = [row for row in evicted if row["referenced"]]
+        released = set(await uploads_sweeper.release_files([row["file_path"] for row in in_use])) if in_use else set()
+        kept = [row for row in in_use if row["file_path"] not in released]
+        if kept:
+            # Archive failed: back in the cache, retried at the next eviction
+            db.add_all([TTSCacheEntry(**{column.key: row[column.key] for column in columns}) for row in kept])
+            await db.commit()
+
+        total = (await db.execute(select(func.coalesce(func.sum(TTSCacheEntry.size_bytes), 0)))).scalar_one()
+        metrics.increment("tts_cache_evictions", len(evicted) - len(kept))
+        metrics.set_gauge("tts_cache_bytes", total)
+        logger.info(f"[TTSCache] Evicted {len(evicted) - len(kept)} entries")
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
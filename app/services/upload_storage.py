@@ -0,0 +1,45 @@
+import hashlib
+import os
+import uuid
+from typing import Optional
+from app.core.config import settings
+
+# UPLOAD_DIR layout: <ab>/<cd>/<name>, where abcd are the first hex digits of sha1(name).
+# The shard is derived from the file name alone, so /uploads/<name> URLs (clients only
+# keep the basename) resolve without a lookup table. Files written before sharding stay
+# flat in UPLOAD_DIR until scripts/shard_uploads.py moves them; both are served.
+
+
+def shard_dir(filename: str) -> str:
+    digest = hashlib.sha1(filename.encode("utf-8")).hexdigest()
+    return os.path.join(digest[:2], digest[2:4])
+
+
+def upload_path(filename: str, upload_dir: Optional[str] = None) -> str:
+    """Where a new file named `filename` is stored (shard directory created on demand)."""
+    root = upload_dir or settings.UPLOAD_DIR
+    if not settings.UPLOADS_SHARDED:
+        return os.path.join(root, filename)
+    directory = os.path.join(root, shard_dir(filename))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def new_upload_path(ext: str, upload_dir: Optional[str] = None) -> str:
+    """Path for a new uniquely named file, e.g. new_upload_path(".mp3")."""
+    return upload_path(f"{uuid.uuid4()}{ext}", upload_dir)
+
+
+def locate_upload(filename: str, upload_dir: Optional[str] = None) -> Optional[str]:
+    """Existing file by name: sharded location first, then the legacy flat layout."""
+    root = upload_dir or settings.UPLOAD_DIR
+    filename = os.path.basename(filename.replace("\\", "/"))
+    for path in (os.path.join(root, shard_dir(filename), filename), os.path.join(root, filename)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def archive_object_name(filename: str) -> str:
+    """MinIO object an archived upload is moved to."""
+    return f"{settings.UPLOADS_ARCHIVE_PREFIX}{os.path.basename(filename)}"
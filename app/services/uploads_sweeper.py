@@ -0,0 +1,242 @@
+import asyncio
+import logging
+import mimetypes
+import os
+import time
+from typing import List, Optional
+from sqlalchemy import select, update, func, text
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import metrics
+from app.models.chat import Message
+from app.models.custom_chat import CustomChatConfig, CustomChatMessage
+from app.models.entity import Entity, Instance
+from app.services.tts_cache import TTS_CACHE_PREFIX
+from app.services.upload_storage import archive_object_name, locate_upload
+
+logger = logging.getLogger("uvicorn")
+
+ARCHIVED_PATH_PREFIX = "s3://"  # Message.audio_path of archived audio: s3://<bucket>/<object>
+ARCHIVED_URL_PREFIX = "/uploads/archive/"  # CustomChatMessage.audio_url of archived audio
+PART_FILE_MAX_AGE = 3600  # Interrupted uploads (.part) older than this are removed
+SKIPPED_DIRS = {"models"}  # Model checkpoints under UPLOAD_DIR are not uploads
+SWEEP_LOCK_KEY = 48_110_001  # pg advisory lock: one app worker sweeps a batch at a time
+
+
+class UploadsSweeper:
+    """
+    Background lifecycle of UPLOAD_DIR:
+    - chat audio (Message.audio_path) older than its entity's retention is archived to
+      MinIO or deleted (UPLOADS_RETENTION_ACTION) and the reference updated; archived files
+      stay reachable at /uploads/<name> (redirect to MinIO)
+    - custom chatbot message audio follows UPLOADS_RETENTION_DAYS; pre-synthesized config
+      audio and TTS cache files (tts_*) are not swept: the cache evicts its own files through
+      `release_files`, which archives/deletes the ones messages still reference
+    - interrupted uploads (.part) are removed
+    - disk usage gauges: uploads_bytes, uploads_files, uploads_flat_files
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self._task is None and settings.UPLOADS_SWEEP_INTERVAL_SECONDS:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(settings.UPLOADS_SWEEP_INTERVAL_SECONDS)
+            try:
+                await self.sweep_once()
+            except Exception as e:
+                logger.error(f"[Uploads] Sweep failed: {e}")
+
+    async def sweep_once(self):
+        start = time.monotonic()
+        if settings.UPLOADS_RETENTION_ACTION not in ("archive", "delete"):
+            logger.error(f"[Uploads] Unknown UPLOADS_RETENTION_ACTION '{settings.UPLOADS_RETENTION_ACTION}', retention skipped")
+        else:
+            messages = await self._expire_chat_audio()
+            custom = await self._expire_custom_chat_audio()
+            if messages or custom:
+                logger.info(f"[Uploads] Retention: {messages} chat / {custom} custom chat audio files expired")
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._scan_disk)
+        metrics.observe("uploads_sweep_seconds", time.monotonic() - start)
+
+    # --- Retention ---
+
+    async def _expire_chat_audio(self) -> int:
+        retention_days = func.coalesce(Entity.audio_retention_days, settings.UPLOADS_RETENTION_DAYS)
+        query = (
+            select(Message.message_id, Message.audio_path)
+            .join(Instance, Message.instance_id == Instance.instance_id)
+            .join(Entity, Instance.entity_id == Entity.entity_id)
+            .where(
+                Message.audio_path.isnot(None),
+                ~Message.audio_path.startswith(ARCHIVED_PATH_PREFIX),
+                ~Message.audio_path.contains(TTS_CACHE_PREFIX),
+                retention_days > 0,
+                Message.created_at < func.now() - func.make_interval(0, 0, 0, retention_days),
+            )
+            .limit(settings.UPLOADS_SWEEP_BATCH)
+        )
+        expired = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                if not await _try_lock(db):
+                    return expired  # Another worker is sweeping
+                rows = (await db.execute(query)).all()
+                if not rows:
+                    return expired
+                done = 0
+                for message_id, audio_path in rows:
+                    new_path = await self._expire_file(audio_path)
+                    if new_path is False:
+                        continue  # Archive failed: retried next sweep
+                    await db.execute(update(Message).where(Message.message_id == message_id).values(audio_path=new_path))
+                    done += 1
+                await db.commit()
+            expired += done
+            if done == 0 or len(rows) < settings.UPLOADS_SWEEP_BATCH:
+                return expired
+
+    async def _expire_custom_chat_audio(self) -> int:
+        if settings.UPLOADS_RETENTION_DAYS <= 0:
+            return 0
+        query = (
+            select(CustomChatMessage.id, CustomChatMessage.audio_url)
+            .where(
+                CustomChatMessage.audio_url.isnot(None),
+                ~CustomChatMessage.audio_url.startswith(ARCHIVED_URL_PREFIX),
+                ~CustomChatMessage.audio_url.contains(TTS_CACHE_PREFIX),
+                CustomChatMessage.created_at < func.now() - func.make_interval(0, 0, 0, settings.UPLOADS_RETENTION_DAYS),
+            )
+            .limit(settings.UPLOADS_SWEEP_BATCH)
+        )
+        expired = 0
+        while True:
+            async with AsyncSessionLocal() as db:
+                if not await _try_lock(db):
+                    return expired  # Another worker is sweeping
+                pinned = set((await db.execute(
+                    select(CustomChatConfig.audio_url).where(CustomChatConfig.audio_url.isnot(None))
+                )).scalars())
+                batch_query = query.where(CustomChatMessage.audio_url.notin_(pinned)) if pinned else query
+                rows = (await db.execute(batch_query)).all()
+                if not rows:
+                    return expired
+                done = 0
+                for message_id, audio_url in rows:
+                    new_path = await self._expire_file(audio_url)
+                    if new_path is False:
+                        continue
+                    new_url = f"{ARCHIVED_URL_PREFIX}{os.path.basename(audio_url)}" if new_path else None
+                    await db.execute(update(CustomChatMessage).where(CustomChatMessage.id == message_id).values(audio_url=new_url))
+                    done += 1
+                await db.commit()
+            expired += done
+            if done == 0 or len(rows) < settings.UPLOADS_SWEEP_BATCH:
+                return expired
+
+    async def release_files(self, paths: List[str]) -> List[str]:
+        """
+        Files evicted from the TTS cache that messages still reference: archived or deleted
+        like expired audio, with every reference updated. Returns the released paths (the
+        others are handed back to the cache and retried at the next eviction).
+        """
+        released = []
+        async with AsyncSessionLocal() as db:
+            if not await _try_lock(db):
+                return released  # Another worker is sweeping
+            for path in paths:
+                name = os.path.basename(path.replace("\\", "/"))
+                new_path = await self._expire_file(path)
+                if new_path is False:
+                    continue  # Archive failed
+                new_url = f"{ARCHIVED_URL_PREFIX}{name}" if new_path else None
+                await db.execute(update(Message).where(Message.audio_path == path).values(audio_path=new_path))
+                await db.execute(
+                    update(CustomChatMessage).where(CustomChatMessage.audio_url == f"/uploads/{name}").values(audio_url=new_url)
+                )
+                released.append(path)
+            await db.commit()
+        return released
+
+    async def _expire_file(self, reference: str):
+        """Archive or delete one file. Returns the new reference (None when gone), False on failure."""
+        name = os.path.basename(reference.replace("\\", "/"))
+        path = locate_upload(name)
+        if path is None:
+            return None  # Already gone: drop the dangling reference
+
+        loop = asyncio.get_running_loop()
+        if settings.UPLOADS_RETENTION_ACTION == "archive":
+            try:
+                object_name = await loop.run_in_executor(None, _archive, path, name)
+            except Exception as e:
+                metrics.increment("uploads_archive_failures")
+                logger.warning(f"[Uploads] Archiving {name} failed: {e}")
+                return False
+            metrics.increment("uploads_archived")
+            return f"{ARCHIVED_PATH_PREFIX}{settings.MINIO_BUCKET}/{object_name}"
+
+        await loop.run_in_executor(None, _remove, path)
+        metrics.increment("uploads_deleted")
+        return None
+
+    # --- Disk ---
+
+    def _scan_disk(self):
+        """Disk usage gauges and removal of stale .part files (runs in a thread)."""
+        root = settings.UPLOAD_DIR
+        total_bytes, total_files, flat_files = 0, 0, 0
+        now = time.time()
+        for directory, dirs, files in os.walk(root):
+            if directory == root:
+                dirs[:] = [d for d in dirs if d not in SKIPPED_DIRS]
+            for filename in files:
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if filename.endswith(".part") and now - stat.st_mtime > PART_FILE_MAX_AGE:
+                    _remove(path)
+                    continue
+                total_bytes += stat.st_size
+                total_files += 1
+                if directory == root:
+                    flat_files += 1
+        metrics.set_gauge("uploads_bytes", total_bytes)
+        metrics.set_gauge("uploads_files", total_files)
+        metrics.set_gauge("uploads_flat_files", flat_files)
+
+
+async def _try_lock(db) -> bool:
+    # Released at commit; without it two workers could archive and then "lose" the same file
+    return bool(await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": SWEEP_LOCK_KEY}))
+
+
+def _archive(path: str, name: str) -> str:
+    from app.services.storage import storage_service
+
+    content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    object_name = storage_service.upload_path(path, archive_object_name(name), content_type)
+    _remove(path)
+    return object_name
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+uploads_sweeper = UploadsSweeper()
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import numpy as np
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.audio import stt_backend, stt_language
+from app.services.audio_clip import AudioClip, VAD_FRAME_MS, VAD_MIN_DBFS, VAD_PADDING_MS
+from app.services.audio_normalize import SAMPLE_RATE, AudioDecodeError, StreamDecoder, encode_speech
+from app.services.inference import inference_service
+from app.services.upload_storage import new_upload_path
+
+logger = logging.getLogger("uvicorn")
+
+FRAME_SAMPLES = SAMPLE_RATE * VAD_FRAME_MS // 1000
+FRAME_BYTES = FRAME_SAMPLES * 2
+SPEECH_START_FRAMES = 3  # Consecutive voiced frames (90 ms) before speech counts as started
+VAD_MARGIN_DB = 12.0  # Voiced = this far above the running noise floor (and above VAD_MIN_DBFS)
+PADDING_SAMPLES = SAMPLE_RATE * VAD_PADDING_MS // 1000
+ENCODINGS = ("pcm16", "webm", "ogg")
+
+
+def decoder_input_args(encoding: str, sample_rate: int) -> Optional[List[str]]:
+    """ffmpeg input args for a client encoding, None when frames are already 16 kHz PCM (no decoder)."""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding '{encoding}' (expected one of: {', '.join(ENCODINGS)})")
+    if encoding == "pcm16":
+        if sample_rate == SAMPLE_RATE:
+            return None
+        return ["-f", "s16le", "-ar", str(sample_rate), "-ac", "1"]
+    return ["-f", encoding]
+
+
+class VoiceStream:
+    """
+    One utterance streamed while it is being recorded (WebSocket /chat/stream):
+    - frames are decoded as they arrive (raw 16 kHz PCM as is, WebM/Ogg through a streaming ffmpeg)
+    - a streaming energy VAD (adaptive noise floor) detects speech start and end-of-speech
+      (VOICE_STREAM_END_SILENCE_MS of trailing silence)
+    - MMS-LID runs in the background on the speech so far, from VOICE_STREAM_LID_FIRST_SECONDS,
+      re-run on twice as much speech while below LID_EXTEND_BELOW_CONFIDENCE
+    So by end-of-speech the audio is already decoded and usually the language (hence the STT
+    backend) decided: `finish()` only settles what is left and returns the AudioClip.
+    Progress is reported through `on_event` ({"type": "speech_start"}, {"type": "language", ...}).
+    """
+
+    active = 0  # Open streams in this process (VOICE_STREAM_MAX_CONCURRENT), counted from __init__ to close()
+
+    def __init__(
+        self, encoding: str = "pcm16", sample_rate: int = SAMPLE_RATE, forced_language: Optional[str] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+    ):
+        self._input_args = decoder_input_args(encoding, sample_rate)
+        self._on_event = on_event
+        self._decoder: Optional[StreamDecoder] = None
+        self._pump: Optional[asyncio.Task] = None
+        self._lid_task: Optional[asyncio.Task] = None
+        self._input_closed = False
+
+        self._pcm = bytearray()
+        self._input_bytes = 0
+        self._vad_offset = 0  # Bytes of _pcm already seen by the VAD
+        self._noise_floor: Optional[float] = None
+        self._voiced_run = 0
+        self._silence_run = 0
+        self.speech_start: Optional[int] = None  # Sample indices
+        self.speech_end: Optional[int] = None
+        self.ended = asyncio.Event()
+        self.end_reason: Optional[str] = None
+
+        # Forced language: no LID, the STT route is known before the first frame
+        self.target_language: Optional[str] = forced_language
+        self.language: Optional[str] = None  # MMS-LID code
+        self.confidence = 0.0
+        self.decided_early = False
+        self._next_lid_seconds = settings.VOICE_STREAM_LID_FIRST_SECONDS
+        self._last_lid: Optional[tuple] = None  # (lang, confidence, samples classified)
+        self._started = time.monotonic()
+        # Slot taken synchronously: the endpoint checks `active` and constructs with no await in between
+        VoiceStream.active += 1
+        self._open = True
+
+    async def start(self):
+        if self._input_args is not None:
+            self._decoder = StreamDecoder(self._input_args)
+            await self._decoder.start()
+            self._pump = asyncio.create_task(self._pump_decoder())
+
+    async def close(self):
+        if not self._open:
+            return
+        self._open = False
+        VoiceStream.active -= 1
+        for task in (self._lid_task, self._pump):
+            if task and not task.done():
+                task.cancel()
+        if self._decoder:
+            await self._decoder.stop()
+        metrics.observe("voice_stream_seconds", time.monotonic() - self._started)
+
+    async def feed(self, data: bytes):
+        """Audio bytes from the client, in the stream's encoding."""
+        if self.ended.is_set():
+            return
+        self._input_bytes += len(data)
+        if self._input_bytes > settings.AUDIO_MAX_UPLOAD_BYTES:
+            self._end("max_size")
+            return
+        if self._decoder:
+            await self._decoder.feed(data)
+        else:
+            await self._on_pcm(data)
+
+    async def finish(self) -> Optional[AudioClip]:
+        """
+        Close the utterance (end-of-speech detected, or the client said it stopped recording):
+        wait for the in-flight LID, run a last one on the whole speech if the language is still
+        open, and return the speech as an AudioClip (None if no speech was heard).
+        """
+        if self._decoder and not self.ended.is_set():
+            # Client stopped recording: decode what ffmpeg still holds
+            self._input_closed = True
+            self._decoder.close_input()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._pump), 2.0)
+            except asyncio.TimeoutError:
+                pass
+        self._end("client_end")
+        if self._decoder:
+            await self._decoder.stop()
+        if self.speech_start is None:
+            return None
+
+        if self.target_language is None:
+            if self._lid_task and not self._lid_task.done():
+                await asyncio.wait([self._lid_task])
+            if self.target_language is None:
+                speech = self._speech_pcm(settings.LID_MAX_WINDOW_SECONDS)
+                if self._last_lid and self._last_lid[2] >= len(speech) // 2:
+                    await self._decide(*self._last_lid[:2])  # Nothing new to classify
+                else:
+                    await self._run_lid(speech, final=True)
+
+        end = min(len(self._pcm) // 2, (self.speech_end or len(self._pcm) // 2) + PADDING_SAMPLES)
+        clip = AudioClip.from_pcm(bytes(self._pcm[self.speech_start * 2:end * 2]))
+        metrics.observe("voice_stream_speech_seconds", (end - self.speech_start) / SAMPLE_RATE)
+        return clip
+
+    # --- Audio intake + VAD ---
+
+    async def _pump_decoder(self):
+        while True:
+            try:
+                pcm = await self._decoder.read()
+            except Exception as e:
+                logger.warning(f"[Stream] Decoder failed: {e}")
+                pcm = b""
+            if not pcm:
+                break
+            await self._on_pcm(pcm)
+        if not self._input_closed:
+            self._end("decode_error")  # ffmpeg gave up on the input
+
+    async def _on_pcm(self, data: bytes):
+        if self.ended.is_set():
+            return
+        self._pcm += data
+        while len(self._pcm) - self._vad_offset >= FRAME_BYTES:
+            frame = np.frombuffer(bytes(self._pcm[self._vad_offset:self._vad_offset + FRAME_BYTES]), dtype="<i2")
+            self._vad_offset += FRAME_BYTES
+            await self._on_frame(frame.astype(np.float32) / 32768.0, self._vad_offset // 2)
+            if self.ended.is_set():
+                return
+        self._maybe_run_lid()
+
+    async def _on_frame(self, frame: np.ndarray, end_sample: int):
+        dbfs = 20 * np.log10(float(np.sqrt(np.mean(frame ** 2))) + 1e-10)
+        if self._noise_floor is None:
+            self._noise_floor = dbfs
+        voiced = dbfs > max(VAD_MIN_DBFS, self._noise_floor + VAD_MARGIN_DB)
+        if not voiced:
+            # Background level: follows drops at once, rises slowly
+            self._noise_floor = min(dbfs, 0.95 * self._noise_floor + 0.05 * dbfs)
+
+        if self.speech_start is None:
+            self._voiced_run = self._voiced_run + 1 if voiced else 0
+            if self._voiced_run >= SPEECH_START_FRAMES:
+                self.speech_start = max(0, end_sample - SPEECH_START_FRAMES * FRAME_SAMPLES - PADDING_SAMPLES)
+                self.speech_end = end_sample
+                await self._emit({"type": "speech_start"})
+            elif end_sample >= settings.VOICE_STREAM_NO_SPEECH_SECONDS * SAMPLE_RATE:
+                self._end("no_speech")
+        elif voiced:
+            self._silence_run = 0
+            self.speech_end = end_sample
+        else:
+            self._silence_run += 1
+            if self._silence_run * VAD_FRAME_MS >= settings.VOICE_STREAM_END_SILENCE_MS:
+                self._end("end_of_speech")
+
+        if end_sample >= settings.AUDIO_MAX_DURATION_SECONDS * SAMPLE_RATE:
+            self._end("max_duration")
+
+    def _end(self, reason: str):
+        if not self.ended.is_set():
+            self.end_reason = reason
+            self.ended.set()
+            metrics.increment("voice_stream_ends", reason=reason)
+
+    def _speech_pcm(self, max_seconds: float) -> bytes:
+        start = self.speech_start * 2
+        end = min(len(self._pcm), start + int(max_seconds * SAMPLE_RATE) * 2)
+        return bytes(self._pcm[start:end])
+
+    # --- Language identification ---
+
+    def _maybe_run_lid(self):
+        if self.target_language is not None or self.speech_start is None:
+            return
+        if self._lid_task and not self._lid_task.done():
+            return
+        speech_seconds = (len(self._pcm) // 2 - self.speech_start) / SAMPLE_RATE
+        if speech_seconds >= self._next_lid_seconds:
+            self._lid_task = asyncio.create_task(self._run_lid(self._speech_pcm(self._next_lid_seconds)))
+
+    async def _run_lid(self, pcm: bytes, final: bool = False):
+        samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        try:
+            lang, confidence = await inference_service.run("detect_language", samples)
+        except Exception as e:
+            print(f"[LID] Language detection failed ({e}), defaulting to OpenAI Whisper...")
+            await self._decide(None, 0.0)
+            return
+        metrics.observe("lid_audio_seconds", len(samples) / SAMPLE_RATE)
+        self._last_lid = (lang, confidence, len(samples))
+        if final or confidence >= settings.LID_EXTEND_BELOW_CONFIDENCE or self._next_lid_seconds >= settings.LID_MAX_WINDOW_SECONDS:
+            await self._decide(lang, confidence)
+        else:
+            self._next_lid_seconds = min(self._next_lid_seconds * 2, settings.LID_MAX_WINDOW_SECONDS)
+            metrics.increment("lid_window_extensions")
+            print(f"[LID] Low confidence ({confidence:.1%}) on streamed speech, next attempt at {self._next_lid_seconds:.0f}s")
+
+    async def _decide(self, lang: Optional[str], confidence: float):
+        if self.target_language is not None:
+            return
+        self.language, self.confidence = lang, confidence
+        self.target_language = stt_language(lang)
+        self.decided_early = not self.ended.is_set()
+        metrics.increment("voice_stream_lid_decisions", early=self.decided_early)
+        print(f"[LID] Detected: {lang} (confidence: {confidence:.1%}){' before end-of-speech' if self.decided_early else ''}")
+        await self._emit({
+            "type": "language", "language": self.target_language, "detected": lang,
+            "confidence": round(confidence, 3), "stt": stt_backend(self.target_language)
+        })
+
+    async def _emit(self, event: Dict[str, Any]):
+        if self._on_event is None:
+            return
+        try:
+            await self._on_event(event)
+        except Exception:
+            pass  # Client gone: the endpoint notices on its next receive/send
+
+
+async def save_utterance(clip: AudioClip) -> str:
+    """Persist streamed speech (Ogg/Opus, WAV if encoding fails) as the user message audio."""
+    try:
+        ext, data = await encode_speech((await clip.normalized()).pcm_bytes)
+    except AudioDecodeError as e:
+        print(f"[Stream] Keeping WAV ({e})")
+        ext, data = "wav", clip.data
+    path = new_upload_path(f".{ext}")
+
+    def write():
+        with open(path, "wb") as f:
+            f.write(data)
+
+    await asyncio.get_running_loop().run_in_executor(None, write)
+    return path
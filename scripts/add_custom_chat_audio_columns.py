@@ -0,0 +1,45 @@
+"""
+Script to add audio_url and audio_status columns to custom_chat_configs table.
+Needed for pre-synthesized custom chatbot answers. Existing configs get their audio
+on first use (or when re-saved).
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+COLUMNS = {
+    "audio_url": "VARCHAR(500) NULL",
+    "audio_status": "VARCHAR(20) NULL",
+}
+
+async def add_custom_chat_audio_columns():
+    print("[Migration] Adding audio columns to custom_chat_configs table...")
+    
+    async with engine.begin() as conn:
+        for column_name, column_type in COLUMNS.items():
+            # Check if column exists
+            result = await conn.execute(text(f"""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'custom_chat_configs' AND column_name = '{column_name}'
+            """))
+            exists = result.fetchone()
+            
+            if exists:
+                print(f"[OK] Column '{column_name}' already exists.")
+                continue
+            
+            # Add the column
+            await conn.execute(text(f"""
+                ALTER TABLE custom_chat_configs 
+                ADD COLUMN {column_name} {column_type}
+            """))
+            print(f"[OK] Column '{column_name}' added successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(add_custom_chat_audio_columns())
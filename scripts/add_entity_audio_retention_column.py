@@ -0,0 +1,39 @@
+"""
+Script to add audio_retention_days column to entities table.
+Run this before enabling the uploads retention sweeper.
+"""
+import asyncio
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+async def add_audio_retention_column():
+    print("[Migration] Adding audio_retention_days column to entities table...")
+    
+    async with engine.begin() as conn:
+        # Check if column exists
+        result = await conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'entities' AND column_name = 'audio_retention_days'
+        """))
+        exists = result.fetchone()
+        
+        if exists:
+            print("[OK] Column 'audio_retention_days' already exists.")
+            return
+        
+        # Add the column (NULL = UPLOADS_RETENTION_DAYS, 0 = keep forever)
+        await conn.execute(text("""
+            ALTER TABLE entities 
+            ADD COLUMN audio_retention_days INTEGER NULL
+        """))
+        print("[OK] Column 'audio_retention_days' added successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(add_audio_retention_column())
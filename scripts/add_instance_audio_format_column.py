@@ -0,0 +1,39 @@
+"""
+Script to add audio_format column to instances table.
+Lets an instance choose its response audio format (opus, aac, mp3); NULL keeps the
+server default (AUDIO_OUTPUT_FORMAT).
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+async def add_audio_format_column():
+    print("[Migration] Adding audio_format column to instances table...")
+    
+    async with engine.begin() as conn:
+        # Check if column exists
+        result = await conn.execute(text("""
+            SELECT column_name 
+            FROM information_schema.columns 
+            WHERE table_name = 'instances' AND column_name = 'audio_format'
+        """))
+        exists = result.fetchone()
+        
+        if exists:
+            print("[OK] Column 'audio_format' already exists.")
+            return
+        
+        # Add the column
+        await conn.execute(text("""
+            ALTER TABLE instances 
+            ADD COLUMN audio_format VARCHAR(10) NULL
+        """))
+        print("[OK] Column 'audio_format' added successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(add_audio_format_column())
@@ -0,0 +1,44 @@
+"""
+Script to add tool_call_id and tool_calls columns to messages table.
+Needed for structured (non text-parsed) LLM history with tool calls.
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+COLUMNS = {
+    "tool_call_id": "TEXT NULL",
+    "tool_calls": "JSONB NULL",
+}
+
+async def add_message_tool_columns():
+    print("[Migration] Adding tool call columns to messages table...")
+    
+    async with engine.begin() as conn:
+        for column_name, column_type in COLUMNS.items():
+            # Check if column exists
+            result = await conn.execute(text(f"""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'messages' AND column_name = '{column_name}'
+            """))
+            exists = result.fetchone()
+            
+            if exists:
+                print(f"[OK] Column '{column_name}' already exists.")
+                continue
+            
+            # Add the column
+            await conn.execute(text(f"""
+                ALTER TABLE messages 
+                ADD COLUMN {column_name} {column_type}
+            """))
+            print(f"[OK] Column '{column_name}' added successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(add_message_tool_columns())
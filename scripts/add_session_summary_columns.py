@@ -0,0 +1,44 @@
+"""
+Script to add summary and summarized_until columns to sessions table.
+Needed for rolling conversation summaries on long sessions.
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.database import engine
+
+COLUMNS = {
+    "summary": "TEXT NULL",
+    "summarized_until": "TIMESTAMP WITH TIME ZONE NULL",
+}
+
+async def add_session_summary_columns():
+    print("[Migration] Adding summary columns to sessions table...")
+    
+    async with engine.begin() as conn:
+        for column_name, column_type in COLUMNS.items():
+            # Check if column exists
+            result = await conn.execute(text(f"""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'sessions' AND column_name = '{column_name}'
+            """))
+            exists = result.fetchone()
+            
+            if exists:
+                print(f"[OK] Column '{column_name}' already exists.")
+                continue
+            
+            # Add the column
+            await conn.execute(text(f"""
+                ALTER TABLE sessions 
+                ADD COLUMN {column_name} {column_type}
+            """))
+            print(f"[OK] Column '{column_name}' added successfully!")
+
+if __name__ == "__main__":
+    asyncio.run(add_session_summary_columns())
@@ -0,0 +1,102 @@
+"""
+Benchmark MMS-LID throughput against batch size and concurrent load (CPU).
+
+Usage:
+    python scripts/benchmark_lid_batching.py [audio files...] [--seconds 4] [--requests 64]
+
+1. Batch sweep: detect_language_batch on batches of 1, 2, 4, 8, 16 utterances
+   (utterances/s and ms per forward pass).
+2. Load sweep: N concurrent callers through InferenceService.run("detect_language"),
+   with micro-batching off (max_size 1) and on (INFERENCE_BATCHING), to compare
+   aggregate throughput and per-call latency.
+Without audio files, random speech-like noise of --seconds is used (results are
+meaningless for accuracy, representative for compute).
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.audio_normalize import normalize_audio
+from app.services.inference import InferenceService, configure_torch_threads
+from app.services.local_models import _load_mms_lid, _warmup_mms_lid, detect_language_batch
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def load_utterances(paths, seconds, count):
+    if paths:
+        clips = [(await normalize_audio(path=p, max_seconds=30)).samples for p in paths]
+    else:
+        rng = np.random.default_rng(0)
+        clips = [(rng.standard_normal(int(16000 * seconds * rng.uniform(0.7, 1.3))) * 0.1).astype(np.float32)
+                 for _ in range(16)]
+    return [clips[i % len(clips)] for i in range(count)]
+
+
+def batch_sweep(lid, utterances):
+    print("\n=== Batch sweep (one forward pass per batch) ===")
+    for size in (1, 2, 4, 8, 16):
+        batches = [utterances[i:i + size] for i in range(0, len(utterances) - size + 1, size)][:max(2, 32 // size)]
+        t0 = time.perf_counter()
+        for batch in batches:
+            detect_language_batch(lid, batch)
+        elapsed = time.perf_counter() - t0
+        done = sum(len(b) for b in batches)
+        print(f"batch={size:>2}: {done / elapsed:6.2f} utt/s, {elapsed / len(batches) * 1000:7.0f} ms per batch")
+
+
+async def load_sweep(utterances, requests):
+    print("\n=== Load sweep (InferenceService, in-process) ===")
+    batching = settings.INFERENCE_BATCHING.get("detect_language", {"max_size": 8, "max_wait_ms": 10.0})
+    for label, config in (("unbatched", {"max_size": 1}), (f"batched (max {int(batching['max_size'])})", batching)):
+        settings.INFERENCE_BATCHING = {"detect_language": config}
+        for concurrency in (1, 4, 8, 16):
+            service = InferenceService()
+            latencies = []
+            queue = list(utterances[:requests])
+
+            async def caller():
+                while queue:
+                    audio = queue.pop()
+                    t0 = time.perf_counter()
+                    await service.run("detect_language", audio)
+                    latencies.append((time.perf_counter() - t0) * 1000)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*[caller() for _ in range(concurrency)])
+            elapsed = time.perf_counter() - t0
+            print(f"{label:>18} x{concurrency:>2} callers: {len(latencies) / elapsed:6.2f} utt/s, "
+                  f"p50={percentile(latencies, 50):.0f} ms p95={percentile(latencies, 95):.0f} ms")
+
+
+async def main(args):
+    configure_torch_threads(settings.INFERENCE_TORCH_THREADS)
+    utterances = await load_utterances(args.files, args.seconds, max(args.requests, 64))
+    print(f"{len(utterances)} utterances, torch threads={settings.INFERENCE_TORCH_THREADS}")
+
+    t0 = time.perf_counter()
+    lid = _load_mms_lid()
+    _warmup_mms_lid(lid)
+    print(f"MMS-LID loaded in {time.perf_counter() - t0:.1f}s")
+
+    batch_sweep(lid, utterances)
+    del lid
+    await load_sweep(utterances, args.requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="Audio files (any ffmpeg-readable format)")
+    parser.add_argument("--seconds", type=float, default=4.0, help="Length of synthetic utterances")
+    parser.add_argument("--requests", type=int, default=64, help="Calls per load-sweep run")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,100 @@
+"""
+Benchmark the local text language detector (app/services/langid.py)
+against the LLM detector on a TSV of labelled samples (columns: text, lang, and
+optionally kind: plain / short / code_switch).
+
+Usage:
+    python scripts/benchmark_text_langid.py [samples.tsv] [--llm]
+
+Reports accuracy (overall, per language, per kind), low-confidence rate (LLM fallback),
+inputs shorter than TEXT_LID_MIN_WORDS (kept on the session/default language) and
+per-call latency.
+With --llm, also measures the GPT-based detection for comparison (costs API calls).
+"""
+import asyncio
+import csv
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.langid import TextLanguageDetector
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "datasets", "langid", "samples.tsv")
+
+
+def load_samples(path):
+    with open(path, encoding="utf-8") as f:
+        return [(row["text"], row["lang"], row.get("kind") or "plain") for row in csv.DictReader(f, delimiter="\t")]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def benchmark_local(samples):
+    t0 = time.perf_counter()
+    detector = TextLanguageDetector()
+    print(f"[Local] Training: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    latencies, correct, unsure, short, errors = [], 0, 0, [0, 0], []
+    per_lang, per_kind = {}, {}
+    for text, expected, kind in samples:
+        t0 = time.perf_counter()
+        lang, confidence = detector.detect(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        ok = lang == expected
+        correct += ok
+        for stats in (per_lang.setdefault(expected, [0, 0]), per_kind.setdefault(kind, [0, 0])):
+            stats[0] += ok
+            stats[1] += 1
+        if lang != "ar" and detector.word_count(text) < settings.TEXT_LID_MIN_WORDS:
+            # Same policy as LLMService.detect_language without a session: confident guess, else French
+            short[0] += (lang if confidence >= settings.TEXT_LID_MIN_CONFIDENCE else "fr") == expected
+            short[1] += 1
+        elif confidence < settings.TEXT_LID_MIN_CONFIDENCE:
+            unsure += 1
+        elif not ok:
+            errors.append((text, expected, lang, confidence))
+
+    print(f"[Local] Accuracy: {correct}/{len(samples)} ({correct / len(samples):.1%})")
+    for lang, (ok, total) in sorted(per_lang.items()):
+        print(f"[Local]   {lang}: {ok}/{total}")
+    for kind, (ok, total) in sorted(per_kind.items()):
+        print(f"[Local]   {kind}: {ok}/{total}")
+    print(f"[Local] Shorter than {settings.TEXT_LID_MIN_WORDS} words (session/default language): {short[1]}, "
+          f"{short[0]} right without a session")
+    print(f"[Local] Below confidence threshold {settings.TEXT_LID_MIN_CONFIDENCE} (LLM fallback): {unsure}/{len(samples)}")
+    print(f"[Local] Confident but wrong: {len(errors)}")
+    for text, expected, lang, confidence in errors:
+        print(f"[Local]   '{text}' expected={expected} got={lang} ({confidence:.0%})")
+    print(f"[Local] Latency: mean={statistics.mean(latencies):.3f} ms p50={percentile(latencies, 50):.3f} ms p99={percentile(latencies, 99):.3f} ms")
+
+
+async def benchmark_llm(samples):
+    from app.services.llm import LLMService
+    llm = LLMService()
+    # Force the LLM path by bypassing the local detector
+    settings.TEXT_LID_MIN_CONFIDENCE = 1.1
+
+    latencies, correct = [], 0
+    for text, expected, _ in samples:
+        t0 = time.perf_counter()
+        lang = await llm.detect_language(text)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        correct += lang == expected
+    print(f"[LLM] Accuracy: {correct}/{len(samples)} ({correct / len(samples):.1%})")
+    print(f"[LLM] Latency: mean={statistics.mean(latencies):.0f} ms p50={percentile(latencies, 50):.0f} ms p99={percentile(latencies, 99):.0f} ms")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    samples = load_samples(args[0] if args else DEFAULT_SAMPLES)
+    print(f"Loaded {len(samples)} samples")
+    benchmark_local(samples)
+    if "--llm" in sys.argv:
+        asyncio.run(benchmark_llm(samples))
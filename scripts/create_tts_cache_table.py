@@ -0,0 +1,22 @@
+"""
+Script to create the tts_cache table (content-addressed TTS audio cache metadata).
+Safe to run several times: existing tables are left untouched.
+"""
+import asyncio
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import engine
+from app.models.tts_cache import TTSCacheEntry
+
+async def create_tts_cache_table():
+    print("[Migration] Creating tts_cache table...")
+    
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: TTSCacheEntry.__table__.create(sync_conn, checkfirst=True))
+    print("[OK] Table 'tts_cache' ready.")
+
+if __name__ == "__main__":
+    asyncio.run(create_tts_cache_table())
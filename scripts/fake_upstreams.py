@@ -0,0 +1,351 @@
+"""
+Local stand-ins for the upstream services, for load tests without API credits or network.
+
+    OpenAI         /v1/chat/completions, /v1/embeddings, /v1/audio/transcriptions, /v1/audio/speech
+    LAfricaMobile  /login, /stt/, /tts/, /tts/translate (+ /audio/<file> for the generated audio)
+    MinIO (S3)     bucket exists/create, put/get/delete object (no signature checks)
+
+Usage:
+    python scripts/fake_upstreams.py [--profile profile.json] [--seed 1]
+
+Then start the backend against them:
+    OPENAI_BASE_URL=http://127.0.0.1:9801/v1 OPENAI_API_KEY=fake \\
+    LAFRICAMOBILE_BASE_URL=http://127.0.0.1:9802 LAFRICAMOBILE_USERNAME=fake LAFRICAMOBILE_PASSWORD=fake \\
+    MINIO_ENDPOINT=127.0.0.1:9803 uvicorn app.main:app --port 8000
+
+Latency and errors are configured per endpoint in the profile (merged over DEFAULT_PROFILE):
+    {"openai.chat": {"median_ms": 900, "p95_ms": 2500, "error_rate": 0.02, "error_statuses": [429, 500]}}
+Latencies follow a log-normal distribution fitted to (median_ms, p95_ms); `per_char_ms`
+adds a size-dependent part (TTS, translation). Audio responses are WAV silence.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import math
+import random
+import struct
+import time
+import uuid
+import wave
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+DEFAULT_PROFILE: Dict[str, Dict[str, Any]] = {
+    "openai.chat": {"median_ms": 900, "p95_ms": 2500, "error_rate": 0.0, "error_statuses": [429, 500], "tool_call_rate": 0.3},
+    "openai.embeddings": {"median_ms": 120, "p95_ms": 400, "error_rate": 0.0, "error_statuses": [429, 500]},
+    "openai.stt": {"median_ms": 1200, "p95_ms": 3000, "error_rate": 0.0, "error_statuses": [500]},
+    "openai.tts": {"median_ms": 600, "p95_ms": 1500, "per_char_ms": 2.0, "error_rate": 0.0, "error_statuses": [500]},
+    "lafricamobile.login": {"median_ms": 300, "p95_ms": 800, "error_rate": 0.0, "error_statuses": [500]},
+    "lafricamobile.stt": {"median_ms": 2500, "p95_ms": 6000, "error_rate": 0.0, "error_statuses": [500, 502]},
+    "lafricamobile.translate": {"median_ms": 700, "p95_ms": 2000, "per_char_ms": 1.0, "error_rate": 0.0, "error_statuses": [500, 502]},
+    "lafricamobile.tts": {"median_ms": 2000, "p95_ms": 5000, "per_char_ms": 5.0, "error_rate": 0.0, "error_statuses": [500, 502]},
+    "minio": {"median_ms": 5, "p95_ms": 20, "error_rate": 0.0, "error_statuses": [503]},
+}
+
+FAKE_ANSWER = ("Merci pour votre question. Selon nos informations, vous pouvez vous présenter "
+               "à l'accueil du lundi au vendredi de 8h à 17h. Puis-je vous aider pour autre chose ?")
+FAKE_TRANSCRIPT = "Bonjour, je voudrais prendre un rendez-vous en cardiologie demain."
+
+
+class Upstream:
+    """Latency / error injection for one endpoint."""
+
+    def __init__(self, name: str, profile: Dict[str, Any], rng: random.Random):
+        self.name = name
+        self.profile = profile
+        self.rng = rng
+        median = max(profile.get("median_ms", 0.0), 0.001)
+        p95 = max(profile.get("p95_ms", median), median)
+        self.mu = math.log(median)
+        self.sigma = math.log(p95 / median) / 1.645
+        self.calls = 0
+        self.errors = 0
+
+    def latency(self, size: int = 0) -> float:
+        base = self.rng.lognormvariate(self.mu, self.sigma) if self.sigma > 0 else math.exp(self.mu)
+        return (base + self.profile.get("per_char_ms", 0.0) * size) / 1000
+
+    async def simulate(self, size: int = 0) -> Optional[Response]:
+        """Sleep for a sampled latency. Returns an error response to send instead, or None."""
+        self.calls += 1
+        await asyncio.sleep(self.latency(size))
+        if self.rng.random() < self.profile.get("error_rate", 0.0):
+            self.errors += 1
+            status = self.rng.choice(self.profile.get("error_statuses") or [500])
+            headers = {"Retry-After": "1"} if status == 429 else {}
+            return JSONResponse(
+                {"error": {"message": f"Injected {status} from fake {self.name}", "type": "fake_upstream_error"}},
+                status_code=status, headers=headers
+            )
+        return None
+
+
+def wav_silence(seconds: float, rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+def fake_embedding(text: str, dimensions: int) -> list:
+    """Deterministic unit vector per text (same text, same vector)."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(dimensions)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def build_openai_app(upstreams: Dict[str, Upstream], rng: random.Random) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        upstream = upstreams["openai.chat"]
+        error = await upstream.simulate()
+        if error:
+            return error
+
+        messages = body.get("messages", [])
+        prompt_tokens = len(json.dumps(messages, ensure_ascii=False)) // 4 + 10
+        # Prompt caching applies to 1024+ token prompts, in 128-token increments
+        cached_tokens = (prompt_tokens // 2) // 128 * 128 if prompt_tokens >= 1024 else 0
+
+        message: Dict[str, Any] = {"role": "assistant", "content": None}
+        finish_reason = "stop"
+        answered_tools = messages and messages[-1].get("role") == "tool"
+        if (body.get("tools") and body.get("tool_choice") != "none" and not answered_tools
+                and rng.random() < upstream.profile.get("tool_call_rate", 0.0)):
+            message["tool_calls"] = [{
+                "id": f"call_{uuid.uuid4().hex[:24]}",
+                "type": "function",
+                "function": {"name": "search_doctors", "arguments": json.dumps({"specialty": "Cardiologie"})}
+            }]
+            finish_reason = "tool_calls"
+        elif (body.get("max_tokens") or 100) <= 5:
+            message["content"] = "fr"  # Language detection prompt
+        else:
+            message["content"] = FAKE_ANSWER
+        completion_tokens = len(message["content"] or "") // 4 + 5
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason, "logprobs": None}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        }
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        error = await upstreams["openai.embeddings"].simulate()
+        if error:
+            return error
+
+        dimensions = body.get("dimensions") or 1536
+        data = []
+        for i, text in enumerate(inputs):
+            vector = fake_embedding(str(text), dimensions)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{dimensions}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(len(str(t)) // 4 + 1 for t in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcriptions(request: Request):
+        form = await request.form()
+        error = await upstreams["openai.stt"].simulate()
+        if error:
+            return error
+        if form.get("response_format") == "verbose_json":
+            return {"task": "transcribe", "language": "french", "duration": 3.0, "text": FAKE_TRANSCRIPT, "segments": []}
+        return {"text": FAKE_TRANSCRIPT}
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        text = body.get("input", "")
+        error = await upstreams["openai.tts"].simulate(len(text))
+        if error:
+            return error
+        return Response(wav_silence(min(30.0, 0.06 * len(text)), rate=24000), media_type="audio/wav")
+
+    return app
+
+
+def build_lafricamobile_app(upstreams: Dict[str, Upstream], token_ttl: float) -> FastAPI:
+    app = FastAPI(title="Fake LAfricaMobile")
+    tokens: Dict[str, float] = {}
+    audio_files: Dict[str, bytes] = {}
+
+    def authorized(request: Request) -> bool:
+        token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+        expires_at = tokens.get(token)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def unauthorized() -> JSONResponse:
+        return JSONResponse({"detail": "Could not validate credentials"}, status_code=401)
+
+    @app.post("/login")
+    async def login(request: Request):
+        await request.form()
+        error = await upstreams["lafricamobile.login"].simulate()
+        if error:
+            return error
+        token = uuid.uuid4().hex
+        tokens[token] = time.monotonic() + token_ttl
+        return {"access_token": token, "token_type": "bearer"}
+
+    @app.post("/stt/")
+    async def stt(request: Request):
+        if not authorized(request):
+            return unauthorized()
+        await request.form()
+        error = await upstreams["lafricamobile.stt"].simulate()
+        if error:
+            return error
+        return {"transcription": "Dama bëgg am rendez-vous ak doktoor bi ëllëg."}
+
+    @app.post("/tts/translate")
+    async def translate(request: Request):
+        if not authorized(request):
+            return unauthorized()
+        body = await request.json()
+        text = body.get("text", "")
+        error = await upstreams["lafricamobile.translate"].simulate(len(text))
+        if error:
+            return error
+        return {"translated_text": f"[{body.get('to_lang')}] {text}"}
+
+    @app.post("/tts/")
+    async def tts(request: Request):
+        if not authorized(request):
+            return unauthorized()
+        body = await request.json()
+        text = body.get("text", "")
+        error = await upstreams["lafricamobile.tts"].simulate(len(text))
+        if error:
+            return error
+        name = f"{uuid.uuid4().hex}.wav"
+        audio_files[name] = wav_silence(min(30.0, 0.07 * len(text)))
+        return {"path_audio": f"{str(request.base_url).rstrip('/')}/audio/{name}"}
+
+    @app.get("/audio/{name}")
+    async def audio(name: str):
+        data = audio_files.pop(name, None)
+        if data is None:
+            return JSONResponse({"detail": "Not found"}, status_code=404)
+        return Response(data, media_type="audio/wav")
+
+    return app
+
+
+def build_minio_app(upstreams: Dict[str, Upstream]) -> FastAPI:
+    app = FastAPI(title="Fake MinIO")
+    buckets: Dict[str, Dict[str, tuple]] = {}
+    xml = "application/xml"
+
+    def no_such(code: str) -> Response:
+        return Response(f'<?xml version="1.0" encoding="UTF-8"?><Error><Code>{code}</Code></Error>', status_code=404, media_type=xml)
+
+    @app.api_route("/{bucket}", methods=["GET", "HEAD", "PUT"])
+    async def bucket(bucket: str, request: Request):
+        error = await upstreams["minio"].simulate()
+        if error:
+            return error
+        if request.method == "PUT":
+            buckets.setdefault(bucket, {})
+            return Response(status_code=200)
+        if "location" in request.query_params:
+            return Response('<?xml version="1.0" encoding="UTF-8"?><LocationConstraint '
+                            'xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>', media_type=xml)
+        if bucket not in buckets:
+            return no_such("NoSuchBucket") if request.method == "GET" else Response(status_code=404)
+        return Response(status_code=200)
+
+    @app.api_route("/{bucket}/{key:path}", methods=["GET", "HEAD", "PUT", "DELETE"])
+    async def obj(bucket: str, key: str, request: Request):
+        error = await upstreams["minio"].simulate()
+        if error:
+            return error
+        if bucket not in buckets:
+            return no_such("NoSuchBucket")
+        objects = buckets[bucket]
+        if request.method == "PUT":
+            data = await request.body()
+            etag = hashlib.md5(data).hexdigest()
+            objects[key] = (data, request.headers.get("content-type", "application/octet-stream"), etag)
+            return Response(status_code=200, headers={"ETag": f'"{etag}"'})
+        if request.method == "DELETE":
+            objects.pop(key, None)
+            return Response(status_code=204)
+        if key not in objects:
+            return no_such("NoSuchKey")
+        data, content_type, etag = objects[key]
+        body = b"" if request.method == "HEAD" else data
+        return Response(body, media_type=content_type, headers={"ETag": f'"{etag}"', "Content-Length": str(len(data))})
+
+    return app
+
+
+async def serve(args):
+    profile = {name: dict(values) for name, values in DEFAULT_PROFILE.items()}
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            for name, overrides in json.load(f).items():
+                profile.setdefault(name, {}).update(overrides)
+
+    rng = random.Random(args.seed)
+    upstreams = {name: Upstream(name, values, rng) for name, values in profile.items()}
+    apps = [
+        (build_openai_app(upstreams, rng), args.openai_port),
+        (build_lafricamobile_app(upstreams, args.token_ttl), args.lafricamobile_port),
+        (build_minio_app(upstreams), args.minio_port),
+    ]
+    servers = [
+        uvicorn.Server(uvicorn.Config(app, host=args.host, port=port, log_level="warning", access_log=False))
+        for app, port in apps
+    ]
+
+    print(f"[Fake] OpenAI        http://{args.host}:{args.openai_port}/v1")
+    print(f"[Fake] LAfricaMobile http://{args.host}:{args.lafricamobile_port}")
+    print(f"[Fake] MinIO         {args.host}:{args.minio_port}")
+    try:
+        await asyncio.gather(*(server.serve() for server in servers))
+    finally:
+        for name, upstream in upstreams.items():
+            if upstream.calls:
+                print(f"[Fake] {name}: {upstream.calls} calls, {upstream.errors} injected errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profile", help="JSON file with per-endpoint latency/error overrides")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=9801)
+    parser.add_argument("--lafricamobile-port", type=int, default=9802)
+    parser.add_argument("--minio-port", type=int, default=9803)
+    parser.add_argument("--token-ttl", type=float, default=3600.0, help="LAfricaMobile token lifetime (seconds)")
+    parser.add_argument("--seed", type=int, default=None)
+    asyncio.run(serve(parser.parse_args()))
@@ -0,0 +1,22 @@
+"""
+Run the local-model inference workers (MMS-LID, wolof-asr, ADIA_TTS, xTTS).
+
+Usage:
+    INFERENCE_SOCKET_DIR=/run/tontouma-inference python scripts/inference_server.py
+
+Start the API with the same INFERENCE_SOCKET_DIR: its uvicorn workers then send local
+inference to these processes (one model copy per host) instead of loading the models.
+Groups, torch threads and per-model concurrency come from INFERENCE_WORKERS.
+"""
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.config import settings
+from app.services.inference_server import run_supervisor
+
+if __name__ == "__main__":
+    if not settings.INFERENCE_SOCKET_DIR:
+        raise SystemExit("Set INFERENCE_SOCKET_DIR (e.g. /run/tontouma-inference)")
+    run_supervisor()
@@ -0,0 +1,146 @@
+"""
+Open-loop load generator for the chat API (pair with scripts/fake_upstreams.py to avoid API costs).
+
+Usage:
+    python scripts/load_generator.py items.ndjson --rps 5 --duration 60
+    python scripts/load_generator.py questions.tsv --instance <instance_id> --rps 10 --duration 120
+    python scripts/load_generator.py questions.tsv --instance <id> --audio sample.wav --voice-ratio 0.3
+
+Requests are sent at a target rate with Poisson arrivals (independent of response times, so
+queueing shows up as latency instead of a lower send rate), cycling through the items
+(NDJSON of {"instance_id", "text", "forced_language"} or TSV with `text` and optional `lang`).
+Reports achieved throughput, latency percentiles and an error breakdown, plus the
+backend /metrics snapshot (upstream queueing, LLM tokens) at the end.
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import random
+import time
+from collections import Counter
+
+import httpx
+
+
+def load_items(path, instance_id):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".tsv"):
+            for row in csv.DictReader(f, delimiter="\t"):
+                items.append({"instance_id": instance_id, "text": row["text"], "forced_language": row.get("lang") or None})
+        else:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    item.setdefault("instance_id", instance_id)
+                    items.append(item)
+    missing = [i for i in items if not i.get("instance_id")]
+    if missing:
+        raise SystemExit(f"{len(missing)} items have no instance_id (use --instance)")
+    return items
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LoadRun:
+    def __init__(self, args, items):
+        self.args = args
+        self.items = itertools.cycle(items)
+        self.audio = open(args.audio, "rb").read() if args.audio else None
+        self.latencies = {"text": [], "voice": []}
+        self.errors = Counter()
+        self.sent = 0
+        self.completed = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def one(self, client: httpx.AsyncClient, item: dict, voice: bool):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        kind = "voice" if voice else "text"
+        t0 = time.perf_counter()
+        try:
+            if voice:
+                data = {"instance_id": item["instance_id"]}
+                if item.get("forced_language"):
+                    data["forced_language"] = item["forced_language"]
+                response = await client.post("/chat/messages", data=data, files={"audio_file": ("load.wav", self.audio, "audio/wav")})
+            else:
+                response = await client.post("/chat/text", json={
+                    "instance_id": item["instance_id"], "text": item["text"], "forced_language": item.get("forced_language")
+                })
+            if response.status_code >= 400:
+                self.errors[f"{kind} HTTP {response.status_code}"] += 1
+            else:
+                self.latencies[kind].append((time.perf_counter() - t0) * 1000)
+                self.completed += 1
+        except Exception as e:
+            self.errors[f"{kind} {type(e).__name__}"] += 1
+        finally:
+            self.in_flight -= 1
+
+    async def run(self):
+        args = self.args
+        limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+        async with httpx.AsyncClient(base_url=args.base_url.rstrip("/") + "/api/v1", timeout=args.timeout, limits=limits) as client:
+            tasks = []
+            started = time.perf_counter()
+            next_at = started
+            while next_at - started < args.duration:
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+                voice = self.audio is not None and random.random() < args.voice_ratio
+                tasks.append(asyncio.create_task(self.one(client, next(self.items), voice)))
+                self.sent += 1
+                next_at += random.expovariate(args.rps)
+            send_elapsed = time.perf_counter() - started
+            await asyncio.gather(*tasks)
+            total_elapsed = time.perf_counter() - started
+
+            backend_metrics = None
+            try:
+                backend_metrics = (await client.get("/metrics")).json()
+            except Exception:
+                pass
+
+        self.report(send_elapsed, total_elapsed, backend_metrics)
+
+    def report(self, send_elapsed, total_elapsed, backend_metrics):
+        print(f"\n=== Load test: target {self.args.rps} rps for {self.args.duration}s ===")
+        print(f"Sent:        {self.sent} ({self.sent / send_elapsed:.2f} rps offered)")
+        print(f"Completed:   {self.completed} ({self.completed / total_elapsed:.2f} rps achieved)")
+        print(f"Errors:      {sum(self.errors.values())}")
+        print(f"Max in flight: {self.max_in_flight}")
+        for kind, values in self.latencies.items():
+            if values:
+                print(f"{kind:>6} latency ms: p50={percentile(values, 50):.0f} p90={percentile(values, 90):.0f} "
+                      f"p95={percentile(values, 95):.0f} p99={percentile(values, 99):.0f} max={max(values):.0f} (n={len(values)})")
+        for error, count in self.errors.most_common():
+            print(f"  {error}: {count}")
+        if backend_metrics:
+            print("\nBackend metrics:")
+            print(json.dumps(backend_metrics, indent=2, ensure_ascii=False, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("items", help="NDJSON items or TSV questions")
+    parser.add_argument("--instance", help="Instance ID for TSV input (or NDJSON lines without instance_id)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rps", type=float, default=2.0, help="Target request rate")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds of sending")
+    parser.add_argument("--audio", help="WAV/MP3 file sent to /chat/messages for voice requests")
+    parser.add_argument("--voice-ratio", type=float, default=0.0, help="Share of requests sent as voice (needs --audio)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    asyncio.run(LoadRun(args, load_items(args.items, args.instance)).run())
@@ -0,0 +1,75 @@
+"""
+Replay a question set through the chat pipeline in-process (same code path as POST /chat/batch).
+
+Usage:
+    python scripts/replay_chat_batch.py questions.tsv --instance <instance_id> [--out results.ndjson]
+    python scripts/replay_chat_batch.py items.ndjson [--concurrency 8] [--tts] [--persist]
+
+Input is either a TSV with a `text` column (optional `lang` and `id` columns, --instance required)
+or NDJSON lines of {"instance_id", "text", "forced_language", "session_id", "id"}.
+Results are written as NDJSON (one line per item with elapsed_ms, then a summary line).
+By default no TTS is generated and nothing is persisted (bookings are simulated).
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.schemas.chat import ChatBatchItem
+from app.services.chat_batch import run_chat_batch
+
+
+def load_items(path, instance_id):
+    items = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".tsv"):
+            if not instance_id:
+                sys.exit("--instance is required for TSV input")
+            for row in csv.DictReader(f, delimiter="\t"):
+                items.append(ChatBatchItem(
+                    instance_id=instance_id,
+                    text=row["text"],
+                    forced_language=row.get("lang") or None,
+                    id=row.get("id") or None
+                ))
+        else:
+            for line in f:
+                if line.strip():
+                    data = json.loads(line)
+                    if instance_id and not data.get("instance_id"):
+                        data["instance_id"] = instance_id
+                    items.append(ChatBatchItem(**data))
+    return items
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input")
+    parser.add_argument("--instance", help="Instance ID for TSV input (or NDJSON lines without instance_id)")
+    parser.add_argument("--out", help="Output NDJSON file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tts", action="store_true", help="Also synthesize audio responses")
+    parser.add_argument("--persist", action="store_true", help="Save sessions/messages and run booking tools for real")
+    args = parser.parse_args()
+
+    items = load_items(args.input, args.instance)
+    print(f"[Batch] {len(items)} items, concurrency={args.concurrency}", file=sys.stderr)
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        async for line in run_chat_batch(items, args.concurrency, args.tts, args.persist):
+            out.write(json.dumps(line, ensure_ascii=False, default=str) + "\n")
+            out.flush()
+            if "summary" in line:
+                print(f"[Batch] {line['summary']}", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
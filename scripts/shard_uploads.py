@@ -0,0 +1,70 @@
+"""
+Move files from the flat UPLOAD_DIR layout into hash shards (UPLOAD_DIR/<ab>/<cd>/<name>).
+
+Usage:
+    python scripts/shard_uploads.py [--dry-run] [--batch 1000]
+
+/uploads/<name> URLs keep working (the shard is derived from the name); stored paths in
+messages.audio_path and tts_cache.file_path are rewritten so the sweeper and the TTS cache
+find the moved files. Safe to re-run: already sharded files are not in the flat directory.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from app.core.config import settings
+from app.core.database import engine
+from app.services.upload_storage import shard_dir
+
+
+def flat_files(root):
+    for entry in os.scandir(root):
+        if entry.is_file() and not entry.name.endswith(".part"):
+            yield entry.name
+
+
+async def shard_uploads(dry_run: bool, batch: int):
+    root = settings.UPLOAD_DIR
+    print(f"[Shard] Moving flat files of {root} into shards{' (dry run)' if dry_run else ''}...")
+    moved = 0
+    pending = []
+
+    async def flush():
+        if dry_run or not pending:
+            return
+        async with engine.begin() as conn:
+            for old_path, new_path in pending:
+                for table, column in (("messages", "audio_path"), ("tts_cache", "file_path")):
+                    await conn.execute(
+                        text(f"UPDATE {table} SET {column} = :new WHERE {column} = :old"),
+                        {"new": new_path, "old": old_path},
+                    )
+        pending.clear()
+
+    for name in list(flat_files(root)):
+        old_path = os.path.join(root, name)
+        directory = os.path.join(root, shard_dir(name))
+        new_path = os.path.join(directory, name)
+        if not dry_run:
+            os.makedirs(directory, exist_ok=True)
+            os.replace(old_path, new_path)
+        pending.append((old_path, new_path))
+        moved += 1
+        if len(pending) >= batch:
+            await flush()
+            print(f"[Shard] {moved} files moved")
+    await flush()
+    print(f"[OK] {moved} files {'would be ' if dry_run else ''}moved.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the files to move")
+    parser.add_argument("--batch", type=int, default=1000, help="Files per database transaction")
+    args = parser.parse_args()
+    asyncio.run(shard_uploads(args.dry_run, args.batch))
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from app.core.admission import AdmissionController, Priority, UpstreamBusyError
+
+
+def test_concurrency_cap():
+    controller = AdmissionController("test", concurrency=2)
+    in_flight, peak = 0, 0
+
+    async def call():
+        nonlocal in_flight, peak
+        async with controller.slot():
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    async def scenario():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert controller._active == 0
+
+
+def test_waiters_served_by_priority_then_arrival():
+    controller = AdmissionController("test", concurrency=1)
+    order = []
+
+    async def call(label, priority):
+        async with controller.slot(priority):
+            order.append(label)
+
+    async def scenario():
+        async with controller.slot():
+            tasks = [
+                asyncio.create_task(call("background", Priority.BACKGROUND)),
+                asyncio.create_task(call("interactive-1", Priority.INTERACTIVE)),
+                asyncio.create_task(call("interactive-2", Priority.INTERACTIVE)),
+            ]
+            await asyncio.sleep(0)
+            assert controller.queue_depth == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert order == ["interactive-1", "interactive-2", "background"]
+
+
+def test_queue_timeout_raises_upstream_busy():
+    controller = AdmissionController("test", concurrency=1, queue_timeout=0.01)
+
+    async def scenario():
+        async with controller.slot():
+            with pytest.raises(UpstreamBusyError):
+                async with controller.slot():
+                    pass
+        # The timed-out waiter did not keep a slot
+        async with controller.slot():
+            pass
+
+    asyncio.run(scenario())
+    assert controller._active == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    controller = AdmissionController("test", concurrency=1)
+    served = []
+
+    async def call(label):
+        async with controller.slot():
+            served.append(label)
+
+    async def scenario():
+        async with controller.slot():
+            cancelled = asyncio.create_task(call("cancelled"))
+            waiting = asyncio.create_task(call("waiting"))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+        await waiting
+        assert cancelled.cancelled()
+
+    asyncio.run(scenario())
+    assert served == ["waiting"]
+    assert controller._active == 0 and controller.queue_depth == 0
@@ -0,0 +1,97 @@
+import asyncio
+from app.services.inference import MicroBatcher
+
+
+def recording_batcher(max_batch=4, max_wait=10.0, fail=None):
+    batches = []
+
+    async def run_batch(items):
+        batches.append(list(items))
+        if fail:
+            raise fail
+        return [item * 10 for item in items]
+
+    return MicroBatcher("test", run_batch, max_batch=max_batch, max_wait=max_wait), batches
+
+
+def test_flushes_when_max_batch_pending():
+    batcher, batches = recording_batcher(max_batch=3, max_wait=10.0)
+
+    async def scenario():
+        # max_wait is far away: only reaching max_batch can start the batch
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(3))), 1.0)
+
+    assert asyncio.run(scenario()) == [0, 10, 20]
+    assert batches == [[0, 1, 2]]
+
+
+def test_cancelled_waiter_is_left_out_of_the_batch():
+    batcher, batches = recording_batcher(max_batch=4, max_wait=0.05)
+
+    async def scenario():
+        first = asyncio.create_task(batcher.submit(1))
+        cancelled = asyncio.create_task(batcher.submit(2))
+        last = asyncio.create_task(batcher.submit(3))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await first, await last, cancelled.cancelled()
+
+    assert asyncio.run(scenario()) == (10, 30, True)
+    assert batches == [[1, 3]]
+
+
+def test_batch_failure_reaches_every_caller():
+    batcher, batches = recording_batcher(max_batch=4, max_wait=0.01, fail=RuntimeError("model crashed"))
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert len(batches) == 1
+    assert all(isinstance(r, RuntimeError) and str(r) == "model crashed" for r in results)
+
+
+def test_run_local_admits_the_model_concurrency(monkeypatch):
+    from app.core.config import settings
+    from app.services.inference import InferenceService
+
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", {"asr": {"models": ["wolof_asr"], "concurrency": 2}})
+    monkeypatch.setattr(settings, "INFERENCE_BATCHING", {})
+    service = InferenceService()
+    in_flight, peak = 0, 0
+
+    async def run_on_model(task, *args):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return args[0]
+
+    service._run_on_model = run_on_model
+
+    async def scenario():
+        # Requests from several uvicorn workers all land in run_local of the worker process
+        return await asyncio.gather(*(service.run_local("transcribe_wolof", i) for i in range(6)))
+
+    assert asyncio.run(scenario()) == list(range(6))
+    assert peak == 2
+
+
+def test_worker_executor_sized_for_its_group(monkeypatch):
+    from app.core.config import settings
+    from app.services import inference
+    from app.services.inference import InferenceService
+
+    monkeypatch.setattr(inference, "configure_torch_threads", lambda threads: None)
+    monkeypatch.setattr(settings, "INFERENCE_WORKERS", {
+        "lid": {"models": ["mms_lid"], "concurrency": 2},
+        "tts": {"models": ["adia_tts", "xtts"], "concurrency": 1},
+    })
+    service = InferenceService()
+    service.serve_groups(["tts"])
+    executor = service._get_executor()
+    try:
+        assert executor._max_workers == 2
+    finally:
+        executor.shutdown()
@@ -0,0 +1,51 @@
+import asyncio
+from uuid import uuid4
+import pytest
+from app.services.intent_router import IntentRouter
+
+
+@pytest.mark.parametrize("text, intent", [
+    ("Bonjour", "greeting"),
+    ("Merci beaucoup", "thanks"),
+    ("Je voudrais un rendez-vous en cardiologie demain", "appointment"),
+    ("Quels médecins sont disponibles ?", "doctors"),
+    # Changes, explicit times and personal details go to the LLM
+    ("Je veux déplacer mon rendez-vous de demain", None),
+    ("Je veux annuler mon rendez-vous", None),
+    ("Un rendez-vous demain à 10 heures", None),
+    ("Un rendez-vous demain à 10h30", None),
+    ("Rendez-vous, je m'appelle Awa", None),
+])
+def test_classify(text, intent):
+    assert IntentRouter().classify(text) == intent
+
+
+@pytest.mark.parametrize("text, intent", [
+    # Missed by the keyword rules, caught by the local classifier
+    ("Je souhaiterais voir un cardiologue", "appointment"),
+    ("Can I book with a pediatrician", "appointment"),
+    ("Qui sont vos dermatologues", "doctors"),
+    ("Où est la pharmacie", None),
+    ("J'ai mal au ventre", None),
+])
+def test_classify_with_local_classifier(text, intent):
+    assert IntentRouter().classify(text) == intent
+
+
+def run_route(router, text, language, awaiting_answer=False):
+    async def awaiting(db, session_id):
+        return awaiting_answer
+
+    router._awaiting_answer = awaiting
+    return asyncio.run(router.route(None, None, text, language, execute_tools=None, session_id=uuid4()))
+
+
+def test_route_normalizes_whisper_language_names():
+    assert run_route(IntentRouter(), "Hello", "english").startswith("Hello")
+    assert run_route(IntentRouter(), "Bonjour", "french").startswith("Bonjour")
+
+
+def test_small_talk_waits_for_pending_question():
+    # "d'accord merci" answering a confirmation question goes to the LLM
+    assert run_route(IntentRouter(), "D'accord merci", "fr", awaiting_answer=True) is None
+    assert run_route(IntentRouter(), "D'accord merci", "fr").startswith("Je vous en prie")
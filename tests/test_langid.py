@@ -0,0 +1,36 @@
+import asyncio
+import pytest
+from app.services.langid import TextLanguageDetector
+
+
+@pytest.fixture(scope="module")
+def detector():
+    return TextLanguageDetector()
+
+
+@pytest.mark.parametrize("text", [
+    "Dama bëgg annuler mon rendez-vous de demain.",
+    "Rendez-vous bi, c'est à quelle heure?",
+    "Je suis venu pour la consultation, waaw.",
+])
+def test_code_switched_wolof(detector, text):
+    lang, confidence = detector.detect(text)
+    assert lang == "wo" and confidence >= 0.9
+
+
+@pytest.mark.parametrize("text, lang", [
+    ("Je souhaite parler à un agent.", "fr"),
+    ("Can I bring my daughter with me?", "en"),
+])
+def test_plain_sentences_unaffected(detector, text, lang):
+    assert detector.detect(text)[0] == lang
+
+
+def test_single_token_keeps_session_language():
+    from app.services.llm import LLMService
+
+    llm = LLMService.__new__(LLMService)
+    llm.client = None
+    assert asyncio.run(llm.detect_language("ok", session_language="wo")) == "wo"
+    assert asyncio.run(llm.detect_language("ok")) == "fr"  # No session: default, not a one-token guess
+    assert asyncio.run(llm.detect_language("jërëjëf")) == "wo"  # Confident guess without a session
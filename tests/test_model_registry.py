@@ -0,0 +1,98 @@
+import asyncio
+import time
+import pytest
+from app.core.config import settings
+from app.services.model_registry import ModelRegistry, ModelSpec, ModelUnavailableError
+
+GB = 1024 ** 3
+
+
+class FakeTensor:
+    def __init__(self, size: int):
+        self.size = size
+
+    def numel(self):
+        return self.size
+
+    def element_size(self):
+        return 1
+
+
+class FakeModule:
+    def __init__(self, size: int):
+        self._tensors = [FakeTensor(size)]
+
+    def parameters(self):
+        return iter(self._tensors)
+
+    def buffers(self):
+        return iter([])
+
+
+def make_registry(sizes, peaks):
+    registry = ModelRegistry()
+    for name, size in sizes.items():
+        def loader(size=size):
+            # Memory committed while this load runs (resident + loads in progress)
+            peaks.append(registry.resident_bytes + registry.reserved_bytes)
+            time.sleep(0.05)
+            return {"model": FakeModule(size)}
+        registry.register(ModelSpec(name, loader, estimated_bytes=size))
+    return registry
+
+
+def test_concurrent_cold_loads_stay_within_budget(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_MODELS_MAX_BYTES", 10 * GB)
+    peaks = []
+    registry = make_registry({"mms_lid": 4 * GB, "adia_tts": 4 * GB, "xtts": 2 * GB, "wolof_asr": 1 * GB}, peaks)
+
+    async def use(name):
+        async with registry.use(name):
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await use("mms_lid")
+        await asyncio.gather(use("adia_tts"), use("xtts"), use("wolof_asr"))
+
+    asyncio.run(scenario())
+    assert max(peaks) <= 10 * GB
+    assert registry.resident_bytes <= 10 * GB
+    assert registry.reserved_bytes == 0
+
+
+def test_budget_full_of_busy_models_rejects(monkeypatch):
+    monkeypatch.setattr(settings, "LOCAL_MODELS_MAX_BYTES", 5 * GB)
+    registry = make_registry({"a": 4 * GB, "b": 4 * GB}, [])
+
+    async def scenario():
+        async with registry.use("a"):
+            with pytest.raises(ModelUnavailableError):
+                async with registry.use("b"):
+                    pass
+        # Once "a" is idle it is evicted to make room
+        async with registry.use("b"):
+            pass
+
+    asyncio.run(scenario())
+    assert [m["name"] for m in registry.status() if m["resident"]] == ["b"]
+
+
+def test_single_flight_load():
+    loads = []
+    registry = ModelRegistry()
+
+    def loader():
+        loads.append(1)
+        time.sleep(0.02)
+        return {"model": FakeModule(1)}
+
+    registry.register(ModelSpec("m", loader, estimated_bytes=1))
+
+    async def scenario():
+        async def use():
+            async with registry.use("m"):
+                pass
+        await asyncio.gather(*(use() for _ in range(5)))
+
+    asyncio.run(scenario())
+    assert len(loads) == 1
@@ -0,0 +1,40 @@
+import asyncio
+from array import array
+from collections import OrderedDict
+from app.core.admission import Priority
+from app.services.rag import RAGService
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, input, model):
+        self.calls.append(list(input))
+        return type("Response", (), {"data": [type("Item", (), {"embedding": [float(len(t)), 0.5]}) for t in input]})
+
+
+def make_service(cache_size=4):
+    service = RAGService.__new__(RAGService)
+    service.client = type("Client", (), {"embeddings": FakeEmbeddings()})()
+    service.model = "test"
+    service._cache = OrderedDict()
+    service.cache_size = cache_size
+    return service
+
+
+def test_query_embeddings_are_cached_compactly():
+    service = make_service()
+    first = asyncio.run(service.embed_text("bonjour"))
+    second = asyncio.run(service.embed_text("bonjour"))
+    assert first == second == [7.0, 0.5]
+    assert service.client.embeddings.calls == [["bonjour"]]
+    assert isinstance(service._cache["bonjour"], array)
+
+
+def test_ingestion_embeds_bypass_the_cache():
+    service = make_service()
+    asyncio.run(service.embed_text("question"))
+    result = asyncio.run(service.embed_texts(["chunk one", "chunk two", "question"], priority=Priority.BACKGROUND))
+    assert result == [[9.0, 0.5], [9.0, 0.5], [8.0, 0.5]]
+    assert list(service._cache) == ["question"]
@@ -0,0 +1,122 @@
+import asyncio
+import time
+import pytest
+from app.core import resilience
+from app.core.resilience import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker(breaker: CircuitBreaker):
+    breaker.record_failure()
+    assert breaker.state == "open"
+    breaker._opened_at = time.monotonic() - breaker.open_seconds - 1  # Open period elapsed
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, open_seconds=30)
+    open_breaker(breaker)
+
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, open_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    breaker._opened_at = time.monotonic() - 31
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_slow_call_counts_as_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1, slow_call_seconds=1.0)
+    breaker.record_success(2.0)
+    assert breaker.state == "open"
+
+
+def test_cancelled_probe_releases_half_open_breaker(monkeypatch):
+    from app.services.lafricamobile import LAfricaMobileService
+
+    monkeypatch.setattr(resilience, "_breakers", {})
+    breaker = resilience.get_circuit_breaker("lafricamobile.translate", failure_threshold=1, open_seconds=30)
+    open_breaker(breaker)
+
+    service = LAfricaMobileService.__new__(LAfricaMobileService)
+    service._latency = {"translate": resilience.LatencyTracker()}
+    started = asyncio.Event()
+
+    async def send():
+        started.set()
+        await asyncio.sleep(3600)
+
+    async def scenario():
+        # The probe is cancelled mid-call (e.g. batch client disconnected)
+        probe = asyncio.create_task(service._call("translate", send))
+        await started.wait()
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        async def ok():
+            return "done"
+
+        # The next call is allowed to probe instead of failing with CircuitOpenError
+        assert await service._call("translate", ok) == "done"
+
+    asyncio.run(scenario())
+    assert breaker.state == "closed"
+
+
+def test_admission_queue_wait_is_not_timed_as_provider_latency(monkeypatch):
+    from app.core import admission
+    from app.core.config import settings
+    from app.services.lafricamobile import LAfricaMobileService
+
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(admission, "_controllers", {
+        "lafricamobile.translate": admission.AdmissionController("lafricamobile.translate", concurrency=1)
+    })
+    monkeypatch.setattr(settings, "LAFRICAMOBILE_TIMEOUTS", {"translate": 0.2})
+    monkeypatch.setattr(settings, "LAFRICAMOBILE_MIN_CALL_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "LAFRICAMOBILE_BREAKER_FAILURES", 1)
+    monkeypatch.setattr(settings, "LAFRICAMOBILE_SLOW_CALL_RATIO", 0.5)
+    breaker = resilience.get_circuit_breaker("lafricamobile.translate", failure_threshold=1, slow_call_seconds=0.1)
+
+    class Response:
+        status_code = 200
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"translated_text": "done"}
+
+    class Client:
+        async def post(self, url, **kwargs):
+            return Response()
+
+    service = LAfricaMobileService.__new__(LAfricaMobileService)
+    service._latency = {"translate": resilience.LatencyTracker()}
+    service.base_url, service.token, service.client = "http://provider", "token", Client()
+
+    async def scenario():
+        # Another call holds the only slot longer than the provider timeout
+        async with admission.upstream_slot("lafricamobile.translate"):
+            queued = asyncio.create_task(service.translate("bonjour", "wolof"))
+            await asyncio.sleep(0.3)
+        return await queued
+
+    assert asyncio.run(scenario()) == "done"
+    assert breaker.state == "closed"
+    assert service._latency["translate"].percentile(50, min_samples=1) < 0.1